@@ -1,9 +1,16 @@
 import datetime
 import hashlib
+import io
+import json
+import lzma
 import os
+import stat
 import sys
 import tarfile
+import time
 import errno
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
@@ -11,10 +18,147 @@ from werkzeug.utils import secure_filename
 
 from pbench.cli.agent.commands.log import add_metalog_option
 from pbench.common import configtools
+from pbench.common.constants import (
+    DEFAULT_COMPRESSION,
+    DEFAULT_COMPRESSION_PRESET,
+    DEFAULT_COMPRESSION_THREADS,
+    DEFAULT_UPLOAD_CHUNK_SIZE,
+    DEFAULT_UPLOAD_CONCURRENCY,
+    DEFAULT_UPLOAD_RETRIES,
+    DEFAULT_UPLOAD_RETRY_BACKOFF,
+    TARBALL_MANIFEST,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def make_upload_session(config):
+    """Return a requests Session whose connection pool is large enough for
+    the configured number of concurrent uploads, so that all the requests
+    made to the pbench server re-use kept-alive connections.
+    """
+    concurrency = config.results.getint(
+        "upload_concurrency", fallback=DEFAULT_UPLOAD_CONCURRENCY
+    )
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=max(concurrency, 1)
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def request_with_retries(session, method, url, config, logger, data=None, **kwargs):
+    """Issue a request through the given session, retrying connection
+    failures and server errors (5xx) a bounded number of times with an
+    exponential backoff between attempts.
+
+    The data argument, when given, must be a callable returning the request
+    body, since a streamed body has to be re-created for each attempt.
+
+    Returns the last response received; the exception of the last attempt is
+    raised if no response could be obtained at all.
+    """
+    retries = config.results.getint("upload_retries", fallback=DEFAULT_UPLOAD_RETRIES)
+    delay = config.results.getfloat(
+        "upload_retry_backoff", fallback=DEFAULT_UPLOAD_RETRY_BACKOFF
+    )
+    attempt = 0
+    while True:
+        try:
+            response = session.request(
+                method, url, data=data() if data else None, **kwargs
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= retries:
+                raise
+            logger.warning("{} {} failed, retrying in {} seconds", method, url, delay)
+        else:
+            if response.status_code < 500 or attempt >= retries:
+                return response
+            logger.warning(
+                "{} {} returned {}, retrying in {} seconds",
+                method,
+                url,
+                response.status_code,
+                delay,
+            )
+        time.sleep(delay)
+        delay *= 2
+        attempt += 1
+
+
+class HashingWriter:
+    """A write-only file object which computes the MD5 of everything written
+    through it, so the checksum of a tar ball is known as soon as the tar ball
+    is written.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.md5 = hashlib.md5()
+
+    def write(self, data):
+        self.md5.update(data)
+        return self.fp.write(data)
+
+    def flush(self):
+        self.fp.flush()
+
+
+class ParallelXzWriter:
+    """A write-only file object producing an .xz file using several threads.
+
+    The input is cut into fixed size blocks, and each block is compressed
+    independently, as its own .xz stream, by a pool of threads (lzma releases
+    the GIL while compressing).  The compressed streams are written out in
+    order; a sequence of concatenated .xz streams is itself a valid .xz file
+    which xz, tar and Python's lzma module all read transparently.
+    """
+
+    block_size = 8 * 1024 * 1024
+
+    def __init__(self, fp, preset, threads):
+        self.fp = fp
+        self.preset = preset
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.pending = deque()
+        self.buffer = bytearray()
+
+    def _compress(self, block):
+        return lzma.compress(block, format=lzma.FORMAT_XZ, preset=self.preset)
+
+    def _submit(self, block):
+        self.pending.append(self.executor.submit(self._compress, block))
+        # Bound the memory used by limiting the number of blocks in flight.
+        while len(self.pending) > 2 * self.threads:
+            self.fp.write(self.pending.popleft().result())
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[: self.block_size]))
+            del self.buffer[: self.block_size]
+        return len(data)
+
+    def close(self):
+        if self.buffer or not self.pending:
+            self._submit(bytes(self.buffer))
+            self.buffer = bytearray()
+        while self.pending:
+            self.fp.write(self.pending.popleft().result())
+        self.executor.shutdown()
 
 
 class MakeResultTb:
-    def __init__(self, result_dir, target_dir, user, prefix, config, logger):
+    def __init__(
+        self, result_dir, target_dir, user, prefix, config, logger, formats=None
+    ):
         assert (
             config and logger
         ), f"config, '{config!r}', and/or logger, '{logger!r}', not provided"
@@ -46,6 +190,32 @@ class MakeResultTb:
         self.prefix = prefix
         self.config = config
         self.logger = logger
+        self.preset = config.results.getint(
+            "compression_preset", fallback=DEFAULT_COMPRESSION_PRESET
+        )
+        threads = config.results.getint(
+            "compression_threads", fallback=DEFAULT_COMPRESSION_THREADS
+        )
+        self.threads = threads if threads > 0 else (os.cpu_count() or 1)
+        # Only use zstd compression when it is requested, available locally,
+        # and advertised as accepted by the server.
+        compression = config.results.get("compression", fallback=DEFAULT_COMPRESSION)
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstd compression requested but not available, using xz")
+        elif compression == "zstd" and "zst" not in (formats or ()):
+            logger.warning("zstd compression not supported by the server, using xz")
+        self.compression = (
+            "zstd"
+            if compression == "zstd" and zstandard and "zst" in (formats or ())
+            else "xz"
+        )
+
+    def _open_compressor(self, fp):
+        """Return a write-only file object compressing into fp."""
+        if self.compression == "zstd":
+            cctx = zstandard.ZstdCompressor(level=self.preset, threads=self.threads)
+            return cctx.stream_writer(fp, closefd=False)
+        return ParallelXzWriter(fp, self.preset, self.threads)
 
     def make_result_tb(self):
         if os.path.exists(f"{self.result_dir}.copied"):
@@ -90,7 +260,8 @@ class MakeResultTb:
         if self.prefix:
             add_metalog_option(md_log, "run", "prefix", self.prefix)
 
-        result_size = sum(f.stat().st_size for f in self.result_dir.rglob("*"))
+        entries = self._walk()
+        result_size = sum(st.st_size for _, _, st in entries[1:])
         self.logger.debug(
             "preparing to tar up {} bytes of data from {}", result_size, self.result_dir
         )
@@ -101,12 +272,16 @@ class MakeResultTb:
             md_log, "pbench", "tar-ball-creation-timestamp", f"{timestamp}"
         )
 
-        tarball = self.target_dir / f"{pbench_run_name}.tar.xz"
+        ext = "zst" if self.compression == "zstd" else "xz"
+        tarball = self.target_dir / f"{pbench_run_name}.tar.{ext}"
         try:
-            with tarfile.open(tarball, mode="x:xz") as tar:
-                for f in self.result_dir.rglob("*"):
-                    tar.add(os.path.realpath(f))
-        except tarfile.TarError:
+            with tarball.open("xb") as fp:
+                hashing_fp = HashingWriter(fp)
+                compressor = self._open_compressor(hashing_fp)
+                with tarfile.open(fileobj=compressor, mode="w|") as tar:
+                    self._add_entries(tar, entries, md_log)
+                compressor.close()
+        except (tarfile.TarError, lzma.LZMAError, OSError):
             self.logger.error(
                 "tar ball creation failed for {}, skipping", self.result_dir
             )
@@ -117,19 +292,137 @@ class MakeResultTb:
                     self.logger.error("error removing failed tar ball, {}", tarball)
             sys.exit(1)
 
-        self.make_md5sum(tarball)
+        self.make_md5sum(tarball, hashing_fp.md5)
 
         # The contract with the caller is to just return the full path to the
         # created tar ball.
         return str(tarball)
 
-    def make_md5sum(self, tarball):
+    def _walk(self):
+        """Walk the result directory once, returning a list of (arcname,
+        path, stat) tuples for the result directory itself and every entry
+        below it, parents before their children.
+
+        Entries are named relative to the parent of the result directory, so
+        that every member of the tar ball is found under the run name.
+        """
+        root = str(self.result_dir)
+        entries = [(self.result_dir.name, root, os.lstat(root))]
+        dirs = [(root, self.result_dir.name)]
+        while dirs:
+            path, arcname = dirs.pop()
+            with os.scandir(path) as it:
+                for entry in sorted(it, key=lambda e: e.name):
+                    st = entry.stat(follow_symlinks=False)
+                    entry_arcname = f"{arcname}/{entry.name}"
+                    entries.append((entry_arcname, entry.path, st))
+                    if stat.S_ISDIR(st.st_mode):
+                        dirs.append((entry.path, entry_arcname))
+        return entries
+
+    @staticmethod
+    def _tarinfo(arcname, path, st):
+        """Construct the TarInfo for an entry from its (already known) stat
+        results, returning None for entries which are not archived (sockets,
+        devices, etc.).
+        """
+        tarinfo = tarfile.TarInfo(arcname)
+        if stat.S_ISREG(st.st_mode):
+            tarinfo.type = tarfile.REGTYPE
+            tarinfo.size = st.st_size
+        elif stat.S_ISDIR(st.st_mode):
+            tarinfo.type = tarfile.DIRTYPE
+        elif stat.S_ISLNK(st.st_mode):
+            tarinfo.type = tarfile.SYMTYPE
+            tarinfo.linkname = os.readlink(path)
+        else:
+            return None
+        tarinfo.mode = stat.S_IMODE(st.st_mode)
+        tarinfo.uid = st.st_uid
+        tarinfo.gid = st.st_gid
+        tarinfo.mtime = int(st.st_mtime)
+        return tarinfo
+
+    _manifest_types = {
+        tarfile.REGTYPE: "reg",
+        tarfile.DIRTYPE: "dir",
+        tarfile.SYMTYPE: "sym",
+    }
+
+    def _add_entries(self, tar, entries, md_log):
+        """Add the walked entries to the tar ball, preceded by a manifest
+        member describing all of them.
+
+        The manifest immediately follows the top-level directory, so that a
+        reader can get the full listing of the tar ball without decompressing
+        all of it.  It also records the offset of the data of every member
+        following it, relative to the end of the manifest member, so that a
+        reader of the (multi-block) tar ball can seek straight to the data of
+        any member.
+        """
+        md_log = str(md_log)
+        tarinfos = []
+        for arcname, path, st in entries:
+            if path == md_log:
+                # The metadata.log file was updated after the walk.
+                st = os.lstat(path)
+            tarinfo = self._tarinfo(arcname, path, st)
+            if tarinfo is not None:
+                tarinfos.append((tarinfo, path))
+
+        # The offsets of the members following the manifest are known ahead
+        # of writing them, since each member is its header followed by its
+        # data padded to a whole number of tar blocks.
+        offsets = [None]
+        offset = 0
+        for tarinfo, _ in tarinfos[1:]:
+            offset += len(tarinfo.tobuf(tar.format, tar.encoding, tar.errors))
+            offsets.append(offset)
+            blocks, remainder = divmod(tarinfo.size, tarfile.BLOCKSIZE)
+            offset += (blocks + (1 if remainder else 0)) * tarfile.BLOCKSIZE
+
+        manifest = dict(
+            version=1,
+            offsets=offsets,
+            entries=[
+                [
+                    ti.name,
+                    self._manifest_types[ti.type],
+                    ti.size,
+                    ti.mode,
+                    ti.mtime,
+                    ti.linkname,
+                ]
+                for ti, _ in tarinfos
+            ],
+        )
+        data = json.dumps(manifest, separators=(",", ":")).encode("utf-8")
+        manifest_info = tarfile.TarInfo(f"{self.result_dir.name}/{TARBALL_MANIFEST}")
+        manifest_info.size = len(data)
+        manifest_info.mode = 0o644
+        manifest_info.mtime = int(time.time())
+
+        root_info, _ = tarinfos[0]
+        tar.addfile(root_info)
+        tar.addfile(manifest_info, io.BytesIO(data))
+        for tarinfo, path in tarinfos[1:]:
+            if tarinfo.isreg():
+                with open(path, "rb") as f:
+                    tar.addfile(tarinfo, f)
+            else:
+                tar.addfile(tarinfo)
+
+    def make_md5sum(self, tarball, hash_md5=None):
+        """Write the .md5 file of the tar ball, using the MD5 computed while
+        the tar ball was written if one is given.
+        """
         tarball_md5 = Path(f"{tarball}.md5")
         try:
-            hash_md5 = hashlib.md5()
-            with tarball.open("rb") as tar:
-                for chunk in iter(lambda: tar.read(4096), b""):
-                    hash_md5.update(chunk)
+            if hash_md5 is None:
+                hash_md5 = hashlib.md5()
+                with tarball.open("rb") as tar:
+                    for chunk in iter(lambda: tar.read(4096), b""):
+                        hash_md5.update(chunk)
 
             with tarball_md5.open("w") as md5:
                 md5.write(f"{tarball.name} {hash_md5.hexdigest()}\n")
@@ -151,9 +444,10 @@ class MakeResultTb:
 
 
 class CopyResultTb:
-    chunk_size = 4096
+    # Size of each independently retryable chunk of a resumable upload.
+    session_chunk_size = 8 * 1024 * 1024
 
-    def __init__(self, tarball, config, logger):
+    def __init__(self, tarball, config, logger, session=None, controller=None):
         if not os.path.exists(tarball):
             logger.error("tarball does not exist, '{}'", tarball)
             sys.exit(1)
@@ -163,9 +457,20 @@ class CopyResultTb:
             sys.exit(1)
         self.tarball = Path(tarball)
         self.tarball_md5 = Path(tarball_md5)
+        self.config = config
         self.logger = logger
+        self.session = session if session else make_upload_session(config)
+        self.chunk_size = config.results.getint(
+            "upload_chunk_size", fallback=DEFAULT_UPLOAD_CHUNK_SIZE
+        )
         server_rest_url = config.results.get("server_rest_url")
         self.upload_url = f"{server_rest_url}/upload"
+        self.session_url = f"{server_rest_url}/upload/session"
+        self.resumable = config.results.getboolean("resumable_upload", fallback=False)
+        self.state_dir = config.pbench_tmp / "upload-sessions"
+        # Naming the controller lets the server hand the tar ball over to its
+        # pipeline at once, instead of leaving it for cron to pick up.
+        self.controller_headers = {"controller": controller} if controller else {}
 
     def read_in_chunks(self, file_object):
         data = file_object.read(self.chunk_size)
@@ -173,6 +478,11 @@ class CopyResultTb:
             yield data
             data = file_object.read(self.chunk_size)
 
+    def _request(self, method, url, data=None, **kwargs):
+        return request_with_retries(
+            self.session, method, url, self.config, self.logger, data=data, **kwargs
+        )
+
     def copy_result_tb(self):
         files = [f for f in self.tarball.parent.iterdir() if f.is_file()]
         file_count = len(files)
@@ -185,21 +495,149 @@ class CopyResultTb:
             sys.exit(1)
 
         with open(self.tarball_md5, "r") as md5fp:
-            md5sum = md5fp.read()
-        filename = secure_filename(str(self.tarball))
-        headers = {"filename": filename, "md5sum": md5sum}
+            # The .md5 file is either just the MD5 value or "<name> <md5>".
+            md5sum = md5fp.read().split()[-1]
+        filename = secure_filename(self.tarball.name)
+        if self.resumable:
+            return self.copy_result_tb_resumable(filename, md5sum)
+        headers = {"filename": filename, "md5sum": md5sum, **self.controller_headers}
         with self.tarball.open("rb") as f:
+
+            def stream():
+                f.seek(0)
+                return self.read_in_chunks(f)
+
             try:
-                response = requests.post(
-                    self.upload_url, data=self.read_in_chunks(f), headers=headers
+                response = self._request(
+                    "POST", self.upload_url, data=stream, headers=headers
                 )
-                self.logger.info("File uploaded successfully")
             except Exception:
                 self.logger.exception("There was something wrong with your request")
                 sys.exit(1)
-        if not response.status_code == 200:
+        # The server answers 201 Created, older ones 200.
+        if response.status_code not in [200, 201]:
+            self.logger.error(
+                "There was something wrong with your request, error code: '{}'",
+                response.status_code,
+            )
+            sys.exit(1)
+        self.logger.info("File uploaded successfully")
+        return True
+
+    def _load_state(self, state_file, md5sum):
+        """Load the local state of a previously interrupted upload of this
+        tar ball, ignoring it if it belongs to a different tar ball.
+        """
+        try:
+            with state_file.open("r") as fp:
+                state = json.load(fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self.logger.warning("ignoring unreadable upload state, '{}'", state_file)
+            return None
+        if state.get("md5sum") != md5sum:
+            return None
+        return state
+
+    def _save_state(self, state_file, state):
+        tmp_file = state_file.with_suffix(".tmp")
+        with tmp_file.open("w") as fp:
+            json.dump(state, fp)
+        tmp_file.rename(state_file)
+
+    def copy_result_tb_resumable(self, filename, md5sum):
+        """Upload the tar ball in chunks through an upload session.
+
+        The session ID and the chunks acknowledged so far are recorded in a
+        local state file so that an interrupted upload can be resumed by a
+        later invocation, only sending the chunks the server is missing.
+        """
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        state_file = self.state_dir / f"{self.tarball.name}.json"
+        size = self.tarball.stat().st_size
+
+        state = self._load_state(state_file, md5sum)
+        response = None
+        try:
+            if state:
+                response = self._request(
+                    "GET", f"{self.session_url}/{state['session']}"
+                )
+                if response.status_code == 404:
+                    # The server no longer knows about this session.
+                    response = None
+            if response is None:
+                response = self._request(
+                    "POST",
+                    self.session_url,
+                    headers={
+                        "filename": filename,
+                        "md5sum": md5sum,
+                        "filesize": str(size),
+                    },
+                )
+        except Exception:
+            self.logger.exception("There was something wrong with your request")
+            sys.exit(1)
+        if response.status_code not in [200, 201]:
+            self.logger.error(
+                "There was something wrong with your request, error code: '{}'",
+                response.status_code,
+            )
+            sys.exit(1)
+        upload = response.json()
+        received = set(tuple(chunk) for chunk in upload["received"])
+        state = dict(session=upload["session"], md5sum=md5sum)
+        self._save_state(state_file, state)
+
+        chunk_url = f"{self.session_url}/{upload['session']}"
+        with self.tarball.open("rb") as f:
+            for offset in range(0, size, self.session_chunk_size):
+                length = min(self.session_chunk_size, size - offset)
+                if (offset, length) in received:
+                    continue
+                f.seek(offset)
+                chunk = f.read(length)
+                try:
+                    response = self._request(
+                        "PUT",
+                        chunk_url,
+                        data=lambda: chunk,
+                        headers={"offset": str(offset)},
+                    )
+                except Exception:
+                    self.logger.exception(
+                        "Upload of {} interrupted at offset {}, re-run to resume",
+                        self.tarball,
+                        offset,
+                    )
+                    sys.exit(1)
+                if response.status_code != 200:
+                    self.logger.error(
+                        "Upload of {} failed at offset {}, error code: '{}'",
+                        self.tarball,
+                        offset,
+                        response.status_code,
+                    )
+                    sys.exit(1)
+
+        try:
+            response = self._request(
+                "POST", f"{chunk_url}/complete", headers=self.controller_headers
+            )
+        except Exception:
+            self.logger.exception("There was something wrong with your request")
+            sys.exit(1)
+        if response.status_code == 400:
+            # The server discarded the session, the next attempt starts over.
+            state_file.unlink()
+        if response.status_code != 201:
             self.logger.error(
                 "There was something wrong with your request, error code: '{}'",
                 response.status_code,
             )
             sys.exit(1)
+        state_file.unlink()
+        self.logger.info("File uploaded successfully")
+        return True
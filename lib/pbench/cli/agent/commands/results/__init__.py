@@ -1,10 +1,21 @@
 import os
+import shutil
 import sys
-import requests
+from queue import Queue
+from threading import Thread
 
+from pbench.common.constants import (
+    DEFAULT_UPLOAD_CONCURRENCY,
+    DEFAULT_UPLOAD_QUEUE_DEPTH,
+)
 from pbench.common.logger import get_pbench_logger
 from pbench.agent import PbenchAgentConfig
-from pbench.agent.results import MakeResultTb, CopyResultTb
+from pbench.agent.results import (
+    MakeResultTb,
+    CopyResultTb,
+    make_upload_session,
+    request_with_retries,
+)
 
 
 def move_results(ctx, _user, _prefix, _show_server):
@@ -26,8 +37,13 @@ def move_results(ctx, _user, _prefix, _show_server):
     if not _user:
         _user = config.agent.get("pbench_user")
 
+    # All requests to the server share one pool of kept-alive connections.
+    session = make_upload_session(config)
+
     server_rest_url = config.results.get("server_rest_url")
-    response = requests.get(f"{server_rest_url}/host_info")
+    response = request_with_retries(
+        session, "GET", f"{server_rest_url}/host_info", config, logger
+    )
     if response.status_code not in [200, 201]:
         logger.error(
             "Unable to determine results host info from %s/host_info", server_rest_url
@@ -46,8 +62,11 @@ def move_results(ctx, _user, _prefix, _show_server):
         )
         sys.exit(1)
 
-    runs_copied = 0
-    failures = 0
+    try:
+        formats = response.json().get("formats", [])
+    except (ValueError, AttributeError):
+        # Older servers only accept .tar.xz tar balls.
+        formats = []
 
     # FIXME: use tempfile
     temp_dir = os.path.join(
@@ -67,32 +86,94 @@ def move_results(ctx, _user, _prefix, _show_server):
         if not _dir.startswith("tools-") and not _dir.startswith("tmp")
     ]
 
-    for _dir in dirs:
-        result_dir = config.pbench_run / _dir
-        mrt = MakeResultTb(result_dir, temp_dir, _user, _prefix, config, logger)
-        result_tb_name = mrt.make_result_tb()
-        if result_tb_name:
-            crt = CopyResultTb(result_tb_name, config, logger)
+    def copy_result(result_dir, result_tb_name):
+        crt = CopyResultTb(
+            result_tb_name, config, logger, session=session, controller=controller
+        )
+        try:
             copy_result = crt.copy_result_tb()
+        except SystemExit:
+            copy_result = False
+        try:
+            shutil.rmtree(os.path.dirname(result_tb_name))
+        except OSError:
+            logger.error("rm failed to remove {} and its .md5 file", result_tb_name)
+            return False
+        if not copy_result:
+            return False
+
+        try:
+            shutil.rmtree(result_dir)
+        except OSError:
+            logger.error("rm failed to remove the {} directory hierarchy", result_dir)
+            return False
+        return True
+
+    # The tar balls are made by this thread (the producer) while a set of
+    # upload threads (the consumers) copy the ones already made.  The queue
+    # between them is bounded so that only a few tar balls are ever waiting
+    # on local disk.
+    concurrency = max(
+        config.results.getint(
+            "upload_concurrency", fallback=DEFAULT_UPLOAD_CONCURRENCY
+        ),
+        1,
+    )
+    queue_depth = max(
+        config.results.getint(
+            "upload_queue_depth", fallback=DEFAULT_UPLOAD_QUEUE_DEPTH
+        ),
+        1,
+    )
+    to_copy = Queue(maxsize=queue_depth)
+    outcomes = []
+
+    def uploader():
+        while True:
+            item = to_copy.get()
+            if item is None:
+                break
+            result_dir, result_tb_name = item
             try:
-                os.remove(result_tb_name)
-                os.remove(f"{result_tb_name}.md5")
-            except OSError:
-                logger.error("rm failed to remove %s and its .md5 file", result_tb_name)
-                sys.exit(1)
-            if not copy_result:
-                failures += 1
-                continue
+                outcomes.append(copy_result(result_dir, result_tb_name))
+            except (Exception, SystemExit):
+                # A failure to copy one run must not affect the others.
+                logger.error("failed to copy result tar ball {}", result_tb_name)
+                outcomes.append(False)
 
+    uploaders = [Thread(target=uploader) for _ in range(concurrency)]
+    for thread in uploaders:
+        thread.start()
+    try:
+        for _dir in dirs:
+            result_dir = config.pbench_run / _dir
+            # Each tar ball gets its own directory so that concurrent copies
+            # only ever see their own tar ball and .md5 file.
+            tb_dir = os.path.join(temp_dir, _dir)
+            os.mkdir(tb_dir)
             try:
-                os.remove(result_dir)
-            except OSError:
-                logger.error(
-                    "rm failed to remove the %s directory hierarchy", result_dir
+                mrt = MakeResultTb(
+                    result_dir, tb_dir, _user, _prefix, config, logger, formats=formats
                 )
-                sys.exit(1)
+                result_tb_name = mrt.make_result_tb()
+            except SystemExit as exc:
+                # Runs which are skipped (still running, already copied) exit
+                # with a zero status; everything else is a failure.
+                shutil.rmtree(tb_dir, ignore_errors=True)
+                if exc.code:
+                    outcomes.append(False)
+                continue
+            if result_tb_name:
+                to_copy.put((result_dir, result_tb_name))
+    finally:
+        for _ in uploaders:
+            to_copy.put(None)
+        for thread in uploaders:
+            thread.join()
+        shutil.rmtree(os.path.dirname(temp_dir), ignore_errors=True)
 
-            runs_copied += 1
+    runs_copied = outcomes.count(True)
+    failures = outcomes.count(False)
 
     if runs_copied + failures > 0:
         logger.debug(
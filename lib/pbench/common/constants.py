@@ -2,3 +2,14 @@ DEFAULT_PBENCH_AGENT_RUN_DIR = "/var/lib/pbench-agent"
 DEFAULT_PBENCH_AGENT_INSTALL_DIR = "/opt/pbench-agent"
 DEFAULT_SCP_OPTS = "-o StrictHostKeyChecking=no"
 DEFAULT_SSH_OPTS = DEFAULT_SCP_OPTS
+DEFAULT_UPLOAD_CHUNK_SIZE = 1024 * 1024
+DEFAULT_UPLOAD_RETRIES = 3
+DEFAULT_UPLOAD_RETRY_BACKOFF = 1.0
+DEFAULT_UPLOAD_CONCURRENCY = 2
+DEFAULT_UPLOAD_QUEUE_DEPTH = 1
+DEFAULT_COMPRESSION = "xz"
+DEFAULT_COMPRESSION_PRESET = 6
+DEFAULT_COMPRESSION_THREADS = 0
+# Name of the manifest member embedded in a result tar ball, directly under
+# its top-level directory.
+TARBALL_MANIFEST = ".pbench-manifest.json"
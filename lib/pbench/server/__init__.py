@@ -70,6 +70,13 @@ class PbenchServerConfig(PbenchConfig):
         except NoOptionError:
             self.PBENCH_ENV = ""
 
+        try:
+            # Where the state transitions of tar balls are recorded, see
+            # pbench.server.pipeline; not recorded if not configured.
+            self.PIPELINE_EVENTS = self.conf.get("pbench-server", "pipeline-events-dir")
+        except NoOptionError:
+            self.PIPELINE_EVENTS = ""
+
         try:
             self.COMMIT_ID = self.conf.get("pbench-server", "commit_id")
         except NoOptionError:
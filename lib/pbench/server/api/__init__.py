@@ -1,5 +1,8 @@
 import os
+import re
 import sys
+import json
+import shutil
 import hashlib
 
 from pathlib import Path
@@ -9,8 +12,18 @@ from werkzeug.utils import secure_filename
 
 from pbench.common.logger import get_pbench_logger
 from pbench.server import PbenchServerConfig
+from pbench.server.trigger import TB_NAME_RE, enqueue, trigger_tasks, wake
+from pbench.server.utils import READABLE_FORMATS
 
-ALLOWED_EXTENSIONS = {"xz"}
+ALLOWED_EXTENSIONS = set(READABLE_FORMATS)
+BAD_EXTENSION_MESSAGE = "File extension not supported. Only {}".format(
+    ", ".join(f".{ext}" for ext in sorted(ALLOWED_EXTENSIONS))
+)
+
+# Upload sessions live in a hidden sub-directory of the receive directory so
+# that the final rename of an assembled tar ball stays on the same file system.
+UPLOAD_SESSIONS_DIR = ".upload-sessions"
+SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
 
 app = None
 
@@ -27,6 +40,14 @@ def allowed_file(filename):
 def register_endpoints(api, app):
     api.add_resource(Upload, f"{app.config['REST_URI']}/upload")
     api.add_resource(HostInfo, f"{app.config['REST_URI']}/host_info")
+    api.add_resource(UploadSession, f"{app.config['REST_URI']}/upload/session")
+    api.add_resource(
+        UploadSessionChunk, f"{app.config['REST_URI']}/upload/session/<session_id>"
+    )
+    api.add_resource(
+        UploadSessionComplete,
+        f"{app.config['REST_URI']}/upload/session/<session_id>/complete",
+    )
 
 
 def create_app():
@@ -61,10 +82,17 @@ def create_app():
 
     app.config["PORT"] = app.config_server.get("rest_port")
     app.config["VERSION"] = app.config_server.get("rest_version")
-    app.config["MAX_CONTENT_LENGTH"] = app.config_server.get("rest_max_content_length")
+    # The configured value is a product expression, e.g. "100 * 1024 * 1024".
+    max_content_length = 1
+    for factor in app.config_server.get("rest_max_content_length").split("*"):
+        max_content_length *= int(factor)
+    app.config["MAX_CONTENT_LENGTH"] = max_content_length
     app.config["REST_URI"] = app.config_server.get("rest_uri")
     app.config["LOG"] = app.config_server.get("rest_log")
 
+    # The crontab tasks run as soon as a tar ball is received, if any.
+    app.trigger_tasks = trigger_tasks(config.conf)
+
     register_endpoints(api, app)
 
     return app
@@ -77,7 +105,9 @@ class HostInfo(Resource):
             response = jsonify(
                 dict(
                     message=f"{app.config_server.get('user')}@{app.config_server.get('host')}"
-                    f":{app.config_server.get('pbench-receive-dir-prefix')}-002"
+                    f":{app.config_server.get('pbench-receive-dir-prefix')}-002",
+                    # The tar ball compression formats accepted for upload.
+                    formats=sorted(ALLOWED_EXTENSIONS),
                 )
             )
         except Exception:
@@ -105,7 +135,7 @@ class Upload(Resource):
         app.logger.debug("Receiving file: {}", filename)
         if not allowed_file(filename):
             app.logger.debug("Bad file extension received")
-            abort(400, message="File extension not supported. Only .xz")
+            abort(400, message=BAD_EXTENSION_MESSAGE)
 
         full_path = app.upload_directory / filename
 
@@ -129,6 +159,259 @@ class Upload(Resource):
         if hash_md5.hexdigest() != md5sum:
             abort(400, message=f"md5sum check failed for {filename}")
 
+        _push_to_pipeline(full_path, md5sum)
+
+        response = jsonify(dict(message="File successfully uploaded"))
+        response.status_code = 201
+        return response
+
+
+def _push_to_pipeline(tb, md5sum):
+    """Hand the received tar ball, whose MD5 has been verified, over to the
+    pipeline at once when configured to (see pbench.server.trigger); cron
+    picks it up otherwise.
+    """
+    global app
+    if not app.trigger_tasks:
+        return
+    controller = secure_filename(request.headers.get("controller", ""))
+    if not controller:
+        app.logger.debug(
+            "Missed or invalid controller in header, not triggering {}", tb.name
+        )
+        return
+    if not TB_NAME_RE.fullmatch(tb.name):
+        app.logger.debug("Not a result tar ball name, not triggering {}", tb.name)
+        return
+    try:
+        enqueue(app.upload_directory, controller, tb, md5sum)
+        wake(app.config_server.get("lock-dir"), app.config_server.get("script-dir"))
+    except Exception:
+        # The tar ball was received safely, so this is not the client's
+        # problem.
+        app.logger.exception("Failed to trigger the pipeline for {}", tb.name)
+
+
+def _session_dir(session_id):
+    """Return the directory holding the state of the given upload session,
+    aborting with a 404 if the session ID is malformed or unknown.
+    """
+    global app
+    if not SESSION_ID_RE.match(session_id):
+        abort(404, message=f"Unknown upload session {session_id}")
+    session_dir = app.upload_directory / UPLOAD_SESSIONS_DIR / session_id
+    if not (session_dir / "session.json").exists():
+        abort(404, message=f"Unknown upload session {session_id}")
+    return session_dir
+
+
+def _received_chunks(session_dir):
+    """Return the sorted list of (offset, length) pairs received so far for
+    an upload session.
+    """
+    received = []
+    for marker in (session_dir / "chunks").iterdir():
+        offset, length = marker.name.split(".")
+        received.append((int(offset), int(length)))
+    return sorted(received)
+
+
+def _session_response(session_id, session, session_dir, message, status_code):
+    response = jsonify(
+        dict(
+            message=message,
+            session=session_id,
+            filename=session["filename"],
+            size=session["size"],
+            received=_received_chunks(session_dir),
+        )
+    )
+    response.status_code = status_code
+    return response
+
+
+class UploadSession(Resource):
+    """Create (or re-attach to) a resumable upload session.
+
+    The session is keyed by the file name and its MD5 so that an agent which
+    lost its local state can still resume where it left off; the response
+    lists the (offset, length) chunks already received.
+    """
+
+    def post(self):
+        global app
+        if not request.headers.get("filename"):
+            app.logger.debug("Missed filename in header")
+            abort(400, message="Missing filename header in request")
+        filename = secure_filename(request.headers.get("filename"))
+
+        if not request.headers.get("md5sum"):
+            app.logger.debug("Missed md5sum in header")
+            abort(400, message="Missing md5sum header in request")
+        md5sum = request.headers.get("md5sum")
+
+        try:
+            size = int(request.headers.get("filesize"))
+            if size < 0:
+                raise ValueError(size)
+        except (TypeError, ValueError):
+            app.logger.debug("Missed or bad filesize in header")
+            abort(400, message="Missing or invalid filesize header in request")
+
+        if not allowed_file(filename):
+            app.logger.debug("Bad file extension received")
+            abort(400, message=BAD_EXTENSION_MESSAGE)
+
+        session_id = hashlib.md5(f"{filename}:{md5sum}".encode("utf-8")).hexdigest()
+        session_dir = app.upload_directory / UPLOAD_SESSIONS_DIR / session_id
+        session_file = session_dir / "session.json"
+        if session_file.exists():
+            with session_file.open("r") as fp:
+                session = json.load(fp)
+            if session["size"] != size:
+                abort(
+                    409,
+                    message=f"Upload session for {filename} exists with a different size",
+                )
+            app.logger.debug("Resuming upload session {} for {}", session_id, filename)
+            return _session_response(
+                session_id, session, session_dir, "Upload session resumed", 200
+            )
+
+        session = dict(filename=filename, md5sum=md5sum, size=size)
+        try:
+            (session_dir / "chunks").mkdir(parents=True, exist_ok=True)
+            # Pre-size the data file so that chunks can be written at their
+            # offsets independently, in any order, and concurrently.
+            with (session_dir / "data").open("wb") as f:
+                f.truncate(size)
+            # Write the session state last, its presence marks the session as
+            # usable.
+            tmp_file = session_dir / "session.json.tmp"
+            with tmp_file.open("w") as fp:
+                json.dump(session, fp)
+            tmp_file.rename(session_file)
+        except Exception:
+            app.logger.exception("Failed to create upload session for {}", filename)
+            abort(500, message=f"There was something wrong uploading {filename}")
+
+        app.logger.debug("Created upload session {} for {}", session_id, filename)
+        return _session_response(
+            session_id, session, session_dir, "Upload session created", 201
+        )
+
+
+class UploadSessionChunk(Resource):
+    """Report on, or receive one chunk of, a resumable upload session.
+
+    A chunk is written at the byte offset given by the "offset" header;
+    re-sending a chunk simply overwrites the same bytes.
+    """
+
+    def get(self, session_id):
+        session_dir = _session_dir(session_id)
+        with (session_dir / "session.json").open("r") as fp:
+            session = json.load(fp)
+        return _session_response(
+            session_id, session, session_dir, "Upload session in progress", 200
+        )
+
+    def put(self, session_id):
+        global app
+        session_dir = _session_dir(session_id)
+        with (session_dir / "session.json").open("r") as fp:
+            session = json.load(fp)
+
+        try:
+            offset = int(request.headers.get("offset"))
+            if offset < 0 or offset > session["size"]:
+                raise ValueError(offset)
+        except (TypeError, ValueError):
+            app.logger.debug("Missed or bad offset in header")
+            abort(400, message="Missing or invalid offset header in request")
+
+        length = 0
+        try:
+            fd = os.open(session_dir / "data", os.O_WRONLY)
+            try:
+                chunk_size = 65536
+                while True:
+                    chunk = request.stream.read(chunk_size)
+                    if len(chunk) == 0:
+                        break
+                    if offset + length + len(chunk) > session["size"]:
+                        abort(400, message="Chunk extends beyond the end of the file")
+                    os.pwrite(fd, chunk, offset + length)
+                    length += len(chunk)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            # Only record the chunk once its data is safely on disk.
+            (session_dir / "chunks" / f"{offset:d}.{length:d}").touch()
+        except OSError:
+            app.logger.exception(
+                "There was something wrong uploading {} at offset {}",
+                session["filename"],
+                offset,
+            )
+            abort(
+                500,
+                message=f"There was something wrong uploading {session['filename']}",
+            )
+
+        response = jsonify(dict(message="Chunk received", offset=offset, length=length))
+        response.status_code = 200
+        return response
+
+
+class UploadSessionComplete(Resource):
+    """Assemble an upload session: verify that all the bytes have been
+    received, check the MD5 of the whole file once, and move it into the
+    receive directory.
+    """
+
+    def post(self, session_id):
+        global app
+        session_dir = _session_dir(session_id)
+        with (session_dir / "session.json").open("r") as fp:
+            session = json.load(fp)
+        filename = session["filename"]
+
+        covered = 0
+        for offset, length in _received_chunks(session_dir):
+            if offset > covered:
+                break
+            covered = max(covered, offset + length)
+        if covered < session["size"]:
+            abort(
+                409,
+                message=f"Upload of {filename} is incomplete, missing data at offset {covered}",
+            )
+
+        hash_md5 = hashlib.md5()
+        try:
+            with (session_dir / "data").open("rb") as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    hash_md5.update(chunk)
+        except Exception:
+            app.logger.exception("There was something wrong assembling {}", filename)
+            abort(500, message=f"There was something wrong uploading {filename}")
+
+        if hash_md5.hexdigest() != session["md5sum"]:
+            # The assembled data cannot be trusted, so the agent has to start
+            # over with a new session.
+            shutil.rmtree(session_dir, ignore_errors=True)
+            abort(400, message=f"md5sum check failed for {filename}")
+
+        try:
+            (session_dir / "data").rename(app.upload_directory / filename)
+        except Exception:
+            app.logger.exception("There was something wrong assembling {}", filename)
+            abort(500, message=f"There was something wrong uploading {filename}")
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+        _push_to_pipeline(app.upload_directory / filename, session["md5sum"])
+
         response = jsonify(dict(message="File successfully uploaded"))
         response.status_code = 201
         return response
@@ -11,15 +11,18 @@ import logging
 import math
 import os
 import re
+import shutil
 import socket
 import sys
 import tarfile
+import tempfile
 import errno
-from collections import Counter, deque
+from collections import Counter, OrderedDict, deque
 from configparser import ConfigParser
 from configparser import Error as ConfigParserError
 from configparser import NoOptionError, NoSectionError
 from datetime import datetime, timedelta
+from itertools import islice
 from operator import itemgetter
 from random import SystemRandom
 from time import sleep as _sleep
@@ -40,10 +43,20 @@ from pbench.common.exceptions import (
     BadIterationName,
     BadSampleName,
 )
+from pbench.common.constants import TARBALL_MANIFEST
 from pbench.common.logger import get_pbench_logger
 
 import pbench.server
 from pbench.server import tstos
+from pbench.server.lease import DEFAULT_LEASE_TTL
+from pbench.server.members import MemberTable
+from pbench.server.schedule import (
+    CostModel,
+    DEFAULT_AGING,
+    DEFAULT_BYTES_PER_SEC,
+    DEFAULT_DOCS_PER_SEC,
+)
+from pbench.server.utils import open_indexed_tarball, open_tarball, tb_resultname
 
 try:
     from elasticsearch1 import Elasticsearch, helpers, exceptions as es_excs
@@ -80,6 +93,31 @@ VERSION = "4.0.0"
 # Standard normalized date/time format
 _STD_DATETIME_FMT = pbench._STD_DATETIME_FMT
 
+# The date portion of the standard normalized date/time format; the time
+# portion is formed with integer arithmetic by mk_abs_timestamps_millis().
+assert _STD_DATETIME_FMT == "%Y-%m-%dT%H:%M:%S.%f", _STD_DATETIME_FMT
+_STD_DATE_PREFIX_FMT = "%Y-%m-%dT"
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+# Timestamps which are whole numbers of milliseconds since the epoch below
+# this bound (2^33 seconds) are converted exactly with integer arithmetic,
+# since the float arithmetic of mk_abs_timestamp_millis() is accurate to the
+# microsecond for them.
+_MAX_EXACT_TS_MILLIS = 2 ** 33 * 1000
+
+# Default maximum number of tool data .csv files open at once while indexing
+# a tar ball, see the "max_open_csv_files" option of the "Indexing" section.
+_DEFAULT_MAX_OPEN_CSV_FILES = 64
+
+# Units allowed for the windows of tool data rollups, see the
+# "tool_data_rollups" option of the "Indexing" section.
+_ROLLUP_WINDOW_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+# Elasticsearch types of the numeric tool data fields which are rolled up.
+_NUMERIC_MAPPING_TYPES = frozenset(
+    ("long", "integer", "short", "byte", "double", "float")
+)
+
 # Maximum length of messages logged by es_index()
 _MAX_ERRMSG_LENGTH = 16384
 
@@ -138,7 +176,46 @@ class PbenchTemplates:
 
     _fpat = re.compile(r"tool-data-frag-(?P<toolname>.+)\.json")
 
-    def __init__(self, basepath, idx_prefix, logger, known_tool_handlers=None, _dbg=0):
+    @staticmethod
+    def _mk_rollup_frag(frag, path=()):
+        """Derive the mapping fragment of a tool's rollup documents from the
+        mapping fragment of its tool data documents, where each numeric field
+        becomes an object of its min, max, mean, and last values.
+
+        Returns a tuple of the rollup mapping fragment, and the set of paths
+        (tuples of field names) of the fields mapped with a non-numeric type.
+        """
+        rollup_frag = {}
+        non_numeric = set()
+        for field, fmap in frag["properties"].items():
+            if not path and field == "@idx":
+                continue
+            fpath = path + (field,)
+            if "properties" in fmap:
+                sub_frag, sub_non_numeric = PbenchTemplates._mk_rollup_frag(fmap, fpath)
+                rollup_frag[field] = sub_frag
+                non_numeric |= sub_non_numeric
+            elif fmap.get("type") in _NUMERIC_MAPPING_TYPES:
+                rollup_frag[field] = dict(
+                    properties=dict(
+                        min=fmap, max=fmap, mean=dict(type="double"), last=fmap
+                    )
+                )
+            else:
+                rollup_frag[field] = fmap
+                non_numeric.add(fpath)
+        return dict(properties=rollup_frag), non_numeric
+
+    def __init__(
+        self,
+        basepath,
+        idx_prefix,
+        logger,
+        known_tool_handlers=None,
+        rollup_windows=None,
+        compact_results=False,
+        _dbg=0,
+    ):
         # Where to find the mappings
         MAPPING_DIR = os.path.join(os.path.dirname(basepath), "lib", "mappings")
         # Where to find the settings
@@ -149,6 +226,14 @@ class PbenchTemplates:
         self.idx_prefix = idx_prefix
         self.logger = logger
         self.known_tool_handlers = known_tool_handlers
+        self.rollup_windows = rollup_windows
+        # The paths of the non-numeric fields of each tool, which identify a
+        # series of rolled up values.
+        self.rollup_non_numeric = {}
+        self.compact_results = compact_results
+        # Index names already generated, by template name, tool name, and the
+        # day of the @timestamp (see generate_index_name()).
+        self._index_names = {}
         self._dbg = _dbg
 
         # Pbench report status mapping and settings.
@@ -289,6 +374,32 @@ class PbenchTemplates:
         self.templates[result_template_name] = result_template_body
         self.versions["result-data"] = idxver
 
+        if self.compact_results:
+            # The compact result data timeseries documents have no parent, so
+            # they are kept in indices of their own.
+            mfile = os.path.join(MAPPING_DIR, "result-data-timeseries.json")
+            key, mapping = self._fetch_mapping(mfile)
+            try:
+                idxver = mapping["_meta"]["version"]
+            except KeyError:
+                raise MappingFileError(
+                    "{} mapping missing _meta field in {}".format(key, mfile)
+                )
+            ip = self.index_patterns["result-data-timeseries"]
+            idxname = ip["idxname"]
+            self.templates[
+                ip["template_name"].format(
+                    prefix=self.idx_prefix, version=idxver, idxname=idxname
+                )
+            ] = dict(
+                template=ip["template_pat"].format(
+                    prefix=self.idx_prefix, version=idxver, idxname=idxname
+                ),
+                settings=result_settings,
+                mappings={key: mapping},
+            )
+            self.versions["result-data-timeseries"] = idxver
+
         # Now for the tool data mappings. First we fetch the base skeleton they
         # all share.
         skel = self._load_json(os.path.join(MAPPING_DIR, "tool-data-skel.json"))
@@ -348,6 +459,40 @@ class PbenchTemplates:
             )
             self.templates[tool_template_name] = tool_template_body
 
+        if self.rollup_windows:
+            # The tool data rollup mappings share the tool data skeleton, with
+            # a "rollup" field describing the window, and a fragment derived
+            # from the tool's own.
+            mfile = os.path.join(MAPPING_DIR, "tool-data-rollup-frag.json")
+            rollup = self._load_json(mfile)
+            try:
+                rollup_ver = rollup.pop("_meta")["version"]
+            except KeyError:
+                raise MappingFileError(
+                    "tool-data-rollup mapping missing _meta field in {}".format(mfile)
+                )
+            ip = self.index_patterns["tool-data-rollup"]
+            for toolname, frag in tool_mapping_frags.items():
+                rollup_skel = copy.deepcopy(skel)
+                idxname = ip["idxname"].format(tool=toolname)
+                self.versions[idxname] = rollup_ver
+                rollup_skel["_meta"] = dict(version=rollup_ver)
+                rollup_skel["properties"]["rollup"] = rollup
+                (
+                    rollup_skel["properties"][toolname],
+                    self.rollup_non_numeric[toolname],
+                ) = self._mk_rollup_frag(frag)
+                template_name = ip["template_name"].format(
+                    prefix=self.idx_prefix, version=rollup_ver, idxname=idxname
+                )
+                self.templates[template_name] = dict(
+                    template=ip["template_pat"].format(
+                        prefix=self.idx_prefix, version=rollup_ver, idxname=idxname
+                    ),
+                    settings=tool_settings,
+                    mappings=dict([("pbench-{}".format(idxname), rollup_skel)]),
+                )
+
         self.counters = Counter()
 
     index_patterns = {
@@ -360,6 +505,15 @@ class PbenchTemplates:
             " benchmark) for all pbench result tar balls;"
             " e.g prefix.v0.result-data.YYYY-MM-DD",
         },
+        "result-data-timeseries": {
+            "idxname": "result-data-timeseries",
+            "template_name": "{prefix}.v{version}.{idxname}",
+            "template_pat": "{prefix}.v{version}.{idxname}.*",
+            "template": "{prefix}.v{version}.{idxname}.{year}-{month}-{day}",
+            "desc": "Daily compact result data, one document per sample"
+            " holding its timeseries as arrays with summary statistics, when"
+            " enabled; e.g prefix.v0.result-data-timeseries.YYYY-MM-DD",
+        },
         "run-data": {
             "idxname": "run",
             "template_name": "{prefix}.v{version}.{idxname}",
@@ -394,6 +548,15 @@ class PbenchTemplates:
             "desc": "Daily tool data for all tools land in indices"
             " named by tool; e.g. prefix.v0.tool-data-iostat.YYYY-MM-DD",
         },
+        "tool-data-rollup": {
+            "idxname": "tool-data-rollup-{tool}",
+            "template_name": "{prefix}.v{version}.{idxname}",
+            "template_pat": "{prefix}.v{version}.{idxname}.*",
+            "template": "{prefix}.v{version}.{idxname}.{year}-{month}",
+            "desc": "Monthly rollups (min, max, mean, and last values over"
+            " configured windows) of the tool data of all tools, when enabled;"
+            " e.g. prefix.v0.tool-data-rollup-iostat.YYYY-MM",
+        },
     }
 
     def dump_idx_patterns(self):
@@ -401,7 +564,11 @@ class PbenchTemplates:
         pattern_names = [idx for idx in patterns]
         pattern_names.sort()
         for idx in pattern_names:
-            if idx != "tool-data":
+            if idx == "tool-data-rollup" and not self.rollup_windows:
+                continue
+            if idx == "result-data-timeseries" and not self.compact_results:
+                continue
+            if idx not in ("tool-data", "tool-data-rollup"):
                 idxname = patterns[idx]["idxname"]
                 print(
                     patterns[idx]["template"].format(
@@ -488,7 +655,18 @@ class PbenchTemplates:
 
     def generate_index_name(self, template_name, source, toolname=None):
         """Return a fully formed index name given its template, prefix, source
-        data (for an @timestamp field) and an optional tool name."""
+        data (for an @timestamp field) and an optional tool name.
+
+        Index names are memoized by template name, tool name, and day, as
+        nearly all the documents of a tar ball fall on one or two days.
+        """
+        try:
+            return self._index_names[
+                (template_name, toolname, source["@timestamp"].partition("T")[0])
+            ]
+        except (KeyError, TypeError, AttributeError):
+            # Either not generated yet, or a bad source, reported below.
+            pass
         try:
             template = self.index_patterns[template_name]["template"]
             idxname_tmpl = self.index_patterns[template_name]["idxname"]
@@ -524,7 +702,7 @@ class PbenchTemplates:
             self.counters["bad_source"] += 1
             raise Exception(f"Failed to generate index name, {e}, source: {source!r}")
         year, month, day = ts_val.split("T", 1)[0].split("-")[0:3]
-        return template.format(
+        idx_name = template.format(
             prefix=self.idx_prefix,
             version=version,
             idxname=idxname,
@@ -532,6 +710,10 @@ class PbenchTemplates:
             month=month,
             day=day,
         )
+        self._index_names[
+            (template_name, toolname, ts_val.partition("T")[0])
+        ] = idx_name
+        return idx_name
 
 
 def _get_es_hosts(config, logger):
@@ -875,6 +1057,12 @@ class PbenchData:
         except KeyError:
             pass
         self.counters = Counter()
+        # Cache of the formatted date portion of timestamps, by days since
+        # the epoch.
+        self._ts_date_prefixes = {}
+        # Whether a day (the date portion of a @timestamp) is earlier than the
+        # start of the pbench run, by day.
+        self._days_earlier = {}
 
     @staticmethod
     def make_source_id(source, _parent=None):
@@ -959,20 +1147,109 @@ class PbenchData:
             )
         return ts.strftime(_STD_DATETIME_FMT)
 
+    def mk_abs_timestamps_millis(self, orig_tss):
+        """Convert a sequence (column) of millis since the epoch timestamps
+        as one vector, see mk_abs_timestamp_millis().
+
+        Timestamps which are whole numbers of milliseconds are converted with
+        integer arithmetic: the column is classified as absolute or relative
+        to the start of the run once, from its first timestamp, and the ISO
+        strings are formed from a cache of per-day prefixes plus the time of
+        day.  Any other timestamp, or one which does not fit that
+        classification or the run, is converted by mk_abs_timestamp_millis(),
+        so the results, errors and BadDate counters are the same.
+
+        Returns a tuple of the list of converted timestamps and the BadDate
+        exception raised for the first timestamp which could not be
+        converted, or None if they all were.  The returned list only holds the
+        timestamps converted before that failure.
+        """
+        start_us = (self.ptb.start_run_ts - _EPOCH) // _ONE_MICROSECOND
+        end_us = (self.ptb.end_run_ts - _EPOCH) // _ONE_MICROSECOND
+        prefixes = self._ts_date_prefixes
+        relative = None
+        ts_vals = []
+        for orig_ts in orig_tss:
+            if type(orig_ts) is str and orig_ts.isdecimal():
+                ts_ms = int(orig_ts)
+            elif type(orig_ts) is int and orig_ts >= 0:
+                ts_ms = orig_ts
+            else:
+                ts_ms = _MAX_EXACT_TS_MILLIS
+            if ts_ms < _MAX_EXACT_TS_MILLIS:
+                ts_us = ts_ms * 1000
+                if relative is None:
+                    relative = ts_us < start_us
+                if relative:
+                    if ts_us < start_us:
+                        ts_us += start_us
+                    else:
+                        ts_us = None
+                elif ts_us < start_us:
+                    ts_us = None
+                if ts_us is not None and ts_us <= end_us:
+                    secs, usecs = divmod(ts_us, 1000000)
+                    days, secs = divmod(secs, 86400)
+                    try:
+                        prefix = prefixes[days]
+                    except KeyError:
+                        prefix = prefixes[days] = (
+                            _EPOCH + timedelta(days=days)
+                        ).strftime(_STD_DATE_PREFIX_FMT)
+                    hours, secs = divmod(secs, 3600)
+                    mins, secs = divmod(secs, 60)
+                    ts_vals.append(
+                        "%s%02d:%02d:%02d.%06d" % (prefix, hours, mins, secs, usecs)
+                    )
+                    continue
+            try:
+                ts_vals.append(self.mk_abs_timestamp_millis(orig_ts))
+            except BadDate as exc:
+                return ts_vals, exc
+        return ts_vals, None
+
     def generate_index_name(self, template_name, source, toolname=None):
         """Return a fully formed index name given its template, prefix, source
         data (for an @timestamp field) and an optional tool name."""
-        year, month, day = source["@timestamp"].split("T", 1)[0].split("-")[0:3]
-        if (year, month, day) < (self.year, self.month, self.day):
+        ts_day = source["@timestamp"].partition("T")[0]
+        try:
+            earlier = self._days_earlier[ts_day]
+        except KeyError:
+            year, month, day = ts_day.split("-")[0:3]
+            earlier = (year, month, day) < (self.year, self.month, self.day)
+            self._days_earlier[ts_day] = earlier
+        if earlier:
             raise BadDate(
                 "TS y/m/d, {!r}, earlier than pbench run, {!r}".format(
-                    (year, month, day), (self.year, self.month, self.day)
+                    tuple(ts_day.split("-")[0:3]), (self.year, self.month, self.day)
                 )
             )
         return self.idxctx.templates.generate_index_name(
             template_name, source, toolname=toolname
         )
 
+    def route_sources(self, template_name, sources, toolname=None):
+        """Generate the index name and item for each item of sources, tuples
+        whose first element is a source document, skipping the items whose
+        @timestamp is earlier than the pbench run (see generate_index_name()).
+
+        Consecutive documents on the same day, nearly all of them, are given
+        the index name of the previous document without looking it up.
+        """
+        ts_prefix = idx_name = None
+        for item in sources:
+            ts_val = item[0]["@timestamp"]
+            if ts_prefix is None or not ts_val.startswith(ts_prefix):
+                try:
+                    idx_name = self.generate_index_name(
+                        template_name, item[0], toolname=toolname
+                    )
+                except BadDate:
+                    ts_prefix = None
+                    continue
+                ts_prefix = ts_val.partition("T")[0] + "T"
+            yield idx_name, item
+
 
 ###########################################################################
 #
@@ -1014,11 +1291,7 @@ class ResultData(PbenchData):
         Fetch the list of directories containing result.json files for this
         experiment; return a list directory path names.
         """
-        paths = [
-            x.name
-            for x in ptb.members
-            if x.isfile() and (os.path.basename(x.name) == "result.json")
-        ]
+        paths = ptb.members.files_named("result.json")
         dirnames = []
         for p in paths:
             dirnames.append(os.path.dirname(p))
@@ -1550,23 +1823,16 @@ class ResultData(PbenchData):
 
             result_json = os.path.join(self.ptb.extracted_root, dirname, "result.json")
             try:
-                # Read the file and interpret it as a JSON document.
-                with open(result_json) as fp:
-                    results = json.load(fp)
+                # Read the file and interpret it as a JSON document; large
+                # files are decoded one iteration at a time.
+                results = load_json_array(result_json)
             except Exception as e:
-                self.logger.warning(
-                    "result-data-indexing: encountered invalid JSON file,"
-                    " {}: {:r} ({})",
-                    result_json,
-                    e,
-                    self.ptb._tbctx,
-                )
-                self.counters["not_valid_json_file"] += 1
+                self._invalid_json_file(result_json, e)
                 continue
 
             # The outer results object should be an array of iterations. Probe
             # to see if that is true.
-            if not isinstance(results, list):
+            if not isinstance(results, (list, JsonArrayStream)):
                 self.logger.warning(
                     "result-data-indexing: encountered unexpected"
                     " JSON file format, %s ({})",
@@ -1646,8 +1912,19 @@ class ResultData(PbenchData):
                     iter_data, iter_name, iter_number, result_json
                 ):
                     yield src, _id, _parent, _type
+            if isinstance(results, JsonArrayStream) and results.error:
+                self._invalid_json_file(result_json, results.error)
         return
 
+    def _invalid_json_file(self, result_json, e):
+        self.logger.warning(
+            "result-data-indexing: encountered invalid JSON file, {}: {!r} ({})",
+            result_json,
+            e,
+            self.ptb._tbctx,
+        )
+        self.counters["not_valid_json_file"] += 1
+
     def _handle_iteration(self, iter_data, iter_name, iter_number, result_json):
         """Generate source documents for iteration data.
         """
@@ -1810,7 +2087,11 @@ class ResultData(PbenchData):
         # N samples, so we yield N sample documents, each followed by M result
         # data documents.
         for source, _parent, _type in ResultData.gen_sources(
-            self, iter_data, iteration, self.mk_abs_timestamp_millis
+            self,
+            iter_data,
+            iteration,
+            self.mk_abs_timestamp_millis,
+            timeseries=self.idxctx.result_timeseries,
         ):
             yield source, PbenchData.make_source_id(
                 source, _parent=_parent
@@ -1903,9 +2184,60 @@ class ResultData(PbenchData):
         return result_el, samples
 
     @staticmethod
-    def gen_sources(obj, results, iteration, cvt_ts):
+    def make_compact_timeseries(tseries, cvt_ts):
+        """Return the compact form of a sample's timeseries: its values (and
+        any other fields) as parallel arrays, with summary statistics of the
+        values.  When the original timestamps are evenly spaced, only the
+        interval between them is recorded, otherwise their array is.
+        """
+        dates = [res["date"] for res in tseries]
+        compact = _dict_const([("start", cvt_ts(dates[0])), ("end", cvt_ts(dates[-1]))])
+        try:
+            intervals = set(
+                int(dates[i + 1]) - int(dates[i]) for i in range(len(dates) - 1)
+            )
+        except (TypeError, ValueError):
+            intervals = None
+        if intervals is not None and len(intervals) == 1:
+            compact["interval_ms"] = intervals.pop()
+        elif len(dates) > 1:
+            compact["timestamps"] = [cvt_ts(date) for date in dates]
+        fields = []
+        for res in tseries:
+            for field in res:
+                if field != "date" and field not in fields:
+                    fields.append(field)
+        for field in fields:
+            name = "values" if field == "value" else field
+            if name == "read(0) or write(1)":
+                name = "read_or_write"
+            compact[name] = [res.get(field) for res in tseries]
+        values = [
+            float(val)
+            for val in compact.get("values", [])
+            if isinstance(val, (int, float)) and not isinstance(val, bool)
+        ]
+        compact["count"] = len(values)
+        if values:
+            total = math.fsum(values)
+            mean = total / len(values)
+            compact["min"] = min(values)
+            compact["max"] = max(values)
+            compact["mean"] = mean
+            compact["stddev"] = math.sqrt(
+                math.fsum((val - mean) ** 2 for val in values) / len(values)
+            )
+            compact["sum"] = total
+        return compact
+
+    @staticmethod
+    def gen_sources(obj, results, iteration, cvt_ts, timeseries="points"):
         """Generate actual source documents from the given results object.
 
+        The timeseries of each sample is emitted as one small document per
+        entry ("points"), as one compact document per sample ("compact"), or
+        both ("both").
+
         This generator yields: source, parent_id, doc_type
         """
         iteration_md_subset = _dict_const(
@@ -2006,6 +2338,25 @@ class ResultData(PbenchData):
                         if not tseries:
                             # No timeseries documents to emit.
                             continue
+                        if timeseries != "points":
+                            source = _dict_const(
+                                [
+                                    ("@timestamp", start_ts),
+                                    ("@timestamp_original", str(start["date"])),
+                                    ("run", run_md_subset),
+                                    ("iteration", iteration_md_subset),
+                                    ("sample", sample_md_subset),
+                                    (
+                                        "timeseries",
+                                        ResultData.make_compact_timeseries(
+                                            tseries, cvt_ts
+                                        ),
+                                    ),
+                                ]
+                            )
+                            yield source, None, "timeseries"
+                            if timeseries == "compact":
+                                continue
                         # Now we can yield each entry of the timeseries
                         # data for this sample.
                         prev_orig_ts = None
@@ -2083,6 +2434,12 @@ class ResultData(PbenchData):
 #   "json":               used with "json" handling, data in a file is an
 #                         array of JSON documents
 #
+# The "@prospectus" of a "periodic_timestamp" tool can also name, in its
+# "parser" field, which implementation of the stdout sub-formats to use:
+#   "generic":  the straightforward line by line parsers (the default)
+#   "compiled": parsers which learn the layout of the first record, and reuse
+#               it for the following ones, emitting the same records
+#
 # The handler record dictionaries in "patterns" list contain a number of
 # fields:
 #   required:
@@ -2399,7 +2756,11 @@ _known_tool_handlers = {
         ],
     },
     "proc-interrupts": {
-        "@prospectus": {"handling": "stdout", "method": "periodic_timestamp"},
+        "@prospectus": {
+            "handling": "stdout",
+            "method": "periodic_timestamp",
+            "parser": "compiled",
+        },
         "patterns": [
             {
                 "pattern": re.compile(r"^proc-interrupts-stdout\.txt$"),
@@ -2411,7 +2772,11 @@ _known_tool_handlers = {
     "proc-vmstat": {
         # The proc-vmstat tool writes the timestamp and key value pairs to
         # the stdout text file which is not json or csv.
-        "@prospectus": {"handling": "stdout", "method": "periodic_timestamp"},
+        "@prospectus": {
+            "handling": "stdout",
+            "method": "periodic_timestamp",
+            "parser": "compiled",
+        },
         "patterns": [
             {
                 "pattern": re.compile(r"^proc-vmstat-stdout\.txt$"),
@@ -2445,6 +2810,80 @@ def _noop(arg):
     return arg
 
 
+class CsvFiles:
+    """Manager of the .csv files of the tool data of a tar ball.
+
+    Only the header of a .csv file is read when it is found (see
+    ToolData.get_csv_files()); the body of the file is opened when a document
+    generator first reads rows from it, and closed when all its rows have been
+    read or the generator closes it.  At most "max_open" files are open at a
+    time: opening one more closes the least recently read file, which is
+    re-opened at the same offset when rows are next read from it.  The peak
+    number of open files is kept in "peak".
+    """
+
+    def __init__(self, root, max_open):
+        assert max_open > 0, "max_open must be positive, {!r}".format(max_open)
+        self.root = root
+        self.max_open = max_open
+        self.peak = 0
+        # Open .csv files, by path, in least to most recently read order,
+        # each entry a tuple of the file object and its csv reader.
+        self._open = OrderedDict()
+        # The offset of the next row to read of each .csv file not open.
+        self._offsets = {}
+
+    def _reader(self, fp):
+        # Lines are read with readline() so that the file offset is
+        # available when the file has to be closed before it is done.
+        return csv.reader(iter(fp.readline, ""))
+
+    def read_header(self, path):
+        """Read and return the header row of the given .csv file."""
+        with open(os.path.join(self.root, path)) as fp:
+            header = next(self._reader(fp))
+            self._offsets[path] = fp.tell()
+        return header
+
+    def read_rows(self, path, count):
+        """Return a list of up to "count" rows read from the given .csv
+        file, the empty list once all its rows have been read.
+        """
+        try:
+            fp, reader = self._open[path]
+        except KeyError:
+            try:
+                offset = self._offsets.pop(path)
+            except KeyError:
+                # All the rows of this file have been read.
+                return []
+            while len(self._open) >= self.max_open:
+                lru_path, (lru_fp, _) = self._open.popitem(last=False)
+                self._offsets[lru_path] = lru_fp.tell()
+                lru_fp.close()
+            fp = open(os.path.join(self.root, path))
+            fp.seek(offset)
+            reader = self._reader(fp)
+            self._open[path] = (fp, reader)
+            self.peak = max(self.peak, len(self._open))
+        else:
+            self._open.move_to_end(path)
+        rows = list(islice(reader, count))
+        if len(rows) < count:
+            self.close(path)
+        return rows
+
+    def close(self, path):
+        """Close the given .csv file, forgetting any rows not yet read."""
+        self._offsets.pop(path, None)
+        try:
+            fp, _ = self._open.pop(path)
+        except KeyError:
+            pass
+        else:
+            fp.close()
+
+
 class ToolData(PbenchData):
     def __init__(self, ptb, iteration, sample, host, tool):
         super().__init__(ptb)
@@ -2695,45 +3134,57 @@ class ToolData(PbenchData):
                         if colmd:
                             metadata[identifier] = colmd
 
+        try:
+            tdfilter = self.idxctx.tool_filters[self.toolname]
+        except KeyError:
+            tdfilter = None
+        else:
+            dropped, folded = tdfilter.scan(
+                self, identifiers, metric_mapping, field_mapping
+            )
+            self.logger.info(
+                "tool-data-indexing: tool {}, filter dropped {:d} and folded"
+                " {:d} of {:d} identifiers for {}",
+                self.toolname,
+                len(dropped),
+                len(folded),
+                len(identifiers),
+                self.basepath,
+            )
+            if not dropped and not folded:
+                tdfilter = None
+
         # At this point, we have processed all the data about csv files
         # and are ready to start reading the contents of all the csv
         # files and building the unified records.
-        def rows_generator():
+        def blocks_generator():
             # We use this generator to highlight the process of reading from
-            # all the csv files, reading one row from each of the csv files,
-            # returning that as a dictionary of csv file to row read, which
-            # in turn is yielded by the generator.
-            idx = 0
-            while True:
-                # Read a row from each .csv file
-                rows = _dict_const()
+            # all the csv files in lock step, reading a block of rows from
+            # each of the csv files, returning that as a dictionary of csv
+            # file to the rows read, which in turn is yielded by the
+            # generator.  Only the last blocks read can be shorter than the
+            # others, when the csv files have mismatched numbers of rows.
+            try:
+                while True:
+                    blocks = _dict_const()
+                    for csvf in self.files:
+                        rows = self.ptb.csv_files.read_rows(
+                            csvf["path"], self._csv_block_rows
+                        )
+                        if rows:
+                            blocks[csvf["basename"]] = rows
+                    if not blocks:
+                        # None of the csv file readers returned any rows to
+                        # process, so we're done.
+                        break
+                    yield blocks
+            finally:
                 for csvf in self.files:
-                    try:
-                        rows[csvf["basename"]] = next(csvf["reader"])
-                    except StopIteration:
-                        # This should handle the case of mismatched number of
-                        # rows across all .csv files. All readers which have
-                        # finished will emit a StopIteration.
-                        pass
-                if not rows:
-                    # None of the csv file readers returned any rows to
-                    # process, so we're done.
-                    break
-                # Yield the one dictionary that contains each newly read row
-                # from all the csv files.
-                yield idx, rows
-                idx += 1
+                    self.ptb.csv_files.close(csvf["path"])
 
-        self.logger.info(
-            "tool-data-indexing: tool {}, gen unified begin for {}",
-            self.toolname,
-            self.basepath,
-        )
-        prev_first = None
-        prev_ts_val = None
-        for idx, rows in rows_generator():
-            # Verify timestamps are all the same for this row.
-            tstamp = None
+        def row_timestamp(rows):
+            # Verify timestamps are all the same for this row, returning the
+            # first one.
             first = None
             for fname in rows.keys():
                 tstamp = rows[fname][0]
@@ -2748,6 +3199,9 @@ class ToolData(PbenchData):
                     )
                     self.counters["inconsistent_timestamps_across_csv_files"] += 1
                     break
+            return first
+
+        def new_datum(idx, ts_val, first):
             # We are now ready to create a base document per identifier to
             # hold all the fields from the various columns. Given the two
             # input dictionaries, "identifiers" and "metadata", we create
@@ -2773,18 +3227,6 @@ class ToolData(PbenchData):
             #                        self.toolname: { "id": "id1",
             #                                         "f1": "faz",
             #                                         "f2": "baz" } },
-
-            # The timestamp is taken from the "first" timestamp, converted
-            # to a floating point value in seconds, and then formatted as a
-            # string.
-            ts_val = self.mk_abs_timestamp_millis(first)
-            if prev_ts_val is not None:
-                assert prev_ts_val <= ts_val, (
-                    "prev_ts_val (%r, %r) > first (%r, %r)"
-                    % (prev_ts_val, prev_first, ts_val, first)
-                )
-            prev_first = first
-            prev_ts_val = ts_val
             datum = _dict_const()
             for identifier in identifiers.keys():
                 datum[identifier] = _dict_const(
@@ -2810,35 +3252,98 @@ class ToolData(PbenchData):
                     datum[identifier][self.toolname].update(md)
                 for klass in class_list.keys():
                     datum[identifier][self.toolname][klass] = _dict_const()
-            # Now we can perform the mapping from multiple .csv files to JSON
-            # documents using a known field hierarchy (no identifiers in field
-            # names) with the identifiers as additional metadata. Note that we
-            # are constructing this document just from the current row of data
-            # taken from all .csv files (assumes timestamps are the same).
-            for fname, row in rows.items():
-                klass, metric, converter = metric_mapping[fname]
-                for idx, val in enumerate(row):
-                    if idx == 0:
-                        continue
-                    # Given an fname and a column offset, return the
-                    # identifier from the header
-                    identifier, subfield = field_mapping[fname][idx]
-                    if klass is not None:
-                        _d = datum[identifier][self.toolname][klass]
-                    else:
-                        _d = datum[identifier][self.toolname]
-                    if subfield:
-                        if metric not in _d:
-                            _d[metric] = _dict_const()
-                        _d[metric][subfield] = converter(val)
-                    else:
-                        _d[metric] = converter(val)
-            # At this point we have fully mapped all data from all .csv files
-            # to their proper fields for each identifier. Now we can yield
-            # records for each of the identifiers.
-            for _id, source in datum.items():
-                source_id = PbenchData.make_source_id(source)
-                yield source, source_id
+            return datum
+
+        def block_timestamps(blocks, nrows):
+            # The timestamp column of a block: the timestamp of each row,
+            # taken from the first .csv file which has that row, up to the
+            # first row with no columns at all in any file.
+            firsts = []
+            for i in range(nrows):
+                rows = [frows[i] for frows in blocks.values() if i < len(frows)]
+                if not all(rows):
+                    break
+                firsts.append(rows[0][0])
+            return firsts
+
+        # The data columns of each .csv file, in order, with the identifier
+        # / subfield tuple each one maps to.
+        columns_mapping = _dict_const()
+        for fname, fmap in field_mapping.items():
+            columns_mapping[fname] = [fmap[col] for col in fmap if col != 0]
+
+        self.logger.info(
+            "tool-data-indexing: tool {}, gen unified begin for {}",
+            self.toolname,
+            self.basepath,
+        )
+        prev_first = None
+        prev_ts_val = None
+        idx = 0
+        for blocks in blocks_generator():
+            nrows = max(len(rows) for rows in blocks.values())
+            # The timestamps of the block are converted as one vector, up to
+            # the first one which fails to convert.
+            ts_vals, ts_exc = self.mk_abs_timestamps_millis(
+                block_timestamps(blocks, nrows)
+            )
+            for i in range(nrows):
+                rows = _dict_const(
+                    (fname, frows[i])
+                    for fname, frows in blocks.items()
+                    if i < len(frows)
+                )
+                first = row_timestamp(rows)
+                if i == len(ts_vals):
+                    raise ts_exc
+                # The timestamp is taken from the "first" timestamp,
+                # converted to a floating point value in seconds, and then
+                # formatted as a string.
+                ts_val = ts_vals[i]
+                if prev_ts_val is not None:
+                    assert prev_ts_val <= ts_val, (
+                        "prev_ts_val (%r, %r) > first (%r, %r)"
+                        % (prev_ts_val, prev_first, ts_val, first)
+                    )
+                prev_first = first
+                prev_ts_val = ts_val
+                datum = new_datum(idx, ts_val, first)
+                # Now we can perform the mapping from multiple .csv files to
+                # JSON documents using a known field hierarchy (no identifiers
+                # in field names) with the identifiers as additional metadata.
+                # Note that we are constructing this document just from the
+                # current row of data taken from all .csv files (assumes
+                # timestamps are the same).
+                for fname, row in rows.items():
+                    klass, metric, converter = metric_mapping[fname]
+                    columns = columns_mapping[fname]
+                    # The data columns of the row are converted in one pass;
+                    # a row shorter than its header fills fewer fields.
+                    for (identifier, subfield), val in zip(
+                        columns, map(converter, row[1:])
+                    ):
+                        if klass is not None:
+                            _d = datum[identifier][self.toolname][klass]
+                        else:
+                            _d = datum[identifier][self.toolname]
+                        if subfield:
+                            if metric not in _d:
+                                _d[metric] = _dict_const()
+                            _d[metric][subfield] = val
+                        else:
+                            _d[metric] = val
+                    if len(row) > len(columns) + 1:
+                        # The header has no identifier for the extra column.
+                        raise KeyError(len(columns) + 1)
+                # At this point we have fully mapped all data from all .csv
+                # files to their proper fields for each identifier. Now we can
+                # yield records for each of the identifiers.
+                if tdfilter is not None:
+                    datum = tdfilter.apply(datum, dropped, folded)
+                for _id, source in datum.items():
+                    source_id = PbenchData.make_source_id(source)
+                    yield source, source_id
+                idx += 1
         self.logger.info(
             "tool-data-indexing: tool {}, end unified for {}",
             self.toolname,
@@ -2861,7 +3366,6 @@ class ToolData(PbenchData):
                 converter = handler_rec["converter"]
             except KeyError:
                 converter = _noop
-            reader = csvf["reader"]
 
             if "pattern" not in handler_rec:
                 # No pattern to consider to find matching files.
@@ -2884,38 +3388,53 @@ class ToolData(PbenchData):
                 self.toolname,
                 csvf["path"],
             )
-            for row in reader:
-                for col, val in enumerate(row):
+            ncols = len(header)
+            names = header[1:]
+            for rows in self._csv_blocks(csvf["path"]):
+                # The timestamp column of the block is converted as one
+                # vector, up to the first row without columns or the first
+                # timestamp which fails to convert.
+                tss = []
+                for row in rows:
+                    if not row:
+                        break
+                    tss.append(row[0])
+                ts_vals, ts_exc = self.mk_abs_timestamps_millis(tss)
+                for i, row in enumerate(rows):
                     # The timestamp column is index zero.
-                    if col == 0:
-                        ts_val = self.mk_abs_timestamp_millis(val)
-                        if prev_ts_val is not None:
-                            assert prev_ts_val <= ts_val, (
-                                "prev_ts_val (%r, %r) > ts_val (%r, %r)"
-                                % (prev_ts_val, prev_val, ts_val, val)
-                            )
-                        prev_val = val
-                        prev_ts_val = ts_val
-                        datum = _dict_const()
-                        datum["@timestamp"] = ts_val
-                        datum["@timestamp_original"] = str(val)
-                        datum["run"] = self.run_metadata
-                        datum["iteration"] = self.iteration_metadata
-                        datum["sample"] = self.sample_metadata
-                        datum[self.toolname] = _dict_const([("id", datum_id)])
-                        datum[self.toolname]["@idx"] = idx
-                        if klass is not None:
-                            _d = datum[self.toolname][klass] = _dict_const()
-                        else:
-                            _d = datum[self.toolname]
-                        _d[metric] = _dict_const()
+                    val = row[0]
+                    if i == len(ts_vals):
+                        raise ts_exc
+                    ts_val = ts_vals[i]
+                    if prev_ts_val is not None:
+                        assert prev_ts_val <= ts_val, (
+                            "prev_ts_val (%r, %r) > ts_val (%r, %r)"
+                            % (prev_ts_val, prev_val, ts_val, val)
+                        )
+                    prev_val = val
+                    prev_ts_val = ts_val
+                    datum = _dict_const()
+                    datum["@timestamp"] = ts_val
+                    datum["@timestamp_original"] = str(val)
+                    datum["run"] = self.run_metadata
+                    datum["iteration"] = self.iteration_metadata
+                    datum["sample"] = self.sample_metadata
+                    datum[self.toolname] = _dict_const([("id", datum_id)])
+                    datum[self.toolname]["@idx"] = idx
+                    if klass is not None:
+                        _d = datum[self.toolname][klass] = _dict_const()
                     else:
-                        column = header[col]
-                        _d[metric][column] = converter(val)
-
-                source_id = PbenchData.make_source_id(datum)
-                yield datum, source_id
-                idx += 1
+                        _d = datum[self.toolname]
+                    # The data columns of the row are converted in one pass; a
+                    # row shorter than the header fills fewer fields.
+                    _d[metric] = _dict_const(zip(names, map(converter, row[1:])))
+                    if len(row) > ncols:
+                        # The header has no name for the extra column.
+                        raise IndexError("list index out of range")
+
+                    source_id = PbenchData.make_source_id(datum)
+                    yield datum, source_id
+                    idx += 1
             self.logger.info(
                 "tool-data-indexing: tool {}, individual end {}",
                 self.toolname,
@@ -2923,6 +3442,23 @@ class ToolData(PbenchData):
             )
         return
 
+    # Number of rows read at a time from each .csv file, the timestamps of
+    # which are then converted as one column.
+    _csv_block_rows = 1000
+
+    def _csv_blocks(self, path):
+        """Generator of the rows of a .csv file, in blocks (lists) of up to
+        _csv_block_rows rows, closing the file when done.
+        """
+        try:
+            while True:
+                rows = self.ptb.csv_files.read_rows(path, self._csv_block_rows)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            self.ptb.csv_files.close(path)
+
     # For some tools, proc-vmstat being the first case we encounter this,
     # depending on the version of the tool run and the version of the OS on
     # which the tool is run, the key names emitted can change version to
@@ -3175,13 +3711,12 @@ class ToolData(PbenchData):
                     records.append(record)
                     cpu_gauges.append(val)
                 if int_id in prev_gauges:
+                    # The rate of each CPU is taken against its own previous
+                    # gauge; CPUs which were not there before get no rate.
                     prev_cpu_gauges = prev_gauges[int_id]
-                    col = 0
                     duration = ts_orig - prev_ts_orig
-                    for record in records:
-                        value_diff = (
-                            record[self.toolname]["gauge"] - prev_cpu_gauges[col]
-                        )
+                    for record, prev_val in zip(records, prev_cpu_gauges):
+                        value_diff = record[self.toolname]["gauge"] - prev_val
                         the_rate = value_diff / duration
                         record[self.toolname]["rate"] = the_rate
                 prev_gauges[int_id] = cpu_gauges
@@ -3192,11 +3727,263 @@ class ToolData(PbenchData):
         )
         return
 
+    def _stdout_keyval_compiled(self, file_object, converter, path):
+        """Compiled variant of _stdout_keyval(), emitting the same records.
+
+        The (stat, substat) pair of each key, after any remap, is computed
+        once and kept in a table.  The keys of each record are remembered
+        along with their values, and when the following record has the same
+        key at the same position, which is the norm, its rate is computed
+        against the value at that position instead of being looked up in the
+        previous record's nested gauges.
+        """
+        toolname = self.toolname
+        try:
+            # Fetch the remaps table to see if any naming conflicts need to be
+            # resolved.
+            remaps = self._remaps[toolname]["key"]
+        except KeyError:
+            remaps = {}
+        # Table of the (stat, substat) pair of each key.
+        keymap = {}
+        record = None
+        prev_gauge = None
+        ts_orig = None
+        prev_ts_orig = None
+        # Keys and values of the current and previous records, in order.
+        keys = []
+        vals = []
+        prev_keys = []
+        prev_vals = []
+        prev_layouts = {}
+        idx = 0
+        self.logger.info(
+            "tool-data-indexing: tool {}, stdout keyval start {}", toolname, path
+        )
+        for line in file_object:
+            if line.startswith("timestamp:"):
+                prev_ts_orig = ts_orig
+                if record:
+                    # timestamp delimits records, yield last record.
+                    if not record[toolname]["rate"]:
+                        # For first record, rate will be empty, so
+                        # don't emit it.
+                        del record[toolname]["rate"]
+                    yield record
+                    idx += 1
+                    # Be sure to remember the record we just emitted
+                    # so that it is available for rate calculations.
+                    prev_gauge = record[toolname]["gauge"]
+                    prev_keys, keys = keys, []
+                    prev_vals, vals = vals, []
+                    # The values by position can only stand in for the
+                    # previous gauges if the layout of its keys maps each of
+                    # them to its own gauge.
+                    layout = tuple(prev_keys)
+                    try:
+                        prev_by_pos = prev_layouts[layout]
+                    except KeyError:
+                        prev_by_pos = prev_layouts[layout] = self._keyval_layout_ok(
+                            [keymap[key] for key in layout]
+                        )
+                    nprev = len(prev_keys) if prev_by_pos else 0
+                # Get the second column, the timestamp value, which is
+                # *seconds* since the epoch, and then convert to millis
+                # since the epoch.
+                ts_orig = float(line.split(":")[1])
+                if prev_ts_orig is not None:
+                    assert prev_ts_orig <= ts_orig, "prev_ts_orig %r > ts_orig %r" % (
+                        prev_ts_orig,
+                        ts_orig,
+                    )
+                    duration = ts_orig - prev_ts_orig
+                    substat_duration = (ts_orig / 1000) - (prev_ts_orig / 1000)
+                ts_str = self.mk_abs_timestamp_millis(ts_orig * 1000)
+                record = _dict_const()
+                record["@timestamp"] = ts_str
+                record["@timestamp_original"] = str(ts_orig)
+                record["run"] = self.run_metadata
+                record["iteration"] = self.iteration_metadata
+                record["sample"] = self.sample_metadata
+                record[toolname] = _dict_const()
+                record[toolname]["@idx"] = idx
+                record[toolname]["gauge"] = gauge = _dict_const()
+                record[toolname]["rate"] = rate = _dict_const()
+            elif ts_orig is None:
+                # We have not encountered a timestamp yet, so ignore
+                # all lines until the first timestamp.
+                continue
+            else:
+                key, value = line.strip().split(" ")
+                try:
+                    stat, substat = keymap[key]
+                except KeyError:
+                    parts = key.split("_", 1)
+                    if len(parts) == 1:
+                        stat, substat = keymap[key] = (remaps.get(key, key), None)
+                    else:
+                        stat, substat = keymap[key] = tuple(parts)
+                val = converter(value)
+                pos = len(keys)
+                keys.append(key)
+                vals.append(val)
+                if substat is None:
+                    gauge[stat] = val
+                    if prev_ts_orig:
+                        # Note we don't record the rate on the first value
+                        # encountered.
+                        ival = val if converter is int else int(value)
+                        if pos < nprev and prev_keys[pos] == key:
+                            prev_val = prev_vals[pos]
+                        else:
+                            prev_val = prev_gauge[stat]
+                        rate[stat] = (ival - prev_val) / duration
+                else:
+                    if stat not in gauge:
+                        gauge[stat] = _dict_const()
+                    gauge[stat][substat] = val
+                    if prev_ts_orig:
+                        # Note we don't record the rate on the first value
+                        # encountered.
+                        ival = val if converter is int else int(value)
+                        if pos < nprev and prev_keys[pos] == key:
+                            prev_val = prev_vals[pos]
+                        else:
+                            prev_val = prev_gauge[stat][substat]
+                        if stat not in rate:
+                            rate[stat] = _dict_const()
+                        rate[stat][substat] = (ival - prev_val) / substat_duration
+        if record and record[toolname]["gauge"]:
+            yield record
+        self.logger.info(
+            "tool-data-indexing: tool {}, stdout keyval end {}", toolname, path
+        )
+
+    @staticmethod
+    def _keyval_layout_ok(stats):
+        """Return True if the given sequence of (stat, substat) pairs of the
+        keys of a record, in order, leaves the value of each key in the
+        record's gauges, where _stdout_keyval() would look it up."""
+        gauge = {}
+        try:
+            for pos, (stat, substat) in enumerate(stats):
+                if substat is None:
+                    gauge[stat] = pos
+                else:
+                    gauge.setdefault(stat, {})[substat] = pos
+            for pos, (stat, substat) in enumerate(stats):
+                if (gauge[stat] if substat is None else gauge[stat][substat]) != pos:
+                    return False
+        except TypeError:
+            return False
+        return True
+
+    def _stdout_procint_compiled(self, file_object, converter, path):
+        """Compiled variant of _stdout_procint(), emitting the same records.
+
+        The CPU columns of a header are only parsed again when the header
+        changes, the metadata fields common to all the records of a timestamp
+        are gathered once per timestamp, and the rates of the per-CPU records
+        of an interrupt are computed from the array of its previous gauges.
+        """
+        toolname = self.toolname
+        cpu_column_ids = None
+        cpu_count = None
+        prev_header = None
+        ts_orig = None
+        prev_ts_orig = None
+        prev_gauges = _dict_const()
+        idx = 0
+        self.logger.info(
+            "tool-data-indexing: tool {}, stdout procint start {}", toolname, path
+        )
+        for line in file_object:
+            if line.startswith("timestamp:"):
+                idx += 1
+                prev_ts_orig = ts_orig
+                # Get the second column, the timestamp value, which is
+                # *seconds* since the epoch, and then convert to millis
+                # since the epoch.
+                ts_orig = float(line.split(":")[1])
+                if prev_ts_orig is not None:
+                    assert prev_ts_orig <= ts_orig, "prev_ts_orig %r > ts_orig %r" % (
+                        prev_ts_orig,
+                        ts_orig,
+                    )
+                ts_str = self.mk_abs_timestamp_millis(ts_orig * 1000)
+                common = _dict_const()
+                common["@timestamp"] = ts_str
+                common["@timestamp_original"] = str(ts_orig)
+                common["run"] = self.run_metadata
+                common["iteration"] = self.iteration_metadata
+                common["sample"] = self.sample_metadata
+                # The next line is assumed to be the header, so instead of
+                # looping to get to it, we just pull it out and process it
+                # here.
+                header = next(file_object)
+                if header != prev_header:
+                    columns = header.split()
+                    cpu_column_ids = []
+                    for cpu in columns:
+                        if not cpu.startswith("CPU"):
+                            raise Exception(
+                                "Bad proc-interrupts-stdout.txt file encountered"
+                            )
+                        cpu_column_ids.append(cpu[3:])
+                    cpu_count = len(cpu_column_ids)
+                    prev_header = header
+                continue
+            parts = line[:-1].split(None, 1 + cpu_count)
+            int_id = parts[0][:-1]
+            if int_id in ("ERR", "MIS"):
+                record = common.copy()
+                record[toolname] = _dict_const()
+                record[toolname]["@idx"] = idx
+                record[toolname]["int_id"] = int_id
+                record[toolname]["gauge"] = value = converter(parts[1])
+                if int_id in prev_gauges:
+                    duration = ts_orig - prev_ts_orig
+                    value_diff = value - prev_gauges[int_id]
+                    record[toolname]["rate"] = value_diff / duration
+                prev_gauges[int_id] = value
+                yield record
+            else:
+                cpu_gauges = [converter(parts[col]) for col in range(1, cpu_count + 1)]
+                head = _dict_const()
+                head["@idx"] = idx
+                head["int_id"] = int_id
+                head["cpu_id"] = None
+                head["desc"] = parts[-1]
+                records = []
+                for cpu, val in zip(cpu_column_ids, cpu_gauges):
+                    record = common.copy()
+                    record[toolname] = tool = head.copy()
+                    tool["cpu_id"] = cpu
+                    tool["gauge"] = val
+                    records.append(record)
+                if int_id in prev_gauges:
+                    duration = ts_orig - prev_ts_orig
+                    for record, val, prev_val in zip(
+                        records, cpu_gauges, prev_gauges[int_id]
+                    ):
+                        record[toolname]["rate"] = (val - prev_val) / duration
+                prev_gauges[int_id] = cpu_gauges
+                yield from records
+        self.logger.info(
+            "tool-data-indexing: tool {}, stdout procint end {}", toolname, path
+        )
+        return
+
     _subformats = {
         "procint": _stdout_procint,
         "keyval": _stdout_keyval,
     }
 
+    _compiled_subformats = {
+        "procint": _stdout_procint_compiled,
+        "keyval": _stdout_keyval_compiled,
+    }
+
     def _make_source_stdout(self):
         """Read the given set of files one at a time, emitting a record for each data
         set associated with a timestamp. The timestamp is expected to be on a
@@ -3207,8 +3994,13 @@ class ToolData(PbenchData):
         Where the timestamp value represents the number of seconds since the epoch.
 
         Following that timestamp line will be a payload of data formatted in
-        one of the supported "sub-formats" (see _subformats array above).
+        one of the supported "sub-formats" (see _subformats array above), parsed
+        by the implementation named by the "parser" of the tool's prospectus.
         """
+        if self.handler["@prospectus"].get("parser", "generic") == "compiled":
+            subformats = self._compiled_subformats
+        else:
+            subformats = self._subformats
         for output_file in self.files:
             handler_rec = output_file["handler_rec"]
             subformat = handler_rec["subformat"]
@@ -3217,13 +4009,13 @@ class ToolData(PbenchData):
             except KeyError:
                 converter = _noop
             try:
-                func = self._subformats[subformat]
+                func = subformats[subformat]
             except KeyError:
                 self.logger.warning(
                     "tool-data-indexing: encountered unrecognized"
                     " sub-format, '{}', not one of {!r} ({})",
                     subformat,
-                    [key for key in self._subformats.keys()],
+                    [key for key in subformats.keys()],
                     self.ptb._tbctx,
                 )
                 self.counters["unrecognized_subformat"] += 1
@@ -3249,16 +4041,12 @@ class ToolData(PbenchData):
         """
         for df in self.files:
             try:
-                with open(os.path.join(self.ptb.extracted_root, df["path"])) as fp:
-                    payload = json.load(fp)
-            except Exception as e:
-                self.logger.warning(
-                    "tool-data-indexing: encountered bad JSON file, {}: {:r} ({})",
-                    df["path"],
-                    e,
-                    self.ptb._tbctx,
+                # Large files are decoded one document at a time.
+                payload = load_json_array(
+                    os.path.join(self.ptb.extracted_root, df["path"])
                 )
-                self.counters["bad_json_file"] += 1
+            except Exception as e:
+                self._bad_json_file(df, e)
                 continue
 
             missing_ts = False
@@ -3347,11 +4135,23 @@ class ToolData(PbenchData):
                 source_id = PbenchData.make_source_id(source)
                 yield source, source_id
                 idx += 1
+            if isinstance(payload, JsonArrayStream) and payload.error:
+                self._bad_json_file(df, payload.error)
+                continue
             self.logger.info(
                 "tool-data-indexing: tool {}, json end {}", self.toolname, df["path"]
             )
         return
 
+    def _bad_json_file(self, df, e):
+        self.logger.warning(
+            "tool-data-indexing: encountered bad JSON file, {}: {:r} ({})",
+            df["path"],
+            e,
+            self.ptb._tbctx,
+        )
+        self.counters["bad_json_file"] += 1
+
     def make_source(self):
         """Simple jump method to pick the correct source generator based on the
         handler's prospectus."""
@@ -3408,10 +4208,7 @@ class ToolData(PbenchData):
                         continue
             assert handler_rec is not None, "Logic bomb! handler_rec is None"
             datafile = _dict_const(path=p, basename=fname, handler_rec=handler_rec)
-            datafile["reader"] = reader = csv.reader(
-                open(os.path.join(ptb.extracted_root, p))
-            )
-            datafile["header"] = next(reader)
+            datafile["header"] = ptb.csv_files.read_header(p)
             datafiles.append(datafile)
         return datafiles
 
@@ -3474,9 +4271,381 @@ class ToolData(PbenchData):
         return datafiles
 
 
+class ToolDataFilter:
+    """Ingest filter policy for the tool data of a tool whose .csv files are
+    unified, configured in the "tool-data-filter-<tool>" section of the
+    server configuration:
+
+        drop_zero   - drop the series (identifiers) whose values are all zero
+        threshold   - drop the series whose values are all smaller than this
+                      in magnitude
+        top_n       - keep only this many of the remaining series, those with
+                      the largest total of "top_metric" over the sample,
+                      folding all the others into one "other" series holding
+                      the sums of their values
+        top_metric  - the "<class>.<metric>" (or "<metric>" for tools without
+                      classes) used to rank series for "top_n"
+
+    Which series are dropped or folded is decided per sample by a single
+    pre-scan of its .csv files (see scan()), before any document is generated.
+    """
+
+    OTHER = "other"
+
+    def __init__(
+        self, toolname, drop_zero=False, threshold=None, top_n=0, top_metric=None
+    ):
+        self.toolname = toolname
+        self.drop_zero = drop_zero
+        self.threshold = threshold
+        self.top_n = top_n
+        self.top_metric = top_metric
+
+    @classmethod
+    def from_config(cls, config, toolname, handler):
+        """Return the filter policy of the given tool found in the server
+        configuration, or None if the tool has none.
+        """
+        section = "tool-data-filter-{}".format(toolname)
+        if not config.conf.has_section(section):
+            return None
+        if handler is None or handler["@prospectus"]["method"] != "unify":
+            raise ConfigFileError(
+                "Bad {}: filters are only supported for tools with unified"
+                " .csv files".format(section)
+            )
+        try:
+            drop_zero = config.conf.getboolean(section, "drop_zero", fallback=False)
+            threshold = config.conf.getfloat(section, "threshold", fallback=None)
+            top_n = config.conf.getint(section, "top_n", fallback=0)
+            top_metric = config.conf.get(section, "top_metric", fallback=None)
+            if top_n < 0:
+                raise ValueError("top_n must not be negative")
+            if top_n > 0 and not top_metric:
+                raise ValueError("top_n requires a top_metric")
+        except ValueError as e:
+            raise ConfigFileError("Bad {}: {}".format(section, e))
+        return cls(toolname, drop_zero, threshold, top_n, top_metric)
+
+    def scan(self, td, identifiers, metric_mapping, field_mapping):
+        """Read the .csv files of the ToolData object, td, once, returning the
+        set of identifiers to drop and the set of identifiers to fold into the
+        "other" series.
+
+        The .csv files are read directly, and not through the tar ball's
+        CsvFiles manager, so that they remain unread for the generation of
+        the documents which follows.
+        """
+        peak = Counter()
+        total = Counter()
+        for csvf in td.files:
+            fname = csvf["basename"]
+            try:
+                klass, metric, converter = metric_mapping[fname]
+            except KeyError:
+                continue
+            ranked = self.top_n > 0 and self.top_metric == (
+                metric if klass is None else "{}.{}".format(klass, metric)
+            )
+            fmap = field_mapping[fname]
+            with open(
+                os.path.join(td.ptb.csv_files.root, csvf["path"]), newline=""
+            ) as fp:
+                reader = csv.reader(fp)
+                next(reader, None)
+                for row in reader:
+                    for col, val in enumerate(row[1:], 1):
+                        try:
+                            identifier = fmap[col][0]
+                            val = float(converter(val))
+                        except (KeyError, ValueError, TypeError):
+                            # Left for the generation of the documents to
+                            # report.
+                            continue
+                        if abs(val) > peak[identifier]:
+                            peak[identifier] = abs(val)
+                        if ranked:
+                            total[identifier] += val
+        dropped = set()
+        for identifier in identifiers:
+            if (self.drop_zero and peak[identifier] == 0) or (
+                self.threshold is not None and peak[identifier] < self.threshold
+            ):
+                dropped.add(identifier)
+        folded = set()
+        if self.top_n > 0:
+            kept = [
+                identifier for identifier in identifiers if identifier not in dropped
+            ]
+            kept.sort(key=lambda identifier: total[identifier], reverse=True)
+            folded.update(kept[self.top_n :])
+        return dropped, folded
+
+    def _fold(self, into, obj):
+        for field, val in obj.items():
+            if isinstance(val, dict):
+                self._fold(into.setdefault(field, _dict_const()), val)
+            elif isinstance(val, (int, float)) and field != "@idx":
+                into[field] = into.get(field, 0) + val
+
+    def apply(self, datum, dropped, folded):
+        """Return the documents of the given datum (identifier -> document)
+        without those of the dropped identifiers, and with those of the folded
+        identifiers summed into an "other" document.
+        """
+        filtered = _dict_const()
+        other = None
+        for identifier, source in datum.items():
+            if identifier in dropped:
+                continue
+            if identifier not in folded:
+                filtered[identifier] = source
+                continue
+            if other is None:
+                other = _dict_const()
+                for field, val in source.items():
+                    if field != self.toolname:
+                        other[field] = val
+                other[self.toolname] = _dict_const(
+                    [("id", self.OTHER), ("@idx", source[self.toolname]["@idx"])]
+                )
+            self._fold(other[self.toolname], source[self.toolname])
+        if other is not None:
+            filtered[self.OTHER] = other
+        return filtered
+
+
+class ToolDataRollups:
+    """Rollups of the tool data documents of a ToolData object.
+
+    Each numeric field of the tool data documents (excluding "@idx") is
+    rolled up, for each configured window, into its min, max, mean, and last
+    value across the documents whose timestamps fall in that window.  The
+    non-numeric fields of a document (e.g. a disk or CPU identifier) identify
+    the series its values belong to, so one rollup document is emitted per
+    series and window.
+    """
+
+    def __init__(self, td, windows, non_numeric):
+        self.td = td
+        self.windows = windows
+        self.non_numeric = non_numeric
+        self.buckets = _dict_const()
+
+    def _walk(self, obj, path, series, metrics):
+        for field, val in obj.items():
+            fpath = path + (field,)
+            if isinstance(val, dict):
+                self._walk(val, fpath, series, metrics)
+            elif fpath == ("@idx",):
+                continue
+            elif (
+                isinstance(val, (int, float))
+                and not isinstance(val, bool)
+                and fpath not in self.non_numeric
+            ):
+                metrics.append((fpath, val))
+            else:
+                series.append((fpath, val))
+
+    def add(self, source):
+        """Account for the values of the given tool data document."""
+        series = []
+        metrics = []
+        self._walk(source[self.td.toolname], (), series, metrics)
+        if not metrics:
+            return
+        series = tuple(series)
+        # Tool data timestamps are all of the form YYYY-MM-DDTHH:MM:SS.ffffff
+        ts = source["@timestamp"]
+        secs = int(ts[11:13]) * 3600 + int(ts[14:16]) * 60 + int(ts[17:19])
+        for window, seconds in self.windows:
+            key = (series, window, ts[:10], secs // seconds)
+            try:
+                bucket = self.buckets[key]
+            except KeyError:
+                bucket = self.buckets[key] = [0, _dict_const()]
+            bucket[0] += 1
+            stats = bucket[1]
+            for fpath, val in metrics:
+                try:
+                    stat = stats[fpath]
+                except KeyError:
+                    stats[fpath] = [val, val, val, 1, val]
+                else:
+                    if val < stat[0]:
+                        stat[0] = val
+                    if val > stat[1]:
+                        stat[1] = val
+                    stat[2] += val
+                    stat[3] += 1
+                    stat[4] = val
+
+    def make_source(self):
+        """Generate the rollup documents, with their IDs, in the order their
+        series and windows were first encountered.
+        """
+        toolname = self.td.toolname
+        seconds_of = dict(self.windows)
+        for (series, window, day, idx), (count, stats) in self.buckets.items():
+            seconds = seconds_of[window]
+            start = datetime.strptime(day, "%Y-%m-%d") + timedelta(
+                seconds=idx * seconds
+            )
+            end = start + timedelta(seconds=seconds)
+            rollup = _dict_const()
+            for fpath, val in series:
+                obj = rollup
+                for field in fpath[:-1]:
+                    obj = obj.setdefault(field, _dict_const())
+                obj[fpath[-1]] = val
+            for fpath, (vmin, vmax, vsum, n, vlast) in stats.items():
+                obj = rollup
+                for field in fpath[:-1]:
+                    obj = obj.setdefault(field, _dict_const())
+                obj[fpath[-1]] = _dict_const(
+                    [("min", vmin), ("max", vmax), ("mean", vsum / n), ("last", vlast)]
+                )
+            source = _dict_const()
+            source["@timestamp"] = start.strftime(_STD_DATETIME_FMT)
+            source["run"] = self.td.run_metadata
+            source["iteration"] = self.td.iteration_metadata
+            source["sample"] = self.td.sample_metadata
+            source["rollup"] = _dict_const(
+                [
+                    ("window", window),
+                    ("seconds", seconds),
+                    ("count", count),
+                    ("end", end.strftime(_STD_DATETIME_FMT)),
+                ]
+            )
+            source[toolname] = rollup
+            yield source, PbenchData.make_source_id(source)
+
+
 ###########################################################################
 # Various helper methods.
 
+# JSON files no larger than this are loaded whole; larger ones holding an
+# array are decoded one array element at a time (see load_json_array()).
+_JSON_STREAM_THRESHOLD = 8 * 1024 * 1024
+# Amount of a streamed JSON file read at a time.
+_JSON_READ_SIZE = 1024 * 1024
+_json_ws = re.compile(r"[ \t\n\r]*")
+
+
+class JsonArrayStream:
+    """Iterable over the elements of the top-level array of a JSON file,
+    decoded one at a time so that memory use is bounded by the largest
+    element instead of the whole document.
+
+    Each iteration re-reads the file.  A decoding error ends the iteration,
+    after any elements decoded before it, and is recorded in "error"
+    (otherwise None).
+    """
+
+    def __init__(self, path, read_size=_JSON_READ_SIZE):
+        self.path = path
+        self.read_size = read_size
+        self.error = None
+
+    def is_array(self):
+        """Return True if the JSON document of the file is an array, as far
+        as its first character tells."""
+        with open(self.path) as fp:
+            buf = fp.read(self.read_size)
+            while True:
+                pos = _json_ws.match(buf).end()
+                if pos < len(buf):
+                    return buf[pos] == "["
+                buf = fp.read(self.read_size)
+                if not buf:
+                    return False
+
+    def __iter__(self):
+        self.error = None
+        try:
+            with open(self.path) as fp:
+                yield from self._elements(fp)
+        except ValueError as e:
+            # Includes json.JSONDecodeError, and UnicodeDecodeError.
+            self.error = e
+
+    def _elements(self, fp):
+        decoder = json.JSONDecoder()
+        buf = ""
+        pos = 0
+        eof = False
+
+        def more(pos):
+            # Drop what was decoded from the buffer and read more, at least
+            # doubling what remains to keep the cost of decoding large
+            # elements linear.
+            nonlocal buf, eof
+            data = fp.read(max(self.read_size, len(buf) - pos))
+            if not data:
+                eof = True
+            buf = buf[pos:] + data
+            return 0
+
+        def skip_ws(pos):
+            while True:
+                pos = _json_ws.match(buf, pos).end()
+                if pos < len(buf) or eof:
+                    return pos
+                pos = more(pos)
+
+        def expected(what, pos):
+            return json.JSONDecodeError("Expecting {}".format(what), buf, pos)
+
+        pos = skip_ws(more(pos))
+        if buf[pos : pos + 1] != "[":
+            raise expected("'['", pos)
+        pos = skip_ws(pos + 1)
+        if buf[pos : pos + 1] == "]":
+            pos += 1
+        else:
+            while True:
+                # An element is only complete when the delimiter following it
+                # has been read (a number might continue otherwise).
+                while True:
+                    try:
+                        element, end = decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                    else:
+                        nxt = _json_ws.match(buf, end).end()
+                        if eof or buf[nxt : nxt + 1] in (",", "]"):
+                            break
+                    pos = more(pos)
+                yield element
+                pos = skip_ws(end)
+                sep = buf[pos : pos + 1]
+                if sep == "]":
+                    pos += 1
+                    break
+                if sep != ",":
+                    raise expected("',' delimiter", pos)
+                pos = skip_ws(pos + 1)
+        if skip_ws(pos) < len(buf):
+            raise json.JSONDecodeError("Extra data", buf, skip_ws(pos))
+
+
+def load_json_array(path):
+    """Load the JSON document of the given file, where an array is expected.
+
+    Files larger than _JSON_STREAM_THRESHOLD which hold an array are not
+    loaded: a JsonArrayStream over the array's elements is returned instead.
+    Everything else is loaded with json.load(), raising its errors.
+    """
+    if os.path.getsize(path) > _JSON_STREAM_THRESHOLD:
+        stream = JsonArrayStream(path)
+        if stream.is_array():
+            return stream
+    with open(path) as fp:
+        return json.load(fp)
+
 
 def get_md5sum_of_dir(dir, parentid):
     """Calculate the md5 sum of all the names in the toc"""
@@ -3636,7 +4805,7 @@ def hostnames_if_ip_from_sosreport(sos_file_name):
     """Return a dict with hostname info (both short and fqdn) and
     ip addresses of all the network interfaces we find at sosreport time."""
 
-    sostb = tarfile.open(sos_file_name)
+    sostb = open_tarball(sos_file_name)
     names = sostb.getnames()
     hostname_files = [name for name in names if find_hostname(name) >= 0]
 
@@ -3818,30 +4987,55 @@ class PbenchTarBall:
             self.controller_name = self.controller_dir
         tb_stat = os.stat(self.tbname)
         mtime = datetime.utcfromtimestamp(tb_stat.st_mtime)
-        self.tb = tarfile.open(self.tbname)
 
         # This is the top-level name of the run - it should be the common
         # first component of every member of the tar ball.
-        dirname = os.path.basename(self.tbname)
-        self.dirname = dirname[: dirname.rfind(".tar.xz")]
+        self.dirname = tb_resultname(os.path.basename(self.tbname))
         # ... but let's make sure ...
         #
         # ... while we are at it, we verify we have a metadata.log file in the
         # tar ball before we start extracting.
         metadata_log_path = "%s/metadata.log" % (self.dirname)
         metadata_log_found = False
-        self.members = self.tb.getmembers()
-        for m in self.members:
-            if m.name == metadata_log_path:
+        if extracted_root is None:
+            # No unpacked copy of the tar ball is used: the members needed
+            # for indexing are extracted to a scratch directory, removed by
+            # close().  They are read directly when the tar ball allows random
+            # access, and otherwise in one sequential pass over the tar ball.
+            self.tb = open_indexed_tarball(self.tbname)
+            indexed = self.tb is not None
+            if not indexed:
+                self.tb = open_tarball(self.tbname, stream=True)
+            self._scratch = tempfile.mkdtemp(prefix="extracted.", dir=tmpdir)
+            extracted_root = self._scratch
+            try:
+                if indexed:
+                    self.members = self._get_members(need_offsets=True)
+                    for member in self.members:
+                        self._extract(member.tarinfo())
+                else:
+                    self.members = self._stream_members()
+            except Exception:
+                self.close()
+                raise
+        else:
+            self.tb = open_tarball(self.tbname)
+            self._scratch = None
+            self.members = self._get_members()
+        # Nothing more is read from the tar ball: release it now, along with
+        # the TarInfo objects tarfile keeps of every member it read.
+        self.tb.close()
+        for name in self.members.names():
+            if name == metadata_log_path:
                 metadata_log_found = True
-            sampled_prefix = m.name.split(os.path.sep)[0]
+            sampled_prefix = name.split(os.path.sep)[0]
             if sampled_prefix != self.dirname:
                 # All members of the tar ball should have self.dirname as its
                 # prefix.
                 raise UnsupportedTarballFormat(
                     '{} - directory prefix should be "{}", but is'
                     ' "{}" instead, for tar ball member "{}"'.format(
-                        self.tbname, self.dirname, sampled_prefix, m.name
+                        self.tbname, self.dirname, sampled_prefix, name
                     )
                 )
         if not metadata_log_found:
@@ -3850,6 +5044,9 @@ class PbenchTarBall:
             )
 
         self.extracted_root = extracted_root
+        # The .csv files of the tool data are opened through this manager,
+        # bounding how many are open at once.
+        self.csv_files = CsvFiles(extracted_root, idxctx.max_open_csv_files)
         if not os.path.isdir(os.path.join(self.extracted_root, self.dirname)):
             raise UnsupportedTarballFormat(
                 '{} - extracted tar ball directory "{}" does not'
@@ -4015,13 +5212,165 @@ class PbenchTarBall:
         # additional context to add.
         self._tbctx = f"{self.controller_dir}/{os.path.basename(tbarg)}({md5sum})"
 
+    def _get_members(self, need_offsets=False):
+        """Return the MemberTable of the members of the tar ball.
+
+        Tar balls created by recent agents carry a manifest member right
+        after their top-level directory; when present, the member list is
+        constructed from it, avoiding decompressing the entire tar ball just
+        to list it.  Otherwise the tar ball is listed in full.  In either
+        case the manifest itself is not considered a member.
+
+        When the members are to be extracted, need_offsets is True, and the
+        manifest is only used if it records the offsets of the members.
+        """
+        manifest_path = f"{self.dirname}/{TARBALL_MANIFEST}"
+        first = second = None
+        try:
+            first = self.tb.next()
+            second = self.tb.next() if first is not None else None
+            if second is not None and second.name == manifest_path:
+                manifest = json.load(self.tb.extractfile(second))
+                offsets = manifest.get("offsets")
+                if manifest.get("version") == 1 and (offsets or not need_offsets):
+                    # The offsets are relative to the end of the manifest.
+                    blocks = -(-second.size // tarfile.BLOCKSIZE)
+                    base = second.offset_data + blocks * tarfile.BLOCKSIZE
+                    members = MemberTable()
+                    for idx, entry in enumerate(manifest["entries"]):
+                        offset = offsets[idx] if offsets and idx > 0 else None
+                        members.append(
+                            *self._manifest_member(entry),
+                            offset_data=0 if offset is None else base + offset,
+                        )
+                    return members
+        except (tarfile.TarError, ValueError, KeyError, TypeError, IndexError) as exc:
+            self.idxctx.logger.warning(
+                "{}: ignoring unusable tar ball manifest, {}", self.tbname, exc
+            )
+        members = MemberTable()
+        read = [member for member in (first, second) if member is not None]
+        for member in self._tarinfos(*read):
+            if member.name != manifest_path:
+                members.add(member)
+        return members
+
+    def _tarinfos(self, *read):
+        """Generate the TarInfo objects of all the members of the tar ball,
+        starting with the given ones, already read.
+
+        The tar ball is only ever read in order, with next(), and never used
+        to look members up (getmember(), getmembers(), etc.): the MemberTable
+        built from the TarInfo objects generated stands in for it.
+        """
+        yield from read
+        while True:
+            member = self.tb.next()
+            if member is None:
+                return
+            yield member
+
+    # The names (base names, or directories under a tool's directory) of the
+    # members read from disk while indexing, see _needed().
+    _needed_names = frozenset(
+        ("result.json", "user-benchmark-name.txt", "user-benchmark-result.csv")
+    )
+    _needed_tool_dirs = frozenset(("csv", "json"))
+
+    def _needed(self, member):
+        """Return True if the given member of the tar ball is read while
+        indexing, and so has to be extracted.
+        """
+        if not member.isfile():
+            return False
+        parts = member.name.split("/")
+        if parts[0] != self.dirname or ".." in parts:
+            return False
+        base = parts[-1]
+        if len(parts) == 2 and base == "metadata.log":
+            return True
+        if base in self._needed_names or "sosreport" in base:
+            return True
+        if any(part.startswith("tools-") for part in parts[1:-1]):
+            return not self._needed_tool_dirs.isdisjoint(parts[1:-1]) or base.endswith(
+                "-stdout.txt"
+            )
+        return False
+
+    def _stream_members(self):
+        """Return the MemberTable of the members of the tar ball, extracting
+        the members needed for indexing to the scratch directory as they
+        stream by.
+
+        The manifest, when present, is not considered a member.
+        """
+        manifest_path = f"{self.dirname}/{TARBALL_MANIFEST}"
+        members = MemberTable()
+        for member in self._tarinfos():
+            if member.name == manifest_path:
+                continue
+            self._extract(member)
+            members.add(member)
+        return members
+
+    def _extract(self, member):
+        """Extract the given member to the scratch directory if it is needed
+        for indexing.
+
+        Only regular files are extracted, and directories created, so the
+        scratch directory holds no more than the data indexing reads.  Members
+        which would land outside of the scratch directory are ignored.
+        """
+        if member.isdir():
+            path = self._scratch_path(member)
+            if path is not None:
+                os.makedirs(path, exist_ok=True)
+        elif self._needed(member):
+            path = self._scratch_path(member)
+            if path is not None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as ofp:
+                    shutil.copyfileobj(self.tb.extractfile(member), ofp)
+
+    def _scratch_path(self, member):
+        """Return the path in the scratch directory of the given member, None
+        if the member is not under the top-level directory of the tar ball,
+        or if its path resolves to outside of the scratch directory.
+        """
+        parts = member.name.split("/")
+        if parts[0] != self.dirname or ".." in parts:
+            return None
+        scratch = os.path.realpath(self._scratch)
+        path = os.path.realpath(os.path.join(scratch, member.name))
+        if os.path.commonpath((scratch, path)) != scratch:
+            return None
+        return path
+
+    def close(self):
+        """Release the tar ball, removing the scratch directory of its
+        extracted members, if any.
+        """
+        self.tb.close()
+        if self._scratch is not None:
+            shutil.rmtree(self._scratch, ignore_errors=True)
+            self._scratch = None
+
+    @classmethod
+    def _manifest_member(cls, entry):
+        """Return the attributes of a member, as MemberTable.append() takes
+        them, from a manifest entry, a list of path, type, size, mode, mtime,
+        and link path.
+        """
+        name, ftype, size, mode, mtime, linkname = entry
+        return name, cls._manifest_types[ftype], size, mode, mtime, linkname
+
     def gen_files_by_partial_path(self, path):
         """Generator for all files in the tar ball which match the given path
         pattern.
         """
-        for member in self.members:
-            if member.isfile() and member.name.find(path) >= 0:
-                yield member.name
+        for name in self.members.file_names():
+            if name.find(path) >= 0:
+                yield name
 
     _iter_num_pat = re.compile(r"(?P<num>^[1-9][0-9]*)-")
 
@@ -4051,16 +5400,9 @@ class PbenchTarBall:
             # through the tar ball members looking for directories that are
             # most likely iterations.
             iterations = []
-            for member in self.members:
-                if not member.isdir():
-                    # We are only looking for directories
-                    continue
-                path_els = member.name.split("/")
-                if len(path_els) != 2:
-                    # Iteration directory names always have 2 path elements,
-                    # [ '/', '<iteration name>' ].
-                    continue
-                itername = path_els[1]
+            # Iteration directories are always directly under the top-level
+            # directory.
+            for itername in self.members.subdirs(self.dirname):
                 if self._iter_num_pat.match(itername):
                     # We only recognize iteration names that match this
                     # pattern, as later versions of the pbench-agent have
@@ -4082,18 +5424,9 @@ class PbenchTarBall:
         """Get the list of Sample objects for a given iteration object.
         """
         samples = []
-        for member in self.members:
-            if not member.isdir():
-                # We are only looking for directories
-                continue
-            if member.name.find(f"{iteration.name}/") < 0:
-                continue
-            path_els = member.name.split("/")
-            if len(path_els) != 3:
-                # Sample directory names always have 3 path elements,
-                # [ '/', '<iteration name>', 'sample<number>' ].
-                continue
-            sample = path_els[2]
+        # Sample directories are always directly under their iteration's
+        # directory.
+        for sample in self.members.subdirs(f"{self.dirname}/{iteration.name}"):
             if sample.startswith("sample"):
                 # Sample directories always begin with 'sample'.
                 samples.append(sample)
@@ -4199,18 +5532,24 @@ class PbenchTarBall:
         else:
             raise Exception()
 
-    def make_all_actions(self):
+    def make_all_actions(self, request=None):
         """Driver for generating all actions on source documents for indexing into
         Elasticsearch. This generator drives the generation of the run source
         document, the table-of-contents tar ball documents, and then all the
         result data.
+
+        Given a re-index request (see pbench.server.reindex), only the actions
+        of the document classes it names are generated.
         """
         self.idxctx.logger.debug("start")
-        yield self.mk_run_action()
-        for action in self.mk_toc_actions():
-            yield action
-        for action in self.mk_result_data_actions():
-            yield action
+        if request is None or "run" in request:
+            yield self.mk_run_action()
+        if request is None or "toc" in request:
+            for action in self.mk_toc_actions():
+                yield action
+        if request is None or "result" in request:
+            for action in self.mk_result_data_actions():
+                yield action
         self.idxctx.logger.debug("end")
         return
 
@@ -4253,9 +5592,9 @@ class PbenchTarBall:
         self.idxctx.logger.debug("start")
 
         sosreports = [
-            x.name
-            for x in self.members
-            if x.name.find("sosreport") >= 0 and x.name.endswith(".md5")
+            x
+            for x in self.members.names()
+            if x.find("sosreport") >= 0 and x.endswith(".md5")
         ]
         sosreports.sort()
 
@@ -4396,6 +5735,8 @@ class PbenchTarBall:
             (tarfile.GNUTYPE_SPARSE, "spr"),
         ]
     )
+    # Reverse mapping, used for the entry types of tar ball manifests.
+    _manifest_types = {ftype: tbtype for tbtype, ftype in _mode_table.items()}
 
     def gen_toc(self):
         """Generate (t)able (o)f (c)ontents JSON documents for this tar ball.
@@ -4444,74 +5785,66 @@ class PbenchTarBall:
             ] }
         """
         prefix_l = len(self.dirname)
-        # Note we have to fully populate the dictionary by processing all the
-        # members before we can yield the generated sources for each
-        # directory.
-        toc_dirs = _dict_const()
-        for m in self.members:
-            # Always strip the prefix
-            path = m.name[prefix_l:]
-            if m.isdir():
-                if path == "/" or path == "":
-                    dpath = "/"
-                    name = None
-                    parent = "/"
-                    path_els = []
+        # The members come grouped by directory, in the order of the
+        # directory paths, so each directory's document is complete, and
+        # yielded, before the next directory is considered.
+        for dirname, members in self.members.by_directory():
+            source = None
+            files = []
+            for m in members:
+                # Always strip the prefix
+                path = m.name[prefix_l:]
+                if m.isdir():
+                    if path == "/" or path == "":
+                        dpath = "/"
+                        name = None
+                        parent = "/"
+                        path_els = []
+                    else:
+                        dpath = path[:-1] if path.endswith(os.path.sep) else path
+                        name = os.path.basename(dpath)
+                        parent = os.path.dirname(dpath)
+                        path_els = dpath.split(os.path.sep)[1:-1]
+                    if source is not None:
+                        raise Exception(
+                            "Logic bomb! Found a directory entry that already exists!"
+                        )
+                    source = _dict_const(
+                        parent=parent,
+                        directory=dpath,
+                        mtime=datetime.utcfromtimestamp(float(m.mtime)).isoformat(),
+                        mode=oct(m.mode),
+                    )
+                    if name:
+                        source["name"] = name
+                    if len(path_els) > 0:
+                        source["ancestor_path_elements"] = path_els
                 else:
-                    dpath = path[:-1] if path.endswith(os.path.sep) else path
-                    name = os.path.basename(dpath)
-                    parent = os.path.dirname(dpath)
-                    path_els = dpath.split(os.path.sep)[1:-1]
-                if dpath in toc_dirs:
-                    raise Exception(
-                        "Logic bomb! Found a directory entry that already exists!"
+                    fentry = _dict_const(
+                        name=os.path.basename(path),
+                        mtime=datetime.utcfromtimestamp(float(m.mtime)).isoformat(),
+                        size=m.size,
+                        mode=oct(m.mode),
                     )
-                toc_dirs[dpath] = _dict_const(
-                    parent=parent,
-                    directory=dpath,
-                    mtime=datetime.utcfromtimestamp(float(m.mtime)).isoformat(),
-                    mode=oct(m.mode),
-                )
-                if name:
-                    toc_dirs[dpath]["name"] = name
-                if len(path_els) > 0:
-                    toc_dirs[dpath]["ancestor_path_elements"] = path_els
-            else:
-                fentry = _dict_const(
-                    name=os.path.basename(path),
-                    mtime=datetime.utcfromtimestamp(float(m.mtime)).isoformat(),
-                    size=m.size,
-                    mode=oct(m.mode),
-                )
-                try:
-                    ftype = self._mode_table[m.type]
-                except KeyError:
-                    ftype = "unk"
-                fentry["type"] = ftype
-                if m.issym():
-                    fentry["linkpath"] = m.linkpath
-                dpath = os.path.dirname(path)
-                # we may have created an empty dir entry already without a
-                # 'files' entry, so we now make sure that there is an
-                # empty 'files' entry that we can populate.
-                if "files" not in toc_dirs[dpath]:
-                    toc_dirs[dpath]["files"] = []
-                toc_dirs[dpath]["files"].append(fentry)
-        for key in sorted(toc_dirs.keys()):
-            source = toc_dirs[key]
-            try:
-                sorted_file_list = sorted(
-                    source["files"], key=itemgetter("name", "mtime")
-                )
-            except KeyError:
-                pass
-            else:
-                source["files"] = sorted_file_list
+                    try:
+                        ftype = self._mode_table[m.type]
+                    except KeyError:
+                        ftype = "unk"
+                    fentry["type"] = ftype
+                    if m.issym():
+                        fentry["linkpath"] = m.linkpath
+                    files.append(fentry)
+            if source is None:
+                # Files without an entry for their directory.
+                raise KeyError(dirname[prefix_l:] or "/")
+            if files:
+                source["files"] = sorted(files, key=itemgetter("name", "mtime"))
             yield source
 
-    def mk_tool_data(self):
+    def mk_tool_data(self, request=None):
         """Yield ToolData() objects for each tool directory found in the
-        hierarhcy.
+        hierarhcy, only for the tools named by the given re-index request, if
+        any.
 
         Tool data are stored in various files in the tar ball under a specific
         hierarchy.  The structure looks like the following:
@@ -4542,17 +5875,21 @@ class PbenchTarBall:
                     tool_names = list(tools_data.keys())
                     tool_names.sort()
                     for tool in tool_names:
+                        if request is not None and not request.wants_tool(tool):
+                            continue
                         yield ToolData(
                             self, iteration.name, sample.name, hostname, tool
                         )
         return
 
-    def mk_tool_data_actions(self):
-        """Generate all the tool data actions from the entire run hierarchy.
+    def mk_tool_data_actions(self, request=None):
+        """Generate all the tool data actions from the entire run hierarchy,
+        or those of the tools named by the given re-index request.
         """
         self.idxctx.logger.debug("start")
         count = 0
-        for td in self.mk_tool_data():
+        rollup_count = 0
+        for td in self.mk_tool_data(request):
             # Each ToolData object, td, that is returned here represents how
             # data collected for that tool across all hosts is to be returned.
             # The make_source method returns a generator that will emit each
@@ -4564,24 +5901,49 @@ class PbenchTarBall:
             if not asource:
                 continue
             type_name = "pbench-tool-data-{}".format(td.toolname)
-            for source, source_id in asource:
-                try:
-                    idx_name = td.generate_index_name(
-                        "tool-data", source, toolname=td.toolname
-                    )
-                except BadDate:
-                    pass
-                else:
-                    source["@generated-by"] = self.idxctx.get_tracking_id()
-                    action = _dict_const(
-                        _op_type=_op_type,
-                        _index=idx_name,
-                        _type=type_name,
-                        _id=source_id,
-                        _source=source,
-                    )
-                    count += 1
-                    yield action
+            try:
+                rollups = ToolDataRollups(
+                    td,
+                    self.idxctx.rollup_windows,
+                    self.idxctx.templates.rollup_non_numeric[td.toolname],
+                )
+            except KeyError:
+                # Rollups are not enabled, or the tool has no mappings.
+                rollups = None
+            for idx_name, (source, source_id) in td.route_sources(
+                "tool-data", asource, toolname=td.toolname
+            ):
+                source["@generated-by"] = self.idxctx.get_tracking_id()
+                action = _dict_const(
+                    _op_type=_op_type,
+                    _index=idx_name,
+                    _type=type_name,
+                    _id=source_id,
+                    _source=source,
+                )
+                count += 1
+                yield action
+                if rollups is not None:
+                    rollups.add(source)
+            if rollups is None:
+                continue
+            type_name = "pbench-tool-data-rollup-{}".format(td.toolname)
+            for source, source_id in rollups.make_source():
+                idx_name = td.generate_index_name(
+                    "tool-data-rollup", source, toolname=td.toolname
+                )
+                source["@generated-by"] = self.idxctx.get_tracking_id()
+                action = _dict_const(
+                    _op_type=_op_type,
+                    _index=idx_name,
+                    _type=type_name,
+                    _id=source_id,
+                    _source=source,
+                )
+                rollup_count += 1
+                yield action
+        if rollup_count > 0:
+            self.idxctx.logger.debug("{:d} tool data rollup documents", rollup_count)
         self.idxctx.logger.debug("end [{:d} tool data documents]", count)
         return
 
@@ -4600,8 +5962,13 @@ class PbenchTarBall:
             return
         count = 0
         for source, source_id, parent_id, doc_type in sources:
+            if doc_type == "timeseries":
+                # Compact timeseries documents have indices of their own.
+                template_name = "result-data-timeseries"
+            else:
+                template_name = "result-data"
             try:
-                idx_name = rd.generate_index_name("result-data", source)
+                idx_name = rd.generate_index_name(template_name, source)
             except BadDate:
                 # We don't raise this exception because we are already well into
                 # indexing so much data that there is no point in stopping
@@ -4612,6 +5979,7 @@ class PbenchTarBall:
                 assert doc_type in (
                     "sample",
                     "res",
+                    "timeseries",
                 ), "Invalid result data document type, {}".format(doc_type)
                 if doc_type == "res":
                     _type = "pbench-result-data"
@@ -4657,6 +6025,99 @@ class IdxContext:
                     "Index prefix, '{}', not allowed to"
                     " contain a period ('.')".format(self.idx_prefix)
                 )
+        try:
+            self.max_open_csv_files = int(
+                self.config.get(
+                    "Indexing",
+                    "max_open_csv_files",
+                    fallback=_DEFAULT_MAX_OPEN_CSV_FILES,
+                )
+            )
+            if self.max_open_csv_files <= 0:
+                raise ValueError("must be a positive integer")
+        except ValueError as e:
+            raise ConfigFileError("Bad max_open_csv_files: {}".format(e))
+        self.tool_filters = {}
+        for toolname, handler in _known_tool_handlers.items():
+            tdfilter = ToolDataFilter.from_config(self.config, toolname, handler)
+            if tdfilter is not None:
+                self.tool_filters[toolname] = tdfilter
+        self.rollup_windows = []
+        for window in re.split(
+            r"[\s,]+", self.config.get("Indexing", "tool_data_rollups", fallback="")
+        ):
+            if not window:
+                continue
+            try:
+                seconds = int(window[:-1]) * _ROLLUP_WINDOW_UNITS[window[-1]]
+            except (KeyError, ValueError):
+                seconds = 0
+            if seconds <= 0 or 86400 % seconds != 0:
+                raise ConfigFileError(
+                    "Bad tool_data_rollups window, '{}': expected seconds,"
+                    " minutes, or hours (e.g. 10s, 1m) evenly dividing a"
+                    " day".format(window)
+                )
+            self.rollup_windows.append((window, seconds))
+        self.result_timeseries = self.config.get(
+            "Indexing", "result_data_timeseries", fallback="points"
+        )
+        if self.result_timeseries not in ("points", "compact", "both"):
+            raise ConfigFileError(
+                "Bad result_data_timeseries, '{}': expected points, compact,"
+                " or both".format(self.result_timeseries)
+            )
+        # Indexers sharing the state directories claim the tar balls they
+        # work on with leases kept in this (shared) directory.
+        self.lease_dir = self.config.get("Indexing", "lease_dir", fallback=None)
+        try:
+            self.lease_ttl = int(
+                self.config.get("Indexing", "lease_ttl", fallback=DEFAULT_LEASE_TTL)
+            )
+            if self.lease_ttl <= 0:
+                raise ValueError("must be a positive integer")
+        except ValueError as e:
+            raise ConfigFileError("Bad lease_ttl: {}".format(e))
+        # Tar balls are indexed from their unpacked copies in INCOMING, or
+        # streamed, see PbenchTarBall.
+        self.index_source = self.config.get(
+            "Indexing", "index_source", fallback="unpacked"
+        )
+        if self.index_source not in ("unpacked", "stream"):
+            raise ConfigFileError(
+                "Bad index_source, '{}': expected unpacked or stream".format(
+                    self.index_source
+                )
+            )
+        # Tar balls are indexed smallest first, or in order of their
+        # estimated cost.
+        schedule = self.config.get("Indexing", "schedule", fallback="size")
+        if schedule not in ("size", "cost"):
+            raise ConfigFileError(
+                "Bad schedule, '{}': expected size or cost".format(schedule)
+            )
+        if schedule == "cost":
+            rates = {}
+            for opt, default in (
+                ("schedule_docs_per_sec", DEFAULT_DOCS_PER_SEC),
+                ("schedule_bytes_per_sec", DEFAULT_BYTES_PER_SEC),
+                ("schedule_aging", DEFAULT_AGING),
+            ):
+                try:
+                    rates[opt] = float(
+                        self.config.get("Indexing", opt, fallback=default)
+                    )
+                    if rates[opt] <= 0:
+                        raise ValueError("must be a positive number")
+                except ValueError as e:
+                    raise ConfigFileError("Bad {}: {}".format(opt, e))
+            self.cost_model = CostModel(
+                rates["schedule_docs_per_sec"],
+                rates["schedule_bytes_per_sec"],
+                rates["schedule_aging"],
+            )
+        else:
+            self.cost_model = None
 
         # We expose the pbench.server module's internal _time() method here
         # for convenience, allowing us to more easily mock out "time" for unit
@@ -4701,6 +6162,8 @@ class IdxContext:
             self.idx_prefix,
             self.logger,
             _known_tool_handlers,
+            rollup_windows=self.rollup_windows,
+            compact_results=self.result_timeseries != "points",
             _dbg=_dbg,
         )
         self.tracking_id = None
@@ -0,0 +1,218 @@
+"""Work claiming module for pbench server.
+
+Several pbench-index processes, on one host or on several hosts sharing the
+ARCHIVE tree, can work the same state directories (TO-INDEX, TO-INDEX-TOOL,
+TO-RE-INDEX) when each of them first claims a tar ball by taking a lease on
+it, and only moves the tar ball's link while it still holds that lease.
+
+A lease is a small file in the lease directory, which must be on a file
+system shared by all the indexers:
+
+    <lease dir>/<controller>/<tar ball>.<state>.lease
+
+It is created exclusively (O_CREAT | O_EXCL), so only one indexer can hold
+it, and records its owner.  The lease expires "ttl" seconds after its last
+modification; its owner renews it with heartbeats, every third of "ttl",
+while working the tar ball, and removes it when done.  The lease of an
+indexer which crashed is never renewed, and once expired is reclaimed by the
+next indexer claiming the tar ball.  The clocks of the indexer hosts and the
+file server must be synchronized to well within "ttl".
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+from pbench.server import tstos
+
+
+# Default number of seconds a lease lasts without being renewed.
+DEFAULT_LEASE_TTL = 300
+
+
+class Lease:
+    """The lease of one tar ball in one state directory, see
+    LeaseManager.claim().
+    """
+
+    def __init__(self, manager, controller, tb_name, state):
+        self.manager = manager
+        self.controller = controller
+        self.tb_name = tb_name
+        self.state = state
+        self.path = os.path.join(
+            manager.lease_dir, controller, f"{tb_name}.{state}.lease"
+        )
+        # Set when a heartbeat finds the lease is no longer ours.
+        self.lost = False
+
+    @staticmethod
+    def _owner_of(path):
+        """Return the owner recorded in the given lease file, None if it is
+        gone or not readable.
+        """
+        try:
+            with open(path, "r") as fp:
+                return json.load(fp)["owner"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _create(self):
+        """Exclusively create the lease file, returning True if we did."""
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as fp:
+            json.dump(
+                {
+                    "owner": self.manager.owner,
+                    "claimed": tstos(),
+                    "ttl": self.manager.ttl,
+                },
+                fp,
+                sort_keys=True,
+            )
+        return True
+
+    def _reclaim(self, now):
+        """Remove the lease file if it has expired, returning True if it no
+        longer exists.
+
+        The expired lease is first renamed to a name of our own, which only
+        one of several indexers reclaiming it at once can do.  Should the
+        renamed file turn out not to be the expired lease we examined, it is
+        a fresh lease another indexer took in the meantime, which is put back.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        if st.st_mtime + self.manager.ttl > now:
+            return False
+        stale = f"{self.path}.{self.manager.token}.stale"
+        try:
+            os.rename(self.path, stale)
+        except FileNotFoundError:
+            # Reclaimed by another indexer first.
+            return True
+        try:
+            sst = os.stat(stale)
+            if (sst.st_ino, sst.st_mtime) != (st.st_ino, st.st_mtime):
+                try:
+                    os.link(stale, self.path)
+                except FileExistsError:
+                    pass
+                return False
+            self.manager.logger.warning(
+                "Reclaiming expired lease {} of {}", self.path, self._owner_of(stale)
+            )
+            return True
+        finally:
+            os.remove(stale)
+
+    def acquire(self, now):
+        """Try to take the lease, reclaiming it if it has expired, returning
+        True if we now hold it.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if self._create():
+            return True
+        if self._reclaim(now):
+            return self._create()
+        return False
+
+    def renew(self):
+        """Renew the lease, returning False (and marking it lost) if it is no
+        longer ours.
+        """
+        if self.lost:
+            return False
+        if self._owner_of(self.path) != self.manager.owner:
+            self.lost = True
+            return False
+        try:
+            os.utime(self.path)
+        except FileNotFoundError:
+            self.lost = True
+            return False
+        return True
+
+    def release(self):
+        """Give up the lease, removing its file if it is still ours."""
+        self.manager._forget(self)
+        if not self.lost and self._owner_of(self.path) == self.manager.owner:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        self.lost = True
+
+
+class LeaseManager:
+    """Claims tar balls for an indexer, and keeps the leases it holds alive
+    with a heartbeat thread.
+    """
+
+    def __init__(self, lease_dir, ttl, owner, logger):
+        assert ttl > 0, "ttl must be positive, {!r}".format(ttl)
+        self.lease_dir = lease_dir
+        self.ttl = ttl
+        # A unique token distinguishes indexers with the same owner name
+        # (e.g. host name and PID, which can be re-used).
+        self.token = uuid.uuid4().hex
+        self.owner = f"{owner}:{self.token}"
+        self.logger = logger
+        self._leases = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def claim(self, controller, tb_name, state):
+        """Return the lease on the given tar ball in the given state
+        directory, or None if another indexer holds it.
+        """
+        lease = Lease(self, controller, tb_name, state)
+        if not lease.acquire(time.time()):
+            return None
+        with self._lock:
+            self._leases.add(lease)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(
+                    target=self._beat, name="lease-heartbeat", daemon=True
+                )
+                self._heartbeat.start()
+        return lease
+
+    def _forget(self, lease):
+        with self._lock:
+            self._leases.discard(lease)
+
+    def _beat(self):
+        while not self._stop.wait(self.ttl / 3):
+            with self._lock:
+                leases = list(self._leases)
+            for lease in leases:
+                try:
+                    if not lease.renew():
+                        self.logger.warning(
+                            "Lost lease {}, now held by {}",
+                            lease.path,
+                            lease._owner_of(lease.path),
+                        )
+                        self._forget(lease)
+                except Exception:
+                    self.logger.exception("Failed to renew lease {}", lease.path)
+
+    def release_all(self):
+        """Release all the leases still held, and stop the heartbeats."""
+        with self._lock:
+            leases = list(self._leases)
+        for lease in leases:
+            lease.release()
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
@@ -0,0 +1,236 @@
+"""Compact table of the members of a tar ball.
+
+A tar ball can have hundreds of thousands of members, and keeping a
+tarfile.TarInfo object for each of them, with its own attribute dictionary
+and full path string, costs hundreds of MB while the tar ball is indexed.
+
+A MemberTable keeps the attributes of the members in parallel arrays instead,
+with each member's path split into its directory, shared by all the members
+of that directory, and its base name, interned so that the many members of a
+tar ball sharing the same base name (the "sample1", "result.json", or
+"disk_IOPS.csv" of every iteration) share one string.  Member records are
+only constructed while they are used, on iteration or indexing.
+"""
+
+import sys
+import tarfile
+from array import array
+
+
+# The types of regular files, as considered by tarfile.TarInfo.isreg(), and
+# their codes.
+_REGULAR_TYPES = frozenset(
+    (tarfile.REGTYPE, tarfile.AREGTYPE, tarfile.CONTTYPE, tarfile.GNUTYPE_SPARSE)
+)
+_REGULAR_CODES = frozenset(ftype[0] for ftype in _REGULAR_TYPES)
+
+# The (single byte) member types, by their code.
+_TYPES = [bytes((code,)) for code in range(256)]
+
+
+class Member:
+    """A record of the attributes of one member of a tar ball, answering the
+    same queries as a tarfile.TarInfo object.
+    """
+
+    __slots__ = ("name", "type", "size", "mode", "mtime", "linkname", "offset_data")
+
+    def __init__(self, name, ftype, size, mode, mtime, linkname, offset_data):
+        self.name = name
+        self.type = ftype
+        self.size = size
+        self.mode = mode
+        self.mtime = mtime
+        self.linkname = linkname
+        self.offset_data = offset_data
+
+    @property
+    def linkpath(self):
+        return self.linkname
+
+    def isfile(self):
+        return self.type in _REGULAR_TYPES
+
+    isreg = isfile
+
+    def isdir(self):
+        return self.type == tarfile.DIRTYPE
+
+    def issym(self):
+        return self.type == tarfile.SYMTYPE
+
+    def tarinfo(self):
+        """Return a tarfile.TarInfo object for the member, with which its
+        data can be read from the tar ball.
+        """
+        tarinfo = tarfile.TarInfo(self.name)
+        tarinfo.type = self.type
+        tarinfo.size = self.size
+        tarinfo.mode = self.mode
+        tarinfo.mtime = self.mtime
+        tarinfo.linkname = self.linkname
+        tarinfo.offset_data = self.offset_data
+        return tarinfo
+
+
+class MemberTable:
+    """The members of a tar ball, in order."""
+
+    def __init__(self):
+        # The distinct directories of the members, and the index of each.
+        self._dirs = []
+        self._dir_index = {}
+        # The interned base names.
+        self._base_names = {}
+        # The attributes of the members, one entry per member.
+        self._dir = array("I")
+        self._base = []
+        self._type = array("B")
+        self._size = array("q")
+        self._mode = array("I")
+        self._mtime = array("d")
+        self._offset_data = array("q")
+        # Link names are few, kept by member index.
+        self._linknames = {}
+
+    def __len__(self):
+        return len(self._base)
+
+    def _dir_of(self, path):
+        try:
+            return self._dir_index[path]
+        except KeyError:
+            idx = self._dir_index[path] = len(self._dirs)
+            self._dirs.append(sys.intern(path))
+            return idx
+
+    def append(self, name, ftype, size, mode, mtime, linkname="", offset_data=0):
+        """Append a member, given its attributes, as a tarfile.TarInfo object
+        would hold them.
+        """
+        dirname, _, base = name.rpartition("/")
+        if linkname:
+            self._linknames[len(self._base)] = linkname
+        self._dir.append(self._dir_of(dirname))
+        self._base.append(self._base_names.setdefault(base, base))
+        self._type.append(ftype[0])
+        self._size.append(size)
+        self._mode.append(mode)
+        self._mtime.append(mtime)
+        self._offset_data.append(offset_data)
+
+    def add(self, tarinfo):
+        """Append the member described by the given tarfile.TarInfo object."""
+        self.append(
+            tarinfo.name,
+            tarinfo.type,
+            tarinfo.size,
+            tarinfo.mode,
+            tarinfo.mtime,
+            tarinfo.linkname,
+            tarinfo.offset_data,
+        )
+
+    def _name(self, idx):
+        dirname = self._dirs[self._dir[idx]]
+        return f"{dirname}/{self._base[idx]}" if dirname else self._base[idx]
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("member index out of range")
+        return Member(
+            self._name(idx),
+            _TYPES[self._type[idx]],
+            self._size[idx],
+            self._mode[idx],
+            self._mtime[idx],
+            self._linknames.get(idx, ""),
+            self._offset_data[idx],
+        )
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def names(self):
+        """Generate the names of all the members."""
+        for idx in range(len(self)):
+            yield self._name(idx)
+
+    def file_names(self):
+        """Generate the names of the members which are regular files."""
+        for idx, code in enumerate(self._type):
+            if code in _REGULAR_CODES:
+                yield self._name(idx)
+
+    def files_named(self, base):
+        """Generate the names of the regular files of the given base name."""
+        base = self._base_names.get(base)
+        if base is None:
+            return
+        for idx, code in enumerate(self._type):
+            if self._base[idx] is base and code in _REGULAR_CODES:
+                yield self._name(idx)
+
+    def subdirs(self, path):
+        """Generate the base names of the directories directly under the
+        given directory.
+        """
+        dir_idx = self._dir_index.get(path)
+        if dir_idx is None:
+            return
+        dirtype = tarfile.DIRTYPE[0]
+        for idx, code in enumerate(self._type):
+            if code == dirtype and self._dir[idx] == dir_idx:
+                yield self._base[idx]
+
+    def by_directory(self):
+        """Generate, in the order of their paths, each directory with the
+        list of the records of its own member (if any) and of the members
+        which are not directories directly in it.
+
+        The members are put in the order of their directory's path by a
+        counting sort over member indexes, so only the records of one
+        directory exist at a time.
+        """
+        dirtype = tarfile.DIRTYPE[0]
+        paths = list(self._dirs)
+        path_index = dict(self._dir_index)
+        # The directory each member is listed with: its own path for a
+        # directory, the one holding it otherwise.
+        keys = array("I")
+        for idx, code in enumerate(self._type):
+            if code == dirtype:
+                path = self._name(idx)
+                key = path_index.get(path)
+                if key is None:
+                    key = path_index[path] = len(paths)
+                    paths.append(path)
+                keys.append(key)
+            else:
+                keys.append(self._dir[idx])
+        del path_index
+        sorted_keys = sorted(range(len(paths)), key=paths.__getitem__)
+        rank = array("I", bytes(4 * len(paths)))
+        for pos, key in enumerate(sorted_keys):
+            rank[key] = pos
+        # The start, in the sorted order, of the members of each directory.
+        starts = array("q", bytes(8 * (len(paths) + 1)))
+        for key in keys:
+            starts[rank[key] + 1] += 1
+        for pos in range(len(paths)):
+            starts[pos + 1] += starts[pos]
+        order = array("I", bytes(4 * len(keys)))
+        fill = array("q", starts)
+        for idx, key in enumerate(keys):
+            pos = rank[key]
+            order[fill[pos]] = idx
+            fill[pos] += 1
+        del keys, fill, rank
+        for pos, key in enumerate(sorted_keys):
+            if starts[pos] < starts[pos + 1]:
+                yield paths[key], [
+                    self[idx] for idx in order[starts[pos] : starts[pos + 1]]
+                ]
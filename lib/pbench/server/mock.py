@@ -181,6 +181,19 @@ class _MockStreamingBulk:
                             )
                             return False
                     return True
+                elif mtype in ("date", "integer", "long", "float", "double", "boolean"):
+                    # A list of values is an array of that type to
+                    # Elasticsearch, so each value is checked in turn.
+                    for item in source:
+                        if isinstance(item, (dict, list)):
+                            print(
+                                "List contains an element of type, {}, when"
+                                " expecting only {} values".format(type(item), mtype)
+                            )
+                            return False
+                        if not _MockStreamingBulk._check_fields(item, mapping):
+                            return False
+                    return True
                 elif mtype != "nested":
                     # Fail first because the mapping type is not 'nested'
                     # for a list object.
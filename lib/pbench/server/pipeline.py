@@ -0,0 +1,190 @@
+"""Pipeline latency module for pbench server.
+
+A tar ball moves through the server pipeline as a link moved from one state
+directory of its controller to the next (TODO, TO-UNPACK, UNPACKED, TO-INDEX,
+TO-INDEX-TOOL, INDEXED, ...), or linked into several of them at once.  When
+the "pipeline-events-dir" of the "pbench-server" section is configured, each
+of those state transitions is recorded as an event, by rename_tb_link() and
+by the shell stages (see record_event in pbench-base.sh), appended to the
+event log of the tar ball:
+
+    <pipeline events dir>/<controller>/<tar ball>.events
+
+Each line of the log is one event, the time (in seconds since the epoch) at
+which the tar ball left a state (or "-" when it left none) for another:
+
+    <time> <from state> <to state>
+
+An event is appended with a single short write, so the stages can record the
+events of a tar ball concurrently.
+
+The time a tar ball dwelt in a state runs from the event which brought it in
+to the first event which took it out.  pbench-pipeline-latency reports the
+percentiles of those dwell times, of the time from a tar ball's first event
+to its reaching INDEXED, and the number of tar balls waiting in each state.
+"""
+
+import math
+import os
+import time
+
+from pbench.server.utils import tb_glob
+
+
+# The state a tar ball reaches once all of its documents are indexed.
+SEARCHABLE_STATE = "INDEXED"
+
+# The name of the "end-to-end" stage, from the first event of a tar ball to
+# its reaching SEARCHABLE_STATE.
+END_TO_END = "end-to-end"
+
+# The default percentiles reported.
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+class PipelineEvents:
+    """The event logs of the tar balls, kept in the given directory."""
+
+    def __init__(self, events_dir):
+        self.events_dir = str(events_dir)
+
+    @classmethod
+    def from_config(cls, config):
+        """Return the event logs of the given server configuration, None when
+        state transitions are not recorded.
+        """
+        return cls(config.PIPELINE_EVENTS) if config.PIPELINE_EVENTS else None
+
+    def path(self, controller, tb_name):
+        return os.path.join(self.events_dir, controller, f"{tb_name}.events")
+
+    def record(self, controller, tb_name, from_state, to_state, ts=None):
+        """Record the given state transition of the tar ball, now unless
+        another time is given.
+        """
+        if ts is None:
+            ts = time.time()
+        path = self.path(controller, tb_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        line = f"{ts:.3f} {from_state or '-'} {to_state}\n".encode("utf-8")
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def record_move(self, link, dest):
+        """Record the move of the given tar ball link, in the state directory
+        of its controller, to the dest state directory.
+        """
+        from_dir = os.path.dirname(link)
+        self.record(
+            os.path.basename(os.path.dirname(from_dir)),
+            os.path.basename(link),
+            os.path.basename(from_dir),
+            os.path.basename(dest.rstrip(os.sep)),
+        )
+
+    @staticmethod
+    def read(path):
+        """Return the events of the given event log, in time order, as
+        (time, from state, to state) tuples; the from state is None when the
+        tar ball left none.
+        """
+        events = []
+        with open(path, "r") as fp:
+            for line in fp:
+                fields = line.split()
+                if len(fields) != 3:
+                    # A partially written event, ignored.
+                    continue
+                try:
+                    ts = float(fields[0])
+                except ValueError:
+                    continue
+                from_state = None if fields[1] == "-" else fields[1]
+                events.append((ts, from_state, fields[2]))
+        events.sort(key=lambda event: event[0])
+        return events
+
+    def logs(self, since=None):
+        """Generate the (controller, tar ball name, events) of all the event
+        logs, skipping those without events since the given time.
+        """
+        try:
+            controllers = sorted(os.scandir(self.events_dir), key=lambda de: de.name)
+        except FileNotFoundError:
+            return
+        for controller in controllers:
+            if not controller.is_dir():
+                continue
+            for de in os.scandir(controller.path):
+                if not de.name.endswith(".events"):
+                    continue
+                if since is not None and de.stat().st_mtime < since:
+                    continue
+                try:
+                    events = self.read(de.path)
+                except FileNotFoundError:
+                    continue
+                yield controller.name, de.name[: -len(".events")], events
+
+
+def dwell_times(events, since=None):
+    """Generate the (state, dwell time) of each state the tar ball of the
+    given events left, since the given time if any, followed by its end-to-end
+    time if it reached SEARCHABLE_STATE since then.
+    """
+    entered = {}
+    for ts, from_state, to_state in events:
+        if from_state is not None:
+            beg = entered.pop(from_state, None)
+            if beg is not None and (since is None or ts >= since):
+                yield from_state, ts - beg
+        entered.setdefault(to_state, ts)
+    if events:
+        first = events[0][0]
+        for ts, _, to_state in events:
+            if to_state == SEARCHABLE_STATE:
+                if since is None or ts >= since:
+                    yield END_TO_END, ts - first
+                break
+
+
+def percentile(values, pct):
+    """Return the given percentile of the sorted values, by the nearest rank
+    method.
+    """
+    rank = max(math.ceil(pct * len(values) / 100), 1)
+    return values[rank - 1]
+
+
+def queue_depths(archive, states):
+    """Return the number of tar balls waiting in each of the given state
+    directories, over all the controllers of the archive.
+    """
+    return {state: sum(1 for _ in tb_glob(archive, "*", state)) for state in states}
+
+
+def pipeline_stats(events, archive, states, since, percentiles=DEFAULT_PERCENTILES):
+    """Return the statistics of the pipeline: the count, the given
+    percentiles, and the maximum of the dwell time in each state of the tar
+    balls which left it since the given time, as well as of their end-to-end
+    times, and the current depth of the queue of each of the given states.
+
+    The events are given as (controller, tar ball name, events) tuples, see
+    PipelineEvents.logs().
+    """
+    times = {}
+    for _, _, tb_events in events:
+        for state, dwell in dwell_times(tb_events, since):
+            times.setdefault(state, []).append(dwell)
+    stages = {}
+    for state, values in sorted(times.items()):
+        values.sort()
+        stage = {"count": len(values)}
+        for pct in percentiles:
+            stage[f"p{pct:d}"] = round(percentile(values, pct), 3)
+        stage["max"] = round(values[-1], 3)
+        stages[state] = stage
+    return {"dwell-times": stages, "queue-depths": queue_depths(archive, states)}
@@ -0,0 +1,131 @@
+"""Selective re-indexing module for pbench server.
+
+By default, re-indexing a tar ball regenerates all of its documents: the run
+document, its table-of-contents documents, its result data, and then, once
+moved on to TO-INDEX-TOOL, its tool data.  pbench-reindex can instead name
+the classes of documents to regenerate (see DOC_CLASSES), and for tool data
+the tools, recording them as a re-index request for each tar ball it moves to
+TO-RE-INDEX:
+
+    <controller>/.reindex/<tar ball>.json
+
+pbench-index honours the request, generating only the action streams of the
+named classes: the run, table-of-contents, and result data streams when it
+works TO-RE-INDEX, and the tool data stream when it works TO-INDEX-TOOL.  A
+tar ball whose request does not name tool data goes straight to INDEXED.
+The request is removed once it has been honoured, when the tar ball link has
+moved to INDEXED; for a spooled tar ball, that is when pbench-replay-spool
+moves it.
+"""
+
+import json
+import os
+
+
+# The classes of documents generated for a tar ball, in the order they are.
+DOC_CLASSES = ("run", "toc", "result", "tool")
+
+# The directory, in a controller's ARCHIVE directory, holding the re-index
+# requests of its tar balls.
+REQUEST_DIR = ".reindex"
+
+
+class BadReindexRequest(Exception):
+    """The document classes of a re-index request are not valid."""
+
+    pass
+
+
+class ReindexRequest:
+    """The classes of documents, and the tools for tool data, to regenerate
+    when re-indexing a tar ball; no tools means all of them.
+    """
+
+    def __init__(self, classes, tools=()):
+        classes = frozenset(classes)
+        unknown = classes.difference(DOC_CLASSES)
+        if unknown:
+            raise BadReindexRequest(
+                f"unknown document classes, {', '.join(sorted(unknown))};"
+                f" expected {', '.join(DOC_CLASSES)}"
+            )
+        self.tools = frozenset(tools)
+        if self.tools:
+            classes |= {"tool"}
+        if not classes:
+            raise BadReindexRequest("no document classes")
+        self.classes = classes
+
+    @classmethod
+    def parse(cls, spec, tools=""):
+        """Return the request for the given comma separated lists of document
+        classes and tools.
+        """
+        return cls(
+            (c.strip() for c in spec.split(",") if c.strip()),
+            (t.strip() for t in tools.split(",") if t.strip()),
+        )
+
+    def __contains__(self, doc_class):
+        return doc_class in self.classes
+
+    def __eq__(self, other):
+        if not isinstance(other, ReindexRequest):
+            return NotImplemented
+        return self.classes == other.classes and self.tools == other.tools
+
+    def __repr__(self):
+        classes = [c for c in DOC_CLASSES if c in self.classes]
+        return f"ReindexRequest({classes!r}, {sorted(self.tools)!r})"
+
+    def wants_tool(self, toolname):
+        """Return True if the tool data of the given tool is to be
+        regenerated.
+        """
+        return "tool" in self.classes and (not self.tools or toolname in self.tools)
+
+    @staticmethod
+    def path(controller_path, tb_name):
+        return os.path.join(controller_path, REQUEST_DIR, f"{tb_name}.json")
+
+    def save(self, controller_path, tb_name):
+        """Record the request for the given tar ball of the controller."""
+        path = self.path(controller_path, tb_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fp:
+            json.dump(
+                {
+                    "classes": [c for c in DOC_CLASSES if c in self.classes],
+                    "tools": sorted(self.tools),
+                },
+                fp,
+                sort_keys=True,
+            )
+        os.rename(tmp, path)
+
+    @classmethod
+    def load(cls, controller_path, tb_name):
+        """Return the request recorded for the given tar ball of the
+        controller, None if there is none (all its documents are then
+        regenerated).
+        """
+        try:
+            with open(cls.path(controller_path, tb_name), "r") as fp:
+                req = json.load(fp)
+        except FileNotFoundError:
+            return None
+        except ValueError as exc:
+            raise BadReindexRequest(f"invalid re-index request, {exc}")
+        try:
+            return cls(req["classes"], req.get("tools", ()))
+        except (AttributeError, KeyError, TypeError) as exc:
+            raise BadReindexRequest(f"invalid re-index request, {exc}")
+
+    @classmethod
+    def remove(cls, controller_path, tb_name):
+        """Remove the request recorded for the given tar ball, if any."""
+        try:
+            os.remove(cls.path(controller_path, tb_name))
+        except FileNotFoundError:
+            pass
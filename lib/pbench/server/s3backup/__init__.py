@@ -3,7 +3,6 @@ This module provides convenience functions that interface to lower-level service
 """
 import boto3
 import os
-import glob
 import base64
 import hashlib
 from configparser import NoSectionError, NoOptionError
@@ -12,6 +11,8 @@ from botocore.exceptions import ConnectionClosedError, ClientError
 
 from enum import Enum
 
+from pbench.server.utils import tb_glob
+
 
 class Status(Enum):
     SUCCESS = 0
@@ -382,7 +383,7 @@ class MockS3Connector(Connector):
     def list_objects(self, **kwargs):
         ob_dict = {}
         bucketpath = os.path.join(self.path, kwargs["Bucket"])
-        result_list = glob.glob(os.path.join(bucketpath, "*/*.tar.xz"))
+        result_list = list(tb_glob(bucketpath, "*"))
         result_list.sort()
         # We pretend that SPECIAL_BUCKET contains too many objects to
         # be returned in one call: we'll need a continuation call to get
@@ -0,0 +1,173 @@
+"""Tar ball scheduling module for pbench server.
+
+By default pbench-index works its tar balls smallest first, but the size of
+a compressed tar ball is a poor predictor of the cost of indexing it: a small
+tar ball holding pidstat data from 50 hosts can take far longer than a large
+one full of sosreports.
+
+The CostModel here instead estimates, from a cheap pre-scan of the unpacked
+tar ball in INCOMING (a walk of its directories, and the first block of each
+.csv file), the number of documents and the number of bytes of data a pass
+of pbench-index will produce and read, and from those the seconds it should
+take.  The tar balls are then ordered:
+
+  * cheapest first, where the estimated cost is reduced by one second for
+    every "aging" seconds the tar ball has been waiting, so that expensive
+    tar balls are not starved by a steady stream of cheap ones
+
+  * in rounds over the controllers, each controller getting its cheapest
+    remaining tar ball scheduled in a round, so that one controller's burst
+    of uploads does not hold up all the others
+
+The estimate is logged next to the actual cost of indexing each tar ball so
+the rates of the model can be tuned.
+"""
+
+import os
+from collections import defaultdict
+
+from pbench.server.utils import tb_resultname
+
+
+# Default rates of the cost model, see the "schedule_docs_per_sec" and
+# "schedule_bytes_per_sec" options of the "Indexing" section.
+DEFAULT_DOCS_PER_SEC = 1000.0
+DEFAULT_BYTES_PER_SEC = 4.0 * 1024 * 1024
+# Default number of seconds of waiting which take a second off the estimated
+# cost of a tar ball, see the "schedule_aging" option.
+DEFAULT_AGING = 10.0
+
+# Bytes read from the head of a .csv file to estimate its number of rows.
+_CSV_SAMPLE_SIZE = 4096
+# Rough number of bytes per document of the result.json files and of the
+# other (non-.csv) tool data files.
+_RESULT_BYTES_PER_DOC = 256
+_TOOL_BYTES_PER_DOC = 128
+# Rough compression ratio of a tar ball, used when it is not unpacked.
+_COMPRESSION_RATIO = 10
+
+
+class Estimate:
+    """The estimated cost of one pass of pbench-index over a tar ball."""
+
+    __slots__ = ("docs", "nbytes", "seconds", "priority")
+
+    def __init__(self, docs, nbytes, seconds):
+        self.docs = docs
+        self.nbytes = nbytes
+        self.seconds = seconds
+        # The estimated cost reduced by aging, see CostModel.order().
+        self.priority = seconds
+
+    def __str__(self):
+        return "{:d} docs, {:d} bytes, {:.2f}s".format(
+            self.docs, self.nbytes, self.seconds
+        )
+
+
+def _csv_docs(path, size):
+    """Estimate the number of documents of a .csv file of tool data, as its
+    number of rows times its number of data columns (the first being the
+    timestamp), from a sample of its first rows.
+    """
+    with open(path, "rb") as fp:
+        sample = fp.read(_CSV_SAMPLE_SIZE)
+    lines = sample.split(b"\n")
+    if len(sample) < size:
+        # The last line of the sample is not complete.
+        lines = lines[:-1]
+    lines = [line for line in lines if line]
+    if len(lines) < 2:
+        return 0
+    header, rows = lines[0], lines[1:]
+    columns = header.count(b",")
+    if len(sample) >= size:
+        return len(rows) * columns
+    row_len = (sum(len(row) for row in rows) + len(rows)) / len(rows)
+    return int((size - len(header) - 1) / row_len) * columns
+
+
+class CostModel:
+    """Estimates the cost of indexing tar balls, and orders them by it."""
+
+    def __init__(
+        self,
+        docs_per_sec=DEFAULT_DOCS_PER_SEC,
+        bytes_per_sec=DEFAULT_BYTES_PER_SEC,
+        aging=DEFAULT_AGING,
+    ):
+        self.docs_per_sec = docs_per_sec
+        self.bytes_per_sec = bytes_per_sec
+        self.aging = aging
+
+    def seconds(self, docs, nbytes):
+        return docs / self.docs_per_sec + nbytes / self.bytes_per_sec
+
+    def estimate(self, tb_dir, size, tool_data):
+        """Return the Estimate of indexing the tar ball unpacked in the given
+        directory, run and result data (the default), or tool data.  A tar
+        ball which is not unpacked is estimated from its size alone.
+        """
+        if not os.path.isdir(tb_dir):
+            nbytes = size * _COMPRESSION_RATIO
+            return Estimate(0, nbytes, self.seconds(0, nbytes))
+        docs = 0 if tool_data else 1
+        nbytes = 0
+        for dirpath, dirnames, filenames in os.walk(tb_dir):
+            if not tool_data:
+                # One table-of-contents document per directory.
+                docs += 1
+            in_tools = "/tools-" in dirpath[len(tb_dir) :]
+            for fname in filenames:
+                if in_tools != tool_data:
+                    continue
+                if not tool_data and fname != "result.json":
+                    continue
+                path = os.path.join(dirpath, fname)
+                try:
+                    fsize = os.path.getsize(path)
+                    if fname.endswith(".csv"):
+                        docs += _csv_docs(path, fsize)
+                    elif tool_data:
+                        docs += fsize // _TOOL_BYTES_PER_DOC
+                    else:
+                        docs += fsize // _RESULT_BYTES_PER_DOC
+                except OSError:
+                    continue
+                nbytes += fsize
+        return Estimate(docs, nbytes, self.seconds(docs, nbytes))
+
+    def order(self, tarballs, incoming, tool_data, now):
+        """Return the given list of (size, controller, tar ball link) tuples in
+        the order they should be indexed, along with a dictionary of their
+        Estimates, by tar ball link.
+
+        The tar balls are unpacked in the controller directories of the given
+        INCOMING directory, and have been waiting since their links were made.
+        """
+        estimates = {}
+        by_controller = defaultdict(list)
+        for item in tarballs:
+            size, controller, tb = item
+            tb_dir = os.path.join(
+                incoming, controller, tb_resultname(os.path.basename(tb))
+            )
+            est = self.estimate(tb_dir, size, tool_data)
+            try:
+                waited = max(now - os.lstat(tb).st_mtime, 0)
+            except OSError:
+                waited = 0
+            est.priority = est.seconds - waited / self.aging
+            estimates[tb] = est
+            by_controller[controller].append(item)
+        # Each controller's tar balls are numbered in order of priority, the
+        # tar balls numbered 0 making up the first round, and so on.
+        rounds = []
+        for items in by_controller.values():
+            items.sort(key=lambda item: (estimates[item[2]].priority, item))
+            rounds.extend(
+                (rnd, estimates[item[2]].priority, item)
+                for rnd, item in enumerate(items)
+            )
+        rounds.sort()
+        return [item for _, _, item in rounds], estimates
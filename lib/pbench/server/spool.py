@@ -0,0 +1,234 @@
+"""Spooling module for pbench server.
+
+When run with "--spool <dir>", pbench-index does not send the actions it
+generates for a tar ball to Elasticsearch, but writes them to a compressed
+file of NDJSON bulk requests in the spool directory, one per tar ball and
+indexing phase (the state directory, e.g. TO-INDEX, the tar ball was taken
+from).  The pbench-replay-spool command replays those files into
+Elasticsearch later, and only then moves the tar ball on to its next state.
+
+Each spooled phase of a tar ball is made up of the following files, kept in
+a sub-directory per controller:
+
+    <tar ball>.<phase>.ndjson.gz    - the bulk actions, an action and meta
+                                      data line followed by a source line
+    <tar ball>.<phase>.json         - the manifest, written last, describing
+                                      the tar ball and where its link goes
+    <tar ball>.<phase>.ckpt         - the replay checkpoint, the number of
+                                      actions acknowledged so far
+    <tar ball>.<phase>.errors.json  - actions which failed to be replayed
+
+Until it is replayed, a spooled phase of a tar ball is also marked in its
+controller's ARCHIVE directory, so that no indexer, whatever its mode or
+spool directory, works that phase of the tar ball again:
+
+    <controller>/.spooled/<tar ball>.<phase>
+"""
+
+import gzip
+import json
+import os
+from itertools import islice
+
+from pbench.server import tstos
+from pbench.server.indexer import es_index
+
+
+# Number of actions replayed between two checkpoints.
+DEFAULT_CHUNK_SIZE = 10000
+
+# The directory, in a controller's ARCHIVE directory, holding the markers of
+# its spooled tar balls.
+MARKER_DIR = ".spooled"
+
+
+class SpoolEntry:
+    """The spooled actions of one tar ball for one indexing phase.
+    """
+
+    def __init__(self, spool_dir, controller, tb_name, phase):
+        self.controller = controller
+        self.tb_name = tb_name
+        self.phase = phase
+        base = os.path.join(spool_dir, controller, f"{tb_name}.{phase}")
+        self.data = f"{base}.ndjson.gz"
+        self.manifest = f"{base}.json"
+        self.checkpoint = f"{base}.ckpt"
+        self.errors = f"{base}.errors.json"
+
+    @classmethod
+    def entries(cls, spool_dir):
+        """Generate all the complete entries found in the spool directory,
+        those with a manifest, ordered by the time they were spooled.
+        """
+        found = []
+        try:
+            controllers = sorted(os.scandir(spool_dir), key=lambda de: de.name)
+        except FileNotFoundError:
+            return
+        for controller in controllers:
+            if not controller.is_dir():
+                continue
+            for de in os.scandir(controller.path):
+                if not de.name.endswith(".json") or de.name.endswith(".errors.json"):
+                    continue
+                tb_name, phase = de.name[: -len(".json")].rsplit(".", 1)
+                found.append(
+                    (
+                        de.stat().st_mtime,
+                        cls(spool_dir, controller.name, tb_name, phase),
+                    )
+                )
+        for _, entry in sorted(found, key=lambda item: item[0]):
+            yield entry
+
+    def exists(self):
+        """Return True if this phase of the tar ball has been spooled."""
+        return os.path.exists(self.manifest)
+
+    @staticmethod
+    def marker(controller_path, tb_name, phase):
+        return os.path.join(controller_path, MARKER_DIR, f"{tb_name}.{phase}")
+
+    @classmethod
+    def is_marked(cls, controller_path, tb_name, phase):
+        """Return True if the given phase of the tar ball of the controller
+        is spooled, by any indexer, waiting to be replayed.
+        """
+        return os.path.exists(cls.marker(controller_path, tb_name, phase))
+
+    def mark(self, controller_path):
+        """Mark this phase of the tar ball as spooled in the given ARCHIVE
+        directory of its controller, recording where it is spooled.
+        """
+        path = self.marker(controller_path, self.tb_name, self.phase)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fp:
+            print(self.manifest, file=fp)
+        os.rename(tmp, path)
+
+    def unmark(self, controller_path):
+        """Remove the spooled mark of this phase of the tar ball, if any."""
+        try:
+            os.remove(self.marker(controller_path, self.tb_name, self.phase))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _write_json(path, obj):
+        """Atomically replace the given file with the JSON for obj."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fp:
+            json.dump(obj, fp, sort_keys=True)
+        os.rename(tmp, path)
+
+    def write(self, actions, tar_ball, linkdest, linkerrdest):
+        """Write all the given actions to the spool, followed by the manifest
+        which records that the tar ball link, tar_ball, moves to the linkdest
+        directory when the actions are replayed, or to linkerrdest when some
+        of them fail.
+
+        Returns the number of actions spooled.
+        """
+        os.makedirs(os.path.dirname(self.data), exist_ok=True)
+        tmp = f"{self.data}.tmp"
+        count = 0
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8") as fp:
+                for action in actions:
+                    meta = {
+                        action["_op_type"]: {
+                            "_index": action["_index"],
+                            "_type": action["_type"],
+                            "_id": action["_id"],
+                        }
+                    }
+                    fp.write(json.dumps(meta))
+                    fp.write("\n")
+                    fp.write(json.dumps(action["_source"]))
+                    fp.write("\n")
+                    count += 1
+            os.rename(tmp, self.data)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        self._write_json(
+            self.manifest,
+            {
+                "tar_ball": tar_ball,
+                "controller": self.controller,
+                "phase": self.phase,
+                "linkdest": linkdest,
+                "linkerrdest": linkerrdest,
+                "actions": count,
+                "spooled": tstos(),
+            },
+        )
+        return count
+
+    def read_manifest(self):
+        with open(self.manifest, "r") as fp:
+            return json.load(fp)
+
+    def read_checkpoint(self):
+        """Return the replay state of this entry, the number of actions done
+        and the counts of their outcomes so far.
+        """
+        try:
+            with open(self.checkpoint, "r") as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return dict(done=0, successes=0, duplicates=0, failures=0, retries=0)
+
+    def actions(self, skip=0):
+        """Generate the spooled actions, skipping the first skip of them."""
+        with gzip.open(self.data, "rt", encoding="utf-8") as fp:
+            lines = iter(fp)
+            for meta_line in lines:
+                source_line = next(lines)
+                if skip > 0:
+                    skip -= 1
+                    continue
+                ((op_type, meta),) = json.loads(meta_line).items()
+                action = dict(meta)
+                action["_op_type"] = op_type
+                action["_source"] = json.loads(source_line)
+                yield action
+
+    def replay(self, es, logger, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Replay the spooled actions into Elasticsearch, starting after the
+        last checkpoint, and recording a new checkpoint each time a chunk of
+        actions has been acknowledged.
+
+        Actions which could not be indexed are appended to the errors file.
+        Returns the final replay state (see read_checkpoint()).
+        """
+        state = self.read_checkpoint()
+        actions = self.actions(state["done"])
+        with open(self.errors, "a") as errorsfp:
+            while True:
+                chunk = list(islice(actions, chunk_size))
+                if not chunk:
+                    break
+                _, _, successes, duplicates, failures, retries = es_index(
+                    es, chunk, errorsfp, logger
+                )
+                state["done"] += len(chunk)
+                state["successes"] += successes
+                state["duplicates"] += duplicates
+                state["failures"] += failures
+                state["retries"] += retries
+                self._write_json(self.checkpoint, state)
+        return state
+
+    def remove(self):
+        """Remove all the files of this entry, the manifest first."""
+        for path in (self.manifest, self.data, self.checkpoint, self.errors):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
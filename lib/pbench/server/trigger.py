@@ -0,0 +1,134 @@
+"""Pipeline triggering module for pbench server.
+
+Each stage of the pipeline (the prep shim, pbench-dispatch,
+pbench-unpack-tarballs, pbench-index) is run by cron every minute, so a tar
+ball can wait a cron period at every stage.  When the "pipeline-trigger-tasks"
+option of the "pbench-server" section lists crontab tasks, the upload API
+instead hands each tar ball it receives (with a "controller" header) over to
+the pipeline at once:
+
+  * the tar ball is enqueued where the prep shim looks for it, in the
+    controller's sub-directory of the receive directory, along with its .md5
+    file (see enqueue())
+
+  * the pipeline is woken up: a wake-up file is created in the lock
+    directory, and pbench-pipeline-trigger is started in the background
+    (see wake())
+
+pbench-pipeline-trigger runs the crontab command of each of those tasks in
+turn, for as long as wake-ups are pending (see run_pending()).  Only one runs
+at a time, and each task runs under the lock of its cron entry, waiting for a
+cron run in progress to finish instead of skipping the task.  Cron remains in
+place as the fallback sweeper.
+"""
+
+import fcntl
+import os
+import re
+import shlex
+import subprocess
+from pathlib import Path
+
+
+WAKEUP_NAME = "pbench-pipeline-trigger.wakeup"
+LOCK_NAME = "pbench-pipeline-trigger.lock"
+
+# The only version of tar ball reception handled by the upload API, see the
+# "pbench-prep-task" crontab template.
+SHIM_VERSION = "002"
+
+# The name of a result tar ball, as the later stages of the pipeline expect
+# it (see the "tb_pat" of the server scripts).
+TB_NAME_RE = re.compile(
+    r"\S+_(\d\d\d\d)[._-](\d\d)[._-](\d\d)[T_](\d\d)[._:](\d\d)[._:](\d\d)"
+    r"\.tar\.(?:xz|zst)"
+)
+
+
+def trigger_tasks(conf):
+    """Return the list of crontab tasks to trigger on upload, empty when
+    triggering is not enabled.
+    """
+    tasks = conf.get("pbench-server", "pipeline-trigger-tasks", fallback="")
+    return [task for task in re.split(r"[\s,]+", tasks) if task]
+
+
+def enqueue(upload_directory, controller, tb, md5sum):
+    """Move the received tar ball, tb, into the controller's sub-directory of
+    the upload directory, and write its .md5 file, where the prep shim picks
+    them up.  Like version 002 agents do, the .md5 file is first written as
+    .md5.check, and renamed once complete.
+
+    Returns the new path of the tar ball.  Raises ValueError when the
+    controller is not a plain directory name.
+    """
+    if not controller or controller in (".", "..") or os.sep in controller:
+        raise ValueError(f"invalid controller name, {controller!r}")
+    dest = Path(upload_directory) / controller
+    dest.mkdir(exist_ok=True)
+    tb_dest = dest / tb.name
+    tb.rename(tb_dest)
+    md5_check = dest / f"{tb.name}.md5.check"
+    md5_check.write_text(f"{md5sum}  {tb.name}\n")
+    md5_check.rename(dest / f"{tb.name}.md5")
+    return tb_dest
+
+
+def wake(lock_dir, script_dir):
+    """Record a pending wake-up of the pipeline, and start a
+    pbench-pipeline-trigger in the background to act on it.  Should one be
+    running already, the new one exits at once, leaving the wake-up to it.
+    """
+    Path(lock_dir, WAKEUP_NAME).touch()
+    subprocess.Popen(
+        [os.path.join(script_dir, "pbench-pipeline-trigger")],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def task_command(conf, task):
+    """Return the command (argument list) of the crontab entry of the given
+    task, waiting for its lock instead of giving up when it is held.
+    """
+    argv = shlex.split(conf.get(task, "crontab"))[5:]
+    argv = [arg.replace("$SHIM_VERSION", SHIM_VERSION) for arg in argv]
+    if argv[:2] == ["flock", "-n"]:
+        del argv[1]
+    return argv
+
+
+def run_pending(conf, lock_dir, logger):
+    """Run the trigger tasks, in order, for as long as wake-ups are pending,
+    unless another pbench-pipeline-trigger is already doing so.
+
+    Returns the number of times the tasks were run.
+    """
+    wakeup = os.path.join(lock_dir, WAKEUP_NAME)
+    tasks = trigger_tasks(conf)
+    passes = 0
+    while os.path.exists(wakeup):
+        with open(os.path.join(lock_dir, LOCK_NAME), "w") as lfp:
+            try:
+                fcntl.flock(lfp, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # The active runner sees the wake-up once it is done, as it
+                # checks for wake-ups again after releasing the lock.
+                break
+            while True:
+                try:
+                    os.remove(wakeup)
+                except FileNotFoundError:
+                    break
+                passes += 1
+                for task in tasks:
+                    argv = task_command(conf, task)
+                    logger.debug("Running task {}: {}", task, " ".join(argv))
+                    res = subprocess.run(argv)
+                    if res.returncode != 0:
+                        logger.warning(
+                            "Task {} exited with status {:d}", task, res.returncode
+                        )
+    return passes
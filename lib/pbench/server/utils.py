@@ -1,11 +1,144 @@
 from functools import partial
+import glob
 import hashlib
 import os
 import sys
 import shutil
+import tarfile
 
+from pbench.server.xzindex import open_indexed
 
-def rename_tb_link(tb, dest, logger):
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# The compression formats of result tar balls, by extension, with the magic
+# number starting the files of each; a controller's tar balls may be of
+# either format.
+TARBALL_FORMATS = {"xz": b"\xfd7zXZ\x00", "zst": b"\x28\xb5\x2f\xfd"}
+TARBALL_EXTENSIONS = tuple(f".tar.{ext}" for ext in TARBALL_FORMATS)
+# The formats of the tar balls this server can read.
+READABLE_FORMATS = tuple(
+    fmt for fmt in TARBALL_FORMATS if fmt != "zst" or zstandard is not None
+)
+
+
+class _ClosingTarFile(tarfile.TarFile):
+    """A tar ball opened over a file object which it owns, and closes along
+    with itself: tarfile leaves open the file objects it is given.
+    """
+
+    owned = None
+
+    def _close_owned(self):
+        if self.owned is not None:
+            self.owned.close()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._close_owned()
+
+    def __exit__(self, *exc_info):
+        # On an exception, tarfile does not call close().
+        try:
+            super().__exit__(*exc_info)
+        finally:
+            self._close_owned()
+
+
+def _open_owned(fileobj, mode):
+    """Open a tar ball over the given file object, which is closed along with
+    the tar ball, or at once should the tar ball fail to open.
+    """
+    try:
+        tar = _ClosingTarFile.open(fileobj=fileobj, mode=mode)
+    except Exception:
+        fileobj.close()
+        raise
+    tar.owned = fileobj
+    return tar
+
+
+def tb_extension(name):
+    """Return the extension (e.g. ".tar.xz") of the given tar ball name, or
+    None if it is not the name of a tar ball.
+    """
+    for ext in TARBALL_EXTENSIONS:
+        if name.endswith(ext):
+            return ext
+    return None
+
+
+def tb_resultname(name):
+    """Return the given tar ball (base) name without its extension."""
+    ext = tb_extension(name)
+    return name[: -len(ext)] if ext else name
+
+
+def tb_glob(*dirs):
+    """Generate the paths of the tar balls, of all formats, in the directories
+    matching the given path components (which may contain wildcards).
+    """
+    for ext in TARBALL_EXTENSIONS:
+        yield from glob.iglob(os.path.join(*dirs, f"*{ext}"))
+
+
+def tb_format(path):
+    """Return the compression format ("xz" or "zst") of the given tar ball,
+    detected from its content, or None if it is of neither.
+    """
+    with open(path, "rb") as fp:
+        magic = fp.read(max(len(m) for m in TARBALL_FORMATS.values()))
+    for fmt, fmt_magic in TARBALL_FORMATS.items():
+        if magic.startswith(fmt_magic):
+            return fmt
+    return None
+
+
+def open_indexed_tarball(path):
+    """Open the given .xz tar ball for random access when it is made of
+    several blocks (see xzindex), returning None when it is not (the tar ball
+    should then be read sequentially).
+    """
+    reader = open_indexed(path)
+    if reader is None:
+        return None
+    return _open_owned(reader, "r:")
+
+
+def open_tarball(path, stream=False):
+    """Open the given tar ball for reading, whatever its compression format,
+    as a stream (see tarfile) if requested.
+
+    xz compressed tar balls made of several blocks are opened for random
+    access (see xzindex), so reading a member only decompresses the blocks
+    holding it.  zstd compressed tar balls can only be read as streams (in
+    one sequential pass), and require the zstandard module.
+    """
+    fmt = tb_format(path)
+    if fmt == "xz" and not stream:
+        tar = open_indexed_tarball(path)
+        if tar is not None:
+            return tar
+    if fmt != "zst":
+        return tarfile.open(path, "r|*" if stream else "r:*")
+    if zstandard is None:
+        raise tarfile.ReadError(
+            f"{path}: zstd compressed, but the zstandard module is not available"
+        )
+    reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return _open_owned(reader, "r|")
+
+
+def rename_tb_link(tb, dest, logger, events=None):
+    """Move the given tar ball link to the dest state directory, recording
+    the state transition in the given pipeline events, if any (see
+    pbench.server.pipeline).
+    """
     try:
         os.mkdir(dest)
     except FileExistsError:
@@ -27,6 +160,17 @@ def rename_tb_link(tb, dest, logger):
             )
         )
         raise
+    if events is not None:
+        try:
+            events.record_move(tb, dest)
+        except Exception as exc:
+            # The tar ball moved on regardless.
+            logger.warning(
+                "Unable to record the move of tar ball link {} to {}: {}",
+                tb,
+                dest,
+                exc,
+            )
 
 
 def md5sum(filename):
@@ -0,0 +1,321 @@
+"""Random access to the contents of multi-block xz files.
+
+An .xz file is a sequence of streams, each made of blocks which are
+compressed independently, followed by an index recording the compressed and
+uncompressed size of every block.  The agent writes result tar balls as a
+sequence of single-block streams (see ParallelXzWriter), and "xz -T" writes
+multi-block streams, so the content at any uncompressed offset of such a file
+can be reached by decompressing only the block containing it.
+
+The block index is loaded from the stream footers and indexes at the end of
+each stream, reading a few hundred bytes per stream, without decompressing
+anything.  XzReader uses it to provide a seekable, read-only file object over
+the uncompressed content, which tarfile can open for random access; the
+members of a tar ball are then read without decompressing the members which
+precede them.
+
+A file made of a single block, as written by a single-threaded "xz", gains
+nothing from random access, and is better read as a whole (see
+open_indexed()).
+"""
+
+import io
+import lzma
+import struct
+import zlib
+from collections import namedtuple
+
+
+# The magic numbers starting a stream header and ending a stream footer.
+_HEADER_MAGIC = b"\xfd7zXZ\x00"
+_FOOTER_MAGIC = b"YZ"
+_HEADER_SIZE = _FOOTER_SIZE = 12
+
+# The size of the integrity check, by check type (the low 4 bits of the
+# stream flags).
+_CHECK_SIZES = (0, 4, 4, 4, 8, 8, 8, 16, 16, 16, 32, 32, 32, 64, 64, 64)
+
+# The id of the LZMA2 filter, the only filter the agent and "xz -T" write,
+# and the largest value of its dictionary size property.
+_FILTER_LZMA2 = 0x21
+_LZMA2_DICT_MAX = 40
+
+# The amount of compressed data fed to the decompressor at once.
+_READ_SIZE = 64 * 1024
+
+
+class XzIndexError(Exception):
+    """The file is not an .xz file, or its index is not valid."""
+
+    pass
+
+
+# A block of an .xz file: the offset of its header in the file, the offset
+# of its content in the uncompressed data, the size of its content, its
+# unpadded size (header, compressed data and check), and the size of its
+# check.
+Block = namedtuple("Block", "offset uoffset usize unpadded check_size")
+
+
+def _round4(size):
+    return (size + 3) & ~3
+
+
+def _varint(buf, pos):
+    """Decode the variable length integer at pos of buf, returning it and the
+    position following it.
+    """
+    value = 0
+    for i in range(9):
+        try:
+            byte = buf[pos + i]
+        except IndexError:
+            raise XzIndexError("truncated integer")
+        value |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            return value, pos + i + 1
+    raise XzIndexError("integer too large")
+
+
+def _read_at(fp, offset, size):
+    fp.seek(offset)
+    buf = fp.read(size)
+    if len(buf) != size:
+        raise XzIndexError(f"truncated file at offset {offset:d}")
+    return buf
+
+
+def _stream_blocks(fp, end):
+    """Return the offset of the stream ending at end, and the list of
+    (unpadded size, uncompressed size, check size) of its blocks, in order.
+    """
+    if end < _HEADER_SIZE + _FOOTER_SIZE:
+        raise XzIndexError("no stream")
+    footer = _read_at(fp, end - _FOOTER_SIZE, _FOOTER_SIZE)
+    if footer[10:] != _FOOTER_MAGIC:
+        raise XzIndexError("no stream footer")
+    if zlib.crc32(footer[4:10]) != struct.unpack("<I", footer[:4])[0]:
+        raise XzIndexError("corrupted stream footer")
+    index_size = (struct.unpack("<I", footer[4:8])[0] + 1) * 4
+    check_size = _CHECK_SIZES[footer[9] & 0x0F]
+    index_offset = end - _FOOTER_SIZE - index_size
+    if index_offset < _HEADER_SIZE:
+        raise XzIndexError("invalid index size")
+    index = _read_at(fp, index_offset, index_size)
+    crc = struct.unpack("<I", index[-4:])[0]
+    if index[0] != 0 or zlib.crc32(index[:-4]) != crc:
+        raise XzIndexError("corrupted index")
+    count, pos = _varint(index, 1)
+    records = []
+    for _ in range(count):
+        unpadded, pos = _varint(index, pos)
+        usize, pos = _varint(index, pos)
+        records.append((unpadded, usize, check_size))
+    offset = index_offset - sum(_round4(r[0]) for r in records) - _HEADER_SIZE
+    if offset < 0:
+        raise XzIndexError("invalid index records")
+    header = _read_at(fp, offset, _HEADER_SIZE)
+    if header[:6] != _HEADER_MAGIC or header[6:8] != footer[8:10]:
+        raise XzIndexError("no matching stream header")
+    return offset, records
+
+
+def load_index(fp):
+    """Return the list of the Blocks of the given (binary, seekable) .xz file,
+    in order, walking its streams backwards from its end.
+    """
+    end = fp.seek(0, io.SEEK_END)
+    streams = []
+    while end > 0:
+        # Skip the stream padding, null bytes in multiples of 4.
+        while end >= 4 and _read_at(fp, end - 4, 4) == b"\0\0\0\0":
+            end -= 4
+        offset, records = _stream_blocks(fp, end)
+        streams.append((offset, records))
+        end = offset
+    blocks = []
+    uoffset = 0
+    for offset, records in reversed(streams):
+        offset += _HEADER_SIZE
+        for unpadded, usize, check_size in records:
+            blocks.append(Block(offset, uoffset, usize, unpadded, check_size))
+            offset += _round4(unpadded)
+            uoffset += usize
+    return blocks
+
+
+def _lzma2_dict_size(props):
+    """Return the dictionary size encoded by the given LZMA2 filter
+    properties, a single byte holding a 1 or 1.5 times power of 2 of at least
+    4 KiB.
+    """
+    if len(props) != 1 or props[0] > _LZMA2_DICT_MAX:
+        raise XzIndexError("invalid LZMA2 filter properties")
+    if props[0] == _LZMA2_DICT_MAX:
+        return 0xFFFFFFFF
+    return (2 | (props[0] & 1)) << (props[0] // 2 + 11)
+
+
+def _block_filters(header):
+    """Return the lzma filter chain specification of the given block header.
+
+    Only a chain made of the LZMA2 filter alone is supported, raising an
+    XzIndexError for any other.
+    """
+    if zlib.crc32(header[:-4]) != struct.unpack("<I", header[-4:])[0]:
+        raise XzIndexError("corrupted block header")
+    flags = header[1]
+    pos = 2
+    if flags & 0x40:
+        _, pos = _varint(header, pos)
+    if flags & 0x80:
+        _, pos = _varint(header, pos)
+    filters = []
+    for _ in range((flags & 0x03) + 1):
+        filter_id, pos = _varint(header, pos)
+        props_size, pos = _varint(header, pos)
+        props = header[pos : pos + props_size]
+        pos += props_size
+        if filter_id != _FILTER_LZMA2:
+            raise XzIndexError(f"unsupported filter {filter_id:#x}")
+        filters.append({"id": lzma.FILTER_LZMA2, "dict_size": _lzma2_dict_size(props)})
+    return filters
+
+
+def _read_block_header(fp, block):
+    """Return the header of the given Block of the .xz file fp."""
+    fp.seek(block.offset)
+    size = fp.read(1)
+    if not size or size[0] == 0:
+        raise XzIndexError(f"no block header at offset {block.offset:d}")
+    header = size + fp.read((size[0] + 1) * 4 - 1)
+    if len(header) != (size[0] + 1) * 4:
+        raise XzIndexError(f"truncated block header at offset {block.offset:d}")
+    return header
+
+
+class XzReader(io.RawIOBase):
+    """A seekable, read-only, binary file object over the uncompressed
+    content of an .xz file.
+
+    Seeking to an offset only costs decompressing the block containing it,
+    from the start of that block, unless the offset is further on in the
+    block being read.
+    """
+
+    def __init__(self, path, blocks=None):
+        self.name = path
+        self._fp = open(path, "rb")
+        try:
+            self.blocks = load_index(self._fp) if blocks is None else blocks
+        except Exception:
+            self._fp.close()
+            raise
+        last = self.blocks[-1] if self.blocks else Block(0, 0, 0, 0, 0)
+        self._size = last.uoffset + last.usize
+        self._pos = 0
+        # The block being read, its decompressor, the uncompressed offset of
+        # the decompressor's next output, and the compressed data left.
+        self._block = None
+        self._decomp = None
+        self._dpos = 0
+        self._cleft = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset:d}")
+        self._pos = offset
+        return offset
+
+    def close(self):
+        if not self.closed:
+            self._fp.close()
+        super().close()
+
+    def _find_block(self, pos):
+        lo, hi = 0, len(self.blocks)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.blocks[mid].uoffset + self.blocks[mid].usize <= pos:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _start_block(self, idx):
+        block = self.blocks[idx]
+        header = _read_block_header(self._fp, block)
+        header_size = len(header)
+        self._decomp = lzma.LZMADecompressor(
+            lzma.FORMAT_RAW, filters=_block_filters(header)
+        )
+        self._block = idx
+        self._dpos = block.uoffset
+        self._cleft = block.unpadded - header_size - block.check_size
+
+    def _decompress(self, size):
+        """Return up to size bytes of the block being read, at _dpos."""
+        while True:
+            if self._decomp.needs_input:
+                if self._cleft <= 0:
+                    raise XzIndexError("truncated block")
+                data = self._fp.read(min(self._cleft, _READ_SIZE))
+                if not data:
+                    raise XzIndexError("truncated file")
+                self._cleft -= len(data)
+            else:
+                data = b""
+            out = self._decomp.decompress(data, max_length=size)
+            if out:
+                self._dpos += len(out)
+                return out
+
+    def readinto(self, b):
+        if self._pos >= self._size or not len(b):
+            return 0
+        idx = self._find_block(self._pos)
+        if self._block != idx or self._dpos > self._pos:
+            self._start_block(idx)
+        block = self.blocks[idx]
+        # Skip what precedes the requested offset in the block.
+        while self._dpos < self._pos:
+            self._decompress(min(self._pos - self._dpos, _READ_SIZE))
+        size = min(len(b), block.uoffset + block.usize - self._pos)
+        out = self._decompress(size)
+        b[: len(out)] = out
+        self._pos += len(out)
+        return len(out)
+
+
+def open_indexed(path):
+    """Open the given .xz file for random access when it is made of several
+    blocks, returning a buffered XzReader, or None when it is not (the file
+    should then be read sequentially).
+
+    None is also returned when a block uses a filter chain which XzReader
+    does not support, which is checked for every block up front, so that it
+    is not found in the middle of reading the file.
+    """
+    try:
+        with open(path, "rb") as fp:
+            blocks = load_index(fp)
+            if len(blocks) < 2:
+                return None
+            for block in blocks:
+                _block_filters(_read_block_header(fp, block))
+    except (OSError, XzIndexError):
+        return None
+    return io.BufferedReader(XzReader(path, blocks), buffer_size=_READ_SIZE)
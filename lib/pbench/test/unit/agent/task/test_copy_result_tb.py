@@ -34,6 +34,29 @@ class TestCopyResults:
         else:
             assert True
 
+    @responses.activate
+    def test_copy_tar_created(self, caplog, valid_config):
+        responses.add(
+            responses.POST, "http://pbench.example.com/api/v1/upload", status=201
+        )
+        caplog.set_level(logging.INFO, logger=self.logger.name)
+        crt = CopyResultTb(tarball, self.config, self.logger)
+        assert crt.copy_result_tb()
+        assert [r.message for r in caplog.records] == ["File uploaded successfully"]
+
+    @responses.activate
+    def test_copy_tar_failed(self, caplog, valid_config):
+        responses.add(
+            responses.POST, "http://pbench.example.com/api/v1/upload", status=400
+        )
+        caplog.set_level(logging.INFO, logger=self.logger.name)
+        crt = CopyResultTb(tarball, self.config, self.logger)
+        with pytest.raises(SystemExit):
+            crt.copy_result_tb()
+        assert [r.message for r in caplog.records] == [
+            "There was something wrong with your request, error code: '400'"
+        ]
+
     @responses.activate
     def test_bad_tar(self, caplog, valid_config):
         responses.add(
@@ -89,3 +112,43 @@ class TestCopyResults:
                 assert caplog.records[0].message == expected_error_message
             else:
                 assert False
+
+    @responses.activate
+    def test_copy_tar_resumable(self, valid_config):
+        session_url = "http://pbench.example.com/api/v1/upload/session"
+        responses.add(
+            responses.POST,
+            session_url,
+            status=201,
+            json={"session": "0" * 32, "received": []},
+        )
+        responses.add(responses.PUT, f"{session_url}/{'0' * 32}", status=200)
+        responses.add(responses.POST, f"{session_url}/{'0' * 32}/complete", status=201)
+        crt = CopyResultTb(tarball, self.config, self.logger)
+        crt.resumable = True
+        crt.copy_result_tb()
+        assert [call.request.method for call in responses.calls] == [
+            "POST",
+            "PUT",
+            "POST",
+        ]
+        assert responses.calls[0].request.headers["md5sum"] == (
+            "9d5a479f6f75fa9b3bab27ef79ad5b29"
+        )
+        # The server is sent the name of the tar ball, not its local path.
+        assert responses.calls[0].request.headers["filename"] == "log.tar.xz"
+        # The local resume state is discarded once the upload completes.
+        assert not (crt.state_dir / "log.tar.xz.json").exists()
+
+    @responses.activate
+    def test_copy_tar_retry(self, monkeypatch, valid_config):
+        responses.add(
+            responses.POST, "http://pbench.example.com/api/v1/upload", status=503
+        )
+        responses.add(
+            responses.POST, "http://pbench.example.com/api/v1/upload", status=200
+        )
+        monkeypatch.setattr("time.sleep", lambda delay: None)
+        crt = CopyResultTb(tarball, self.config, self.logger)
+        assert crt.copy_result_tb()
+        assert len(responses.calls) == 2
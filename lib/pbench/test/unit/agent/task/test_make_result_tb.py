@@ -1,13 +1,19 @@
 import datetime
+import hashlib
+import io
+import json
 import logging
+import lzma
 import os
+import tarfile
 import tempfile
 
 import pytest
 
 from pbench.agent import PbenchAgentConfig
 from pbench.common.logger import get_pbench_logger
-from pbench.agent.results import MakeResultTb
+from pbench.agent.results import MakeResultTb, ParallelXzWriter
+from pbench.server.utils import open_tarball
 from pbench.test.unit.agent.task.common import MockDatetime, MRT_DIR
 
 
@@ -112,3 +118,76 @@ class TestMakeResultTb:
             assert False
         assert tarball == os.path.join(self.target_dir, "make_result_tb.tar.xz")
         assert os.path.exists(tarball)
+        with open(tarball, "rb") as f:
+            md5sum = hashlib.md5(f.read()).hexdigest()
+        with open(f"{tarball}.md5") as f:
+            assert f.read() == f"make_result_tb.tar.xz {md5sum}\n"
+        with tarfile.open(tarball) as tar:
+            names = tar.getnames()
+            assert names[:2] == [
+                "make_result_tb",
+                "make_result_tb/.pbench-manifest.json",
+            ]
+            manifest = json.load(tar.extractfile(names[1]))
+            # The recorded offsets are those of the member data.
+            info = tar.getmember(names[1])
+            blocks = -(-info.size // tarfile.BLOCKSIZE)
+            base = info.offset_data + blocks * tarfile.BLOCKSIZE
+            assert manifest["offsets"][0] is None
+            assert [base + off for off in manifest["offsets"][1:]] == [
+                tar.getmember(name).offset_data for name in names[2:]
+            ]
+        assert [entry[0] for entry in manifest["entries"]] == [
+            "make_result_tb",
+            "make_result_tb/fixture.log",
+            "make_result_tb/metadata.log",
+        ]
+        assert names[2:] == [entry[0] for entry in manifest["entries"][1:]]
+
+    def test_make_tb_zstd(self, monkeypatch):
+        pytest.importorskip("zstandard")
+        monkeypatch.setattr(datetime, "datetime", MockDatetime)
+        self.config.results["compression"] = "zstd"
+        mrt = MakeResultTb(
+            MRT_DIR,
+            self.target_dir,
+            "pbench",
+            "",
+            self.config,
+            self.logger,
+            formats=["xz", "zst"],
+        )
+        tarball = mrt.make_result_tb()
+        assert tarball == os.path.join(self.target_dir, "make_result_tb.tar.zst")
+        # The server reads the tar ball back, streaming it or not.
+        for stream in (False, True):
+            with open_tarball(tarball, stream=stream) as tar:
+                contents = {
+                    m.name: tar.extractfile(m).read() for m in tar if m.isfile()
+                }
+            assert sorted(contents) == [
+                "make_result_tb/.pbench-manifest.json",
+                "make_result_tb/fixture.log",
+                "make_result_tb/metadata.log",
+            ]
+            for name in ("fixture.log", "metadata.log"):
+                with open(os.path.join(MRT_DIR, name), "rb") as f:
+                    assert contents[f"make_result_tb/{name}"] == f.read()
+            manifest = json.loads(contents["make_result_tb/.pbench-manifest.json"])
+            assert [entry[0] for entry in manifest["entries"]] == [
+                "make_result_tb",
+                "make_result_tb/fixture.log",
+                "make_result_tb/metadata.log",
+            ]
+
+    def test_parallel_xz_writer(self, monkeypatch):
+        monkeypatch.setattr(ParallelXzWriter, "block_size", 1000)
+        data = os.urandom(5500)
+        fp = io.BytesIO()
+        writer = ParallelXzWriter(fp, 6, 3)
+        for i in range(0, len(data), 700):
+            writer.write(data[i : i + 700])
+        writer.close()
+        # Six independent blocks decompress as one file.
+        assert fp.getvalue().count(b"\xfd7zXZ\x00") == 6
+        assert lzma.decompress(fp.getvalue()) == data
@@ -2,6 +2,7 @@ import os
 import datetime
 import responses
 
+from pbench.agent import PbenchAgentConfig
 from pbench.cli.agent.commands.results import move_results
 from pbench.test.unit.agent.task.common import MockDatetime
 
@@ -30,3 +31,28 @@ class TestMoveResults:
         except SystemExit:
             assert False
         assert True
+
+    @staticmethod
+    @responses.activate
+    def test_move_results_skipped_runs(monkeypatch, tmp_path):
+        monkeypatch.setenv("full_hostname", "localhost")
+        responses.add(
+            responses.GET,
+            "http://pbench.example.com/api/v1/host_info",
+            status=200,
+            body="pbench@pbench-server:/srv/pbench/pbench-move-results-receive/fs-version-002",
+        )
+        config = PbenchAgentConfig(os.environ["_PBENCH_AGENT_CONFIG"])
+        running = config.pbench_run / "run-running"
+        (running / ".running").mkdir(parents=True)
+        no_metadata = config.pbench_run / "run-no-metadata"
+        no_metadata.mkdir()
+
+        ctx = {"args": {"config": os.environ["_PBENCH_AGENT_CONFIG"]}}
+        try:
+            # Skipping one run does not stop the others from being handled.
+            assert move_results(ctx, "pbench", "", True) == 0
+        finally:
+            (running / ".running").rmdir()
+            running.rmdir()
+            no_metadata.rmdir()
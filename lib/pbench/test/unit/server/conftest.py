@@ -1,6 +1,7 @@
 import shutil
 import tempfile
 import pytest
+from collections import defaultdict
 from pathlib import Path
 
 from pbench.server.api import create_app
@@ -75,3 +76,36 @@ def client(pytestconfig, monkeypatch):
     app_client = app.test_client()
     app_client.config = app.config
     return app_client
+
+
+class CapturingLogger:
+    """A stand-in for a pbench logger, recording the messages logged at each
+    level, formatted, in "messages".
+    """
+
+    def __init__(self):
+        self.messages = defaultdict(list)
+
+    def _log(self, level, msg, *args):
+        self.messages[level].append(msg.format(*args) if args else msg)
+
+    def debug(self, msg, *args):
+        self._log("debug", msg, *args)
+
+    def info(self, msg, *args):
+        self._log("info", msg, *args)
+
+    def warning(self, msg, *args):
+        self._log("warning", msg, *args)
+
+    def error(self, msg, *args):
+        self._log("error", msg, *args)
+
+    def exception(self, msg, *args):
+        self._log("exception", msg, *args)
+
+
+@pytest.fixture
+def logger():
+    """A logger capturing the messages logged by the code under test."""
+    return CapturingLogger()
@@ -0,0 +1,47 @@
+from pbench.server.indexer import CsvFiles
+
+
+def _write_csv(tmp_path, name, nrows):
+    rows = [["timestamp_ms", f"{name}-a", f"{name}-b"]]
+    rows += [[str(1000 * i), f"{name}{i}", f'"quoted, {i}"'] for i in range(nrows)]
+    (tmp_path / name).write_text("".join(",".join(row) + "\n" for row in rows))
+    return [[c.strip('"') for c in row] for row in rows]
+
+
+class TestCsvFiles:
+    @staticmethod
+    def test_interleaved_reads(tmp_path):
+        names = ["a.csv", "b.csv", "c.csv", "d.csv"]
+        expected = {
+            name: _write_csv(tmp_path, name, nrows)
+            for name, nrows in zip(names, (7, 3, 10, 0))
+        }
+        csv_files = CsvFiles(str(tmp_path), 2)
+        for name in names:
+            assert csv_files.read_header(name) == expected[name][0]
+        read = {name: [] for name in names}
+        pending = list(names)
+        while pending:
+            for name in list(pending):
+                rows = csv_files.read_rows(name, 3)
+                assert len(csv_files._open) <= 2
+                assert csv_files.peak <= 2
+                if rows:
+                    read[name].extend(rows)
+                else:
+                    pending.remove(name)
+                    assert csv_files.read_rows(name, 3) == []
+        for name in names:
+            assert read[name] == expected[name][1:]
+        assert csv_files.peak == 2
+        assert not csv_files._open
+
+    @staticmethod
+    def test_close(tmp_path):
+        expected = _write_csv(tmp_path, "a.csv", 5)
+        csv_files = CsvFiles(str(tmp_path), 1)
+        csv_files.read_header("a.csv")
+        assert csv_files.read_rows("a.csv", 2) == expected[1:3]
+        csv_files.close("a.csv")
+        assert csv_files.read_rows("a.csv", 2) == []
+        assert not csv_files._open
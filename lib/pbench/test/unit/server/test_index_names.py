@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pytest
+
+from pbench.server.indexer import BadDate, PbenchData, PbenchTemplates
+
+
+@pytest.fixture
+def templates():
+    # The unit tests are run from the top of the source tree.
+    return PbenchTemplates("./server/bin", "prefix", None, {"iostat": {}})
+
+
+class _IdxContext:
+    def __init__(self, templates):
+        self.templates = templates
+
+
+class _PbenchData(PbenchData):
+    def __init__(self, templates, start_run_ts):
+        self.year, self.month, self.day = (
+            "{:04d}".format(start_run_ts.year),
+            "{:02d}".format(start_run_ts.month),
+            "{:02d}".format(start_run_ts.day),
+        )
+        self.idxctx = _IdxContext(templates)
+        self._days_earlier = {}
+
+
+def _source(ts):
+    return {"@timestamp": ts}
+
+
+class TestIndexNames:
+    @staticmethod
+    def test_memoized(templates):
+        ver = templates.versions["tool-data-iostat"]
+        name = templates.generate_index_name(
+            "tool-data", _source("2020-01-02T03:04:05.000000"), toolname="iostat"
+        )
+        assert name == f"prefix.v{ver}.tool-data-iostat.2020-01-02"
+        assert templates._index_names == {("tool-data", "iostat", "2020-01-02"): name}
+        assert (
+            templates.generate_index_name(
+                "tool-data", _source("2020-01-02T23:59:59.999999"), toolname="iostat"
+            )
+            is name
+        )
+        ver = templates.versions["server-reports"]
+        assert (
+            templates.generate_index_name(
+                "server-reports", _source("2020-01-02T00:00:00.000000")
+            )
+            == f"prefix.v{ver}.server-reports.2020-01"
+        )
+
+    @staticmethod
+    def test_bad_sources(templates):
+        with pytest.raises(BadDate):
+            templates.generate_index_name("server-reports", {})
+        with pytest.raises(Exception, match="Invalid template name"):
+            templates.generate_index_name(
+                "no-such-template", _source("2020-01-02T00:00:00")
+            )
+
+    @staticmethod
+    def test_route_sources(templates):
+        pd = _PbenchData(templates, datetime(2020, 1, 2, 12))
+        with pytest.raises(BadDate):
+            pd.generate_index_name(
+                "tool-data", _source("2020-01-01T23:59:59"), toolname="iostat"
+            )
+        sources = [
+            (_source("2020-01-01T23:59:59"), "id0"),
+            (_source("2020-01-02T12:00:00"), "id1"),
+            (_source("2020-01-02T12:00:01"), "id2"),
+            (_source("2020-01-01T23:59:59"), "id3"),
+            (_source("2020-01-03T00:00:00"), "id4"),
+        ]
+        ver = templates.versions["tool-data-iostat"]
+        routed = [
+            (idx_name, source_id)
+            for idx_name, (_, source_id) in pd.route_sources(
+                "tool-data", sources, toolname="iostat"
+            )
+        ]
+        assert routed == [
+            (f"prefix.v{ver}.tool-data-iostat.2020-01-02", "id1"),
+            (f"prefix.v{ver}.tool-data-iostat.2020-01-02", "id2"),
+            (f"prefix.v{ver}.tool-data-iostat.2020-01-03", "id4"),
+        ]
@@ -0,0 +1,122 @@
+import json
+from collections import Counter
+
+import pytest
+
+from pbench.server import indexer
+from pbench.server.indexer import JsonArrayStream, ResultData, load_json_array
+
+
+_ELEMENTS = [
+    {"iteration_name": "1-a", "data": [[1, 2.5], [3, -4e10]], "nested": {"x": []}},
+    [],
+    [[[]], {}],
+    "a ] bracket, a , comma",
+    'escaped \\" quote ] and \\\\',
+    "unicode é 😀",
+    12345678901234567890,
+    -0.5e-3,
+    True,
+    None,
+    {"]": ",", '"': "[", "k": [{"a": "}"}]},
+]
+
+
+def _write(tmp_path, text, name="result.json"):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+class TestJsonArrayStream:
+    @staticmethod
+    @pytest.mark.parametrize("indent", [None, 2])
+    def test_chunk_boundaries(tmp_path, indent):
+        text = " \n" + json.dumps(_ELEMENTS, indent=indent) + "\n "
+        path = _write(tmp_path, text)
+        # Reading a few characters at a time puts chunk boundaries inside
+        # every token: numbers, literals, strings, escapes, and delimiters.
+        for read_size in range(1, 12):
+            stream = JsonArrayStream(path, read_size=read_size)
+            assert stream.is_array()
+            assert list(stream) == _ELEMENTS, read_size
+            assert stream.error is None
+
+    @staticmethod
+    def test_empty_arrays(tmp_path):
+        for text in ("[]", " [ ] ", "[\n]\n"):
+            stream = JsonArrayStream(_write(tmp_path, text), read_size=1)
+            assert list(stream) == []
+            assert stream.error is None
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "text, decoded",
+        [
+            ('[1, 2, {"a": ', [1, 2]),
+            ("[1, 2", [1, 2]),
+            ("[1 2, 3]", [1]),
+            ('["a", "b"] extra', ["a", "b"]),
+            ('["a", "unterminated]', ["a"]),
+            ("[1, ]", [1]),
+            ('{"a": 1}', []),
+            ("", []),
+        ],
+    )
+    def test_malformed(tmp_path, text, decoded):
+        for read_size in (1, 3, 1024):
+            stream = JsonArrayStream(_write(tmp_path, text), read_size=read_size)
+            assert list(stream) == decoded
+            assert isinstance(stream.error, json.JSONDecodeError)
+            # Iterating again starts over.
+            assert list(stream) == decoded
+
+    @staticmethod
+    def test_is_array(tmp_path):
+        assert JsonArrayStream(_write(tmp_path, "  \n  ["), read_size=1).is_array()
+        assert not JsonArrayStream(_write(tmp_path, ' {"a": []}')).is_array()
+        assert not JsonArrayStream(_write(tmp_path, "   ")).is_array()
+
+
+class TestLoadJsonArray:
+    @staticmethod
+    def test_small_file_loaded(tmp_path):
+        path = _write(tmp_path, json.dumps(_ELEMENTS))
+        assert load_json_array(path) == _ELEMENTS
+
+    @staticmethod
+    def test_large_file_streamed(tmp_path, monkeypatch):
+        monkeypatch.setattr(indexer, "_JSON_STREAM_THRESHOLD", 16)
+        path = _write(tmp_path, json.dumps(_ELEMENTS))
+        stream = load_json_array(path)
+        assert isinstance(stream, JsonArrayStream)
+        assert list(stream) == _ELEMENTS
+        # A large document which is not an array is loaded whole.
+        path = _write(tmp_path, json.dumps({"results": _ELEMENTS}), "obj.json")
+        assert load_json_array(path) == {"results": _ELEMENTS}
+        path = _write(tmp_path, '{"results": [1, 2', "bad.json")
+        with pytest.raises(json.JSONDecodeError):
+            load_json_array(path)
+
+
+class _Ptb:
+    _tbctx = "ctrl/tb"
+
+
+class _ResultData(ResultData):
+    def __init__(self, logger):
+        self.logger = logger
+        self.ptb = _Ptb()
+        self.counters = Counter()
+
+
+def test_invalid_json_file(tmp_path, logger):
+    stream = JsonArrayStream(_write(tmp_path, "[1, 2"))
+    assert list(stream) == [1, 2]
+    rd = _ResultData(logger)
+    rd._invalid_json_file("result.json", stream.error)
+    assert logger.messages["warning"] == [
+        "result-data-indexing: encountered invalid JSON file, result.json:"
+        f" {stream.error!r} (ctrl/tb)"
+    ]
+    assert rd.counters["not_valid_json_file"] == 1
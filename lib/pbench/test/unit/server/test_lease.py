@@ -0,0 +1,59 @@
+import os
+import time
+
+from pbench.server.lease import LeaseManager
+
+
+def _expire(lease, ttl):
+    past = time.time() - ttl - 1
+    os.utime(lease.path, (past, past))
+
+
+class TestLeases:
+    @staticmethod
+    def test_claim_release(tmp_path, logger):
+        one = LeaseManager(str(tmp_path), 60, "host1:1", logger)
+        two = LeaseManager(str(tmp_path), 60, "host2:1", logger)
+        lease = one.claim("ctrl", "tb.tar.xz", "TO-INDEX")
+        assert lease is not None
+        assert os.path.exists(tmp_path / "ctrl" / "tb.tar.xz.TO-INDEX.lease")
+        # Held by another indexer, for this state only.
+        assert two.claim("ctrl", "tb.tar.xz", "TO-INDEX") is None
+        other = two.claim("ctrl", "tb.tar.xz", "TO-INDEX-TOOL")
+        assert other is not None
+        assert lease.renew()
+        lease.release()
+        assert not os.path.exists(lease.path)
+        assert two.claim("ctrl", "tb.tar.xz", "TO-INDEX") is not None
+        one.release_all()
+        two.release_all()
+        assert list((tmp_path / "ctrl").iterdir()) == []
+
+    @staticmethod
+    def test_reclaim_expired(tmp_path, logger):
+        crashed = LeaseManager(str(tmp_path), 60, "host1:1", logger)
+        lease = crashed.claim("ctrl", "tb.tar.xz", "TO-INDEX")
+        _expire(lease, 60)
+        other = LeaseManager(str(tmp_path), 60, "host2:1", logger)
+        new_lease = other.claim("ctrl", "tb.tar.xz", "TO-INDEX")
+        assert new_lease is not None
+        assert len(logger.messages["warning"]) == 1
+        assert "Reclaiming expired lease" in logger.messages["warning"][0]
+        # The crashed indexer, should it come back, finds its lease lost, and
+        # releasing it leaves the new owner's lease in place.
+        assert not lease.renew()
+        lease.release()
+        assert new_lease.renew()
+        other.release_all()
+        crashed.release_all()
+        assert list((tmp_path / "ctrl").iterdir()) == []
+
+    @staticmethod
+    def test_heartbeat(tmp_path, logger):
+        manager = LeaseManager(str(tmp_path), 0.3, "host1:1", logger)
+        lease = manager.claim("ctrl", "tb.tar.xz", "TO-INDEX")
+        _expire(lease, 0.3)
+        time.sleep(0.5)
+        assert os.stat(lease.path).st_mtime > time.time() - 0.3
+        manager.release_all()
+        assert not os.path.exists(lease.path)
@@ -0,0 +1,86 @@
+import tarfile
+
+from pbench.server.members import MemberTable
+
+
+def _tarinfo(name, ftype=tarfile.REGTYPE, size=0, linkname=""):
+    tarinfo = tarfile.TarInfo(name)
+    tarinfo.type = ftype
+    tarinfo.size = size
+    tarinfo.mode = 0o644
+    tarinfo.mtime = 1500000000
+    tarinfo.linkname = linkname
+    return tarinfo
+
+
+class TestMemberTable:
+    @staticmethod
+    def test_members():
+        tarinfos = [
+            _tarinfo("run", tarfile.DIRTYPE),
+            _tarinfo("run/metadata.log", size=10),
+            _tarinfo("run/1-a", tarfile.DIRTYPE),
+            _tarinfo("run/1-a/sample1", tarfile.DIRTYPE),
+            _tarinfo("run/1-a/sample1/result.json", size=2),
+            _tarinfo("run/1-a/sample2", tarfile.DIRTYPE),
+            _tarinfo("run/1-a/sample2/result.json", size=3),
+            _tarinfo("run/1-a/sample2/latest", tarfile.SYMTYPE, linkname="result.json"),
+            _tarinfo("run/11-a", tarfile.DIRTYPE),
+        ]
+        members = MemberTable()
+        for tarinfo in tarinfos:
+            members.add(tarinfo)
+
+        assert len(members) == len(tarinfos)
+        assert list(members.names()) == [t.name for t in tarinfos]
+        for member, tarinfo in zip(members, tarinfos):
+            for attr in ("name", "type", "size", "mode", "mtime", "linkpath"):
+                assert getattr(member, attr) == getattr(tarinfo, attr)
+            assert member.isfile() == tarinfo.isfile()
+            assert member.isdir() == tarinfo.isdir()
+            assert member.issym() == tarinfo.issym()
+        assert members[-1].name == "run/11-a"
+        assert members[4].tarinfo().get_info() == tarinfos[4].get_info()
+
+        assert list(members.file_names()) == [
+            "run/metadata.log",
+            "run/1-a/sample1/result.json",
+            "run/1-a/sample2/result.json",
+        ]
+        assert list(members.files_named("result.json")) == [
+            "run/1-a/sample1/result.json",
+            "run/1-a/sample2/result.json",
+        ]
+        assert list(members.files_named("missing.json")) == []
+        assert list(members.subdirs("run")) == ["1-a", "11-a"]
+        assert list(members.subdirs("run/1-a")) == ["sample1", "sample2"]
+        assert list(members.subdirs("run/missing")) == []
+        # Base names are shared between members.
+        assert members._base[4] is members._base[6]
+
+    @staticmethod
+    def test_by_directory():
+        members = MemberTable()
+        for tarinfo in (
+            _tarinfo("run", tarfile.DIRTYPE),
+            _tarinfo("run/a", tarfile.DIRTYPE),
+            _tarinfo("run/a/f2"),
+            _tarinfo("run/a-b", tarfile.DIRTYPE),
+            _tarinfo("run/metadata.log"),
+            _tarinfo("run/a/b", tarfile.DIRTYPE),
+            _tarinfo("run/a/f1"),
+            _tarinfo("run/a/b/l", tarfile.SYMTYPE, linkname="../f1"),
+        ):
+            members.add(tarinfo)
+
+        # Directories come in the (string) order of their paths, each with
+        # its own member first and then its other members, in order.
+        assert [
+            (path, [m.name for m in dir_members])
+            for path, dir_members in members.by_directory()
+        ] == [
+            ("run", ["run", "run/metadata.log"]),
+            ("run/a", ["run/a", "run/a/f2", "run/a/f1"]),
+            ("run/a-b", ["run/a-b"]),
+            ("run/a/b", ["run/a/b", "run/a/b/l"]),
+        ]
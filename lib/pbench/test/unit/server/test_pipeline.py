@@ -0,0 +1,101 @@
+import os
+
+from pbench.server.pipeline import (
+    END_TO_END,
+    PipelineEvents,
+    dwell_times,
+    percentile,
+    pipeline_stats,
+)
+from pbench.server.utils import rename_tb_link
+
+
+_TB = "tb_2020.06.01T00.00.00.tar.xz"
+
+# The life of a tar ball through the pipeline.
+_EVENTS = [
+    (100.0, None, "TODO"),
+    (110.0, "TODO", "TO-UNPACK"),
+    (110.0, "TODO", "TO-BACKUP"),
+    (150.0, "TO-UNPACK", "UNPACKED"),
+    (150.0, None, "TO-INDEX"),
+    (250.0, "TO-INDEX", "TO-INDEX-TOOL"),
+    (400.0, "TO-BACKUP", "BACKED-UP"),
+    (450.0, "TO-INDEX-TOOL", "INDEXED"),
+]
+
+
+class TestPipelineEvents:
+    @staticmethod
+    def test_record_read(tmp_path):
+        events = PipelineEvents(tmp_path / "events")
+        for ts, from_state, to_state in _EVENTS[:4]:
+            events.record("ctrl", _TB, from_state, to_state, ts=ts)
+        path = events.path("ctrl", _TB)
+        with open(path, "a") as fp:
+            # A partial event is ignored.
+            fp.write("160.0 TO-INDEX")
+        assert PipelineEvents.read(path) == _EVENTS[:4]
+        assert [(c, tb, len(e)) for c, tb, e in events.logs()] == [("ctrl", _TB, 4)]
+        assert list(events.logs(since=os.path.getmtime(path) + 1)) == []
+
+    @staticmethod
+    def test_rename_tb_link(tmp_path, logger):
+        controller = tmp_path / "archive" / "ctrl"
+        (controller / "TO-INDEX").mkdir(parents=True)
+        (controller / _TB).write_bytes(b"")
+        link = controller / "TO-INDEX" / _TB
+        link.symlink_to(controller / _TB)
+        events = PipelineEvents(tmp_path / "events")
+        rename_tb_link(str(link), str(controller / "TO-INDEX-TOOL"), logger, events)
+        assert (controller / "TO-INDEX-TOOL" / _TB).is_symlink()
+        ((_, from_state, to_state),) = PipelineEvents.read(events.path("ctrl", _TB))
+        assert (from_state, to_state) == ("TO-INDEX", "TO-INDEX-TOOL")
+
+    @staticmethod
+    def test_dwell_times():
+        assert list(dwell_times(_EVENTS)) == [
+            ("TODO", 10.0),
+            ("TO-UNPACK", 40.0),
+            ("TO-INDEX", 100.0),
+            ("TO-BACKUP", 290.0),
+            ("TO-INDEX-TOOL", 200.0),
+            (END_TO_END, 350.0),
+        ]
+        assert list(dwell_times(_EVENTS, since=300.0)) == [
+            ("TO-BACKUP", 290.0),
+            ("TO-INDEX-TOOL", 200.0),
+            (END_TO_END, 350.0),
+        ]
+        assert list(dwell_times(_EVENTS[:5])) == [("TODO", 10.0), ("TO-UNPACK", 40.0)]
+
+    @staticmethod
+    def test_percentile():
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([7], 90) == 7
+
+    @staticmethod
+    def test_pipeline_stats(tmp_path):
+        archive = tmp_path / "archive"
+        for state, count in (("TO-INDEX", 2), ("TO-UNPACK", 1)):
+            (archive / "ctrl" / state).mkdir(parents=True)
+            for i in range(count):
+                (archive / "ctrl" / state / f"tb{i:d}.tar.xz").write_bytes(b"")
+        logs = [
+            ("ctrl", f"tb{i:d}.tar.xz", [(t + i, s, d) for t, s, d in _EVENTS])
+            for i in range(10)
+        ]
+        stats = pipeline_stats(
+            logs, str(archive), ["TODO", "TO-UNPACK", "TO-INDEX"], 0.0
+        )
+        assert stats["queue-depths"] == {"TODO": 0, "TO-UNPACK": 1, "TO-INDEX": 2}
+        assert stats["dwell-times"]["TO-INDEX"] == {
+            "count": 10,
+            "p50": 100.0,
+            "p90": 100.0,
+            "p99": 100.0,
+            "max": 100.0,
+        }
+        assert stats["dwell-times"][END_TO_END]["count"] == 10
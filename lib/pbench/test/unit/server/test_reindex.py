@@ -0,0 +1,65 @@
+import pytest
+
+from pbench.server.indexer import PbenchTarBall
+from pbench.server.reindex import BadReindexRequest, ReindexRequest
+
+
+class _TarBall:
+    """Just enough of a PbenchTarBall to drive make_all_actions()."""
+
+    make_all_actions = PbenchTarBall.make_all_actions
+
+    def __init__(self, logger):
+        self.idxctx = self
+        self.logger = logger
+
+    def mk_run_action(self):
+        return "run"
+
+    def mk_toc_actions(self):
+        yield "toc"
+
+    def mk_result_data_actions(self):
+        yield "result"
+
+
+class TestReindexRequest:
+    @staticmethod
+    def test_parse():
+        req = ReindexRequest.parse("run, result")
+        assert "run" in req and "result" in req
+        assert "toc" not in req and "tool" not in req
+        assert not req.wants_tool("iostat")
+
+        # Naming tools implies tool data.
+        req = ReindexRequest.parse("", "iostat,mpstat")
+        assert req.classes == {"tool"}
+        assert req.wants_tool("iostat") and not req.wants_tool("sar")
+        assert ReindexRequest.parse("tool").wants_tool("sar")
+
+        for bad in ("", "run,tools"):
+            with pytest.raises(BadReindexRequest):
+                ReindexRequest.parse(bad)
+
+    @staticmethod
+    def test_save_load(tmp_path):
+        assert ReindexRequest.load(str(tmp_path), "tb.tar.xz") is None
+        req = ReindexRequest(["toc", "tool"], ["iostat"])
+        req.save(str(tmp_path), "tb.tar.xz")
+        assert (tmp_path / ".reindex" / "tb.tar.xz.json").exists()
+        assert ReindexRequest.load(str(tmp_path), "tb.tar.xz") == req
+        ReindexRequest.remove(str(tmp_path), "tb.tar.xz")
+        ReindexRequest.remove(str(tmp_path), "tb.tar.xz")
+        assert ReindexRequest.load(str(tmp_path), "tb.tar.xz") is None
+
+        (tmp_path / ".reindex" / "bad.tar.xz.json").write_text('{"tools": []}')
+        with pytest.raises(BadReindexRequest):
+            ReindexRequest.load(str(tmp_path), "bad.tar.xz")
+
+    @staticmethod
+    def test_make_all_actions(logger):
+        ptb = _TarBall(logger)
+        assert list(ptb.make_all_actions()) == ["run", "toc", "result"]
+        req = ReindexRequest.parse("result,tool")
+        assert list(ptb.make_all_actions(req)) == ["result"]
+        assert list(ptb.make_all_actions(ReindexRequest.parse("tool"))) == []
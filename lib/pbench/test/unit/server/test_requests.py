@@ -1,3 +1,4 @@
+import hashlib
 import os
 
 import pytest
@@ -39,7 +40,7 @@ class TestUpload:
     @staticmethod
     @pytest.mark.parametrize("bad_extension", ("test.tar.bad", "test.tar", "test.tar."))
     def test_bad_extension_upload(client, bad_extension):
-        expected_message = "File extension not supported. Only .xz"
+        expected_message = "File extension not supported. Only .xz, .zst"
         response = client.post(
             f"{client.config['REST_URI']}/upload",
             headers={"filename": bad_extension, "md5sum": "md5sum"},
@@ -68,3 +69,132 @@ class TestUpload:
             f"receive_dir = '{receive_dir}', filename = '{filename}',"
             f" sfilename = '{sfilename}'"
         )
+
+    @staticmethod
+    def test_upload_trigger(client, pytestconfig, monkeypatch):
+        from pbench.server import api
+
+        woken = []
+        monkeypatch.setattr(api.app, "trigger_tasks", ["pbench-index"])
+        monkeypatch.setattr(api, "wake", lambda *args: woken.append(args))
+        data = b"0123456789"
+        md5sum = hashlib.md5(data).hexdigest()
+        name = "pbench-user-benchmark_pushed_2020.01.02T03.04.05.tar.xz"
+        response = client.post(
+            f"{client.config['REST_URI']}/upload",
+            data=data,
+            headers={
+                "filename": name,
+                "md5sum": md5sum,
+                "controller": "ctrl.example.com",
+            },
+        )
+        assert response.status_code == 201, repr(response)
+        assert len(woken) == 1
+        tmp_d = pytestconfig.cache.get("TMP", None)
+        receive_dir = os.path.join(
+            tmp_d, "srv", "pbench", "pbench-move-results-receive", "fs-version-002"
+        )
+        ctrl_dir = os.path.join(receive_dir, "ctrl.example.com")
+        assert not os.path.exists(os.path.join(receive_dir, name))
+        assert os.path.exists(os.path.join(ctrl_dir, name))
+        with open(os.path.join(ctrl_dir, f"{name}.md5")) as fp:
+            assert fp.read().split()[0] == md5sum
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "name, controller",
+        (
+            ("not-a-result.tar.xz", "ctrl.example.com"),
+            ("pbench-user-benchmark_dotdot_2020.01.02T03.04.05.tar.xz", ".."),
+        ),
+    )
+    def test_upload_no_trigger(client, pytestconfig, monkeypatch, name, controller):
+        from pbench.server import api
+
+        woken = []
+        monkeypatch.setattr(api.app, "trigger_tasks", ["pbench-index"])
+        monkeypatch.setattr(api, "wake", lambda *args: woken.append(args))
+        data = b"0123456789"
+        response = client.post(
+            f"{client.config['REST_URI']}/upload",
+            data=data,
+            headers={
+                "filename": name,
+                "md5sum": hashlib.md5(data).hexdigest(),
+                "controller": controller,
+            },
+        )
+        assert response.status_code == 201, repr(response)
+        # The tar ball is left where it was received, for cron to pick up.
+        assert not woken
+        tmp_d = pytestconfig.cache.get("TMP", None)
+        receive_dir = os.path.join(
+            tmp_d, "srv", "pbench", "pbench-move-results-receive", "fs-version-002"
+        )
+        assert os.path.exists(os.path.join(receive_dir, name))
+        assert not os.path.exists(os.path.join(receive_dir, f"{name}.md5"))
+
+
+class TestUploadSession:
+    @staticmethod
+    def test_missing_filesize_header(client):
+        expected_message = "Missing or invalid filesize header in request"
+        response = client.post(
+            f"{client.config['REST_URI']}/upload/session",
+            headers={"filename": "f.tar.xz", "md5sum": "md5sum"},
+        )
+        assert response.status_code == 400
+        assert response.json.get("message") == expected_message
+
+    @staticmethod
+    def test_unknown_session(client):
+        response = client.get(f"{client.config['REST_URI']}/upload/session/../../etc")
+        assert response.status_code == 404
+
+    @staticmethod
+    def test_resumable_upload(client, pytestconfig):
+        data = b"0123456789" * 10
+        md5sum = hashlib.md5(data).hexdigest()
+        headers = {"filename": "chunked.tar.xz", "md5sum": md5sum, "filesize": "100"}
+        uri = f"{client.config['REST_URI']}/upload/session"
+
+        response = client.post(uri, headers=headers)
+        assert response.status_code == 201, repr(response)
+        session_uri = f"{uri}/{response.json['session']}"
+        assert response.json["received"] == []
+
+        # Send the last chunk first, and re-attach to the session.
+        response = client.put(session_uri, data=data[60:], headers={"offset": "60"})
+        assert response.status_code == 200
+        response = client.post(uri, headers=headers)
+        assert response.status_code == 200
+        assert response.json["received"] == [[60, 40]]
+
+        # Completing with data missing is refused.
+        response = client.post(f"{session_uri}/complete")
+        assert response.status_code == 409
+
+        response = client.put(session_uri, data=data[:60], headers={"offset": "0"})
+        assert response.status_code == 200
+        response = client.post(f"{session_uri}/complete")
+        assert response.status_code == 201, repr(response)
+
+        tmp_d = pytestconfig.cache.get("TMP", None)
+        receive_dir = os.path.join(
+            tmp_d, "srv", "pbench", "pbench-move-results-receive", "fs-version-002"
+        )
+        with open(os.path.join(receive_dir, "chunked.tar.xz"), "rb") as f:
+            assert f.read() == data
+        assert client.get(session_uri).status_code == 404
+
+    @staticmethod
+    def test_resumable_upload_bad_md5(client):
+        headers = {"filename": "bad.tar.xz", "md5sum": "0" * 32, "filesize": "4"}
+        uri = f"{client.config['REST_URI']}/upload/session"
+        response = client.post(uri, headers=headers)
+        session_uri = f"{uri}/{response.json['session']}"
+        client.put(session_uri, data=b"data", headers={"offset": "0"})
+        response = client.post(f"{session_uri}/complete")
+        assert response.status_code == 400
+        assert response.json.get("message") == "md5sum check failed for bad.tar.xz"
@@ -0,0 +1,55 @@
+import pytest
+
+from pbench.server.indexer import ResultData
+
+
+def _cvt_ts(date):
+    return "ts-{}".format(date)
+
+
+class TestCompactTimeseries:
+    @staticmethod
+    def test_fixed_interval():
+        tseries = [
+            {"date": 1000, "value": 1.0, "read(0) or write(1)": 0},
+            {"date": 2000, "value": 3.0, "read(0) or write(1)": 1},
+            {"date": 3000, "value": 5.0, "read(0) or write(1)": 0},
+        ]
+        compact = ResultData.make_compact_timeseries(tseries, _cvt_ts)
+        assert compact == {
+            "start": "ts-1000",
+            "end": "ts-3000",
+            "interval_ms": 1000,
+            "values": [1.0, 3.0, 5.0],
+            "read_or_write": [0, 1, 0],
+            "count": 3,
+            "min": 1.0,
+            "max": 5.0,
+            "mean": 3.0,
+            "stddev": pytest.approx(1.632993161855452),
+            "sum": 9.0,
+        }
+        # The timeseries entries are left intact for the per-entry documents.
+        assert tseries[0]["date"] == 1000
+
+    @staticmethod
+    def test_irregular_interval():
+        tseries = [
+            {"date": "1000", "value": 2},
+            {"date": "2500", "value": 2},
+            {"date": "3000"},
+        ]
+        compact = ResultData.make_compact_timeseries(tseries, _cvt_ts)
+        assert "interval_ms" not in compact
+        assert compact["timestamps"] == ["ts-1000", "ts-2500", "ts-3000"]
+        assert compact["values"] == [2, 2, None]
+        assert (compact["count"], compact["mean"], compact["stddev"]) == (2, 2.0, 0.0)
+
+    @staticmethod
+    def test_single_entry():
+        compact = ResultData.make_compact_timeseries(
+            [{"date": 1000, "value": 7}], _cvt_ts
+        )
+        assert compact["start"] == compact["end"] == "ts-1000"
+        assert "interval_ms" not in compact and "timestamps" not in compact
+        assert compact["min"] == compact["max"] == 7.0
@@ -0,0 +1,80 @@
+from pbench.server.indexer import PbenchTemplates, ToolDataRollups
+
+
+class _ToolData:
+    toolname = "iostat"
+    run_metadata = {"id": "run-id"}
+    iteration_metadata = {"name": "1-iter", "number": 1}
+    sample_metadata = {"name": "sample1", "hostname": "host"}
+
+
+def _source(ts, disk, util, reads):
+    return {
+        "@timestamp": ts,
+        "iostat": {"@idx": 0, "id": disk, "util": util, "iops": {"read": reads}},
+    }
+
+
+class TestToolDataRollups:
+    @staticmethod
+    def test_rollup_frag():
+        frag = {
+            "properties": {
+                "@idx": {"type": "long"},
+                "id": {"type": "string", "index": "not_analyzed"},
+                "util": {"type": "float"},
+                "iops": {"properties": {"read": {"type": "float"}}},
+            }
+        }
+        rollup_frag, non_numeric = PbenchTemplates._mk_rollup_frag(frag)
+        assert non_numeric == {("id",)}
+        assert "@idx" not in rollup_frag["properties"]
+        assert rollup_frag["properties"]["id"] == frag["properties"]["id"]
+        assert rollup_frag["properties"]["iops"]["properties"]["read"] == {
+            "properties": {
+                "min": {"type": "float"},
+                "max": {"type": "float"},
+                "mean": {"type": "double"},
+                "last": {"type": "float"},
+            }
+        }
+
+    @staticmethod
+    def test_windows_and_series():
+        rollups = ToolDataRollups(_ToolData(), [("10s", 10), ("1m", 60)], {("id",)})
+        rollups.add(_source("2020-01-02T23:59:48.500000", "sda", 1.0, 4))
+        rollups.add(_source("2020-01-02T23:59:49.000000", "sdb", 7.0, 0))
+        rollups.add(_source("2020-01-02T23:59:52.000000", "sda", 3.0, 2))
+        rollups.add(_source("2020-01-02T23:59:58.000000", "sda", 2.0, 0))
+        docs = [source for source, _ in rollups.make_source()]
+        assert [
+            (d["iostat"]["id"], d["rollup"]["window"], d["@timestamp"]) for d in docs
+        ] == [
+            ("sda", "10s", "2020-01-02T23:59:40.000000"),
+            ("sda", "1m", "2020-01-02T23:59:00.000000"),
+            ("sdb", "10s", "2020-01-02T23:59:40.000000"),
+            ("sdb", "1m", "2020-01-02T23:59:00.000000"),
+            ("sda", "10s", "2020-01-02T23:59:50.000000"),
+        ]
+        sda_10s = docs[4]
+        assert sda_10s["rollup"] == {
+            "window": "10s",
+            "seconds": 10,
+            "count": 2,
+            "end": "2020-01-03T00:00:00.000000",
+        }
+        assert sda_10s["iostat"]["util"] == {
+            "min": 2.0,
+            "max": 3.0,
+            "mean": 2.5,
+            "last": 2.0,
+        }
+        sda_1m = docs[1]
+        assert sda_1m["rollup"]["count"] == 3
+        assert sda_1m["iostat"]["iops"]["read"] == {
+            "min": 0,
+            "max": 4,
+            "mean": 2.0,
+            "last": 0,
+        }
+        assert "@idx" not in sda_1m["iostat"]
@@ -0,0 +1,83 @@
+import os
+
+from pbench.server.schedule import CostModel
+
+
+def _unpacked(incoming, controller, name, hosts=1, rows=10, results=0):
+    """Lay out an unpacked tar ball with pidstat-like tool data from the given
+    number of hosts, and a result.json file of the given size.
+    """
+    tb_dir = incoming / controller / name
+    sample = tb_dir / "1-default" / "sample1"
+    sample.mkdir(parents=True)
+    (tb_dir / "metadata.log").write_text("[pbench]\n")
+    if results:
+        (sample / "result.json").write_bytes(b" " * results)
+    for host in range(hosts):
+        csv = sample / "tools-default" / f"host{host}" / "pidstat" / "csv"
+        csv.mkdir(parents=True)
+        lines = ["timestamp_ms,pid-1,pid-2,pid-3"]
+        lines += [f"{1590000000000 + i * 1000},1.0,2.0,3.0" for i in range(rows)]
+        (csv / "cpu_usage.csv").write_text("\n".join(lines) + "\n")
+    return tb_dir
+
+
+def _link(archive, controller, name, mtime):
+    state = archive / controller / "TO-INDEX"
+    state.mkdir(parents=True, exist_ok=True)
+    tb = state / f"{name}.tar.xz"
+    tb.symlink_to(f"../{name}.tar.xz")
+    os.utime(tb, (mtime, mtime), follow_symlinks=False)
+    return str(tb)
+
+
+class TestCostModel:
+    @staticmethod
+    def test_estimate(tmp_path):
+        model = CostModel(docs_per_sec=100.0, bytes_per_sec=1000.0)
+        tb_dir = _unpacked(tmp_path, "ctrl", "run", hosts=2, rows=2000, results=512)
+        est = model.estimate(str(tb_dir), 100, tool_data=True)
+        # Rows are estimated from the first block of the larger .csv files.
+        assert abs(est.docs - 2 * 2000 * 3) <= 60
+        assert est.nbytes == 2 * os.path.getsize(
+            tb_dir / "1-default/sample1/tools-default/host0/pidstat/csv/cpu_usage.csv"
+        )
+        assert est.seconds == est.docs / 100.0 + est.nbytes / 1000.0
+        est = model.estimate(str(tb_dir), 100, tool_data=False)
+        # The run document, the directories, and the result.json file.
+        assert (est.docs, est.nbytes) == (1 + 10 + 2, 512)
+        est = model.estimate(str(tmp_path / "ctrl" / "gone"), 100, tool_data=True)
+        assert (est.docs, est.nbytes) == (0, 1000)
+
+    @staticmethod
+    def test_order(tmp_path):
+        incoming = tmp_path / "incoming"
+        archive = tmp_path / "archive"
+        now = 1600000000.0
+        tarballs = []
+        for controller, name, hosts, waited in (
+            ("busy", "big", 50, 0),
+            ("busy", "small-1", 1, 0),
+            ("busy", "small-2", 1, 0),
+            ("quiet", "medium", 10, 0),
+        ):
+            _unpacked(incoming, controller, name, hosts=hosts)
+            tb = _link(archive, controller, name, now - waited)
+            tarballs.append((100, controller, tb))
+
+        model = CostModel(docs_per_sec=10.0, bytes_per_sec=1e9, aging=10.0)
+        order, estimates = model.order(tarballs, str(incoming), True, now)
+        assert [os.path.basename(tb) for _, _, tb in order] == [
+            "small-1.tar.xz",
+            "medium.tar.xz",
+            "small-2.tar.xz",
+            "big.tar.xz",
+        ]
+        assert estimates[order[0][2]].docs == 30
+
+        # Having waited long enough, the big tar ball goes first.
+        big = tarballs[0][2]
+        os.utime(big, (now - 3600, now - 3600), follow_symlinks=False)
+        order, estimates = model.order(tarballs, str(incoming), True, now)
+        assert order[0][2] == big
+        assert estimates[big].priority == estimates[big].seconds - 360
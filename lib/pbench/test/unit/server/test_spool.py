@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from pbench.server import indexer
+from pbench.server.spool import SpoolEntry
+
+
+def _actions(count):
+    for i in range(count):
+        yield {
+            "_op_type": "create",
+            "_index": "idx.run.2020-07",
+            "_type": "pbench-run",
+            "_id": f"id{i:03d}",
+            "_source": {"n": i, "name": "run"},
+        }
+
+
+@pytest.fixture
+def bulk(monkeypatch):
+    """Acknowledge every action, recording the IDs seen."""
+    seen = []
+
+    def streaming_bulk(es, actions, **kwargs):
+        for action in actions:
+            seen.append(action["_id"])
+            yield True, {action["_op_type"]: {"_id": action["_id"], "status": 201}}
+
+    monkeypatch.setattr(indexer.helpers, "streaming_bulk", streaming_bulk)
+    return seen
+
+
+class TestSpoolEntry:
+    @staticmethod
+    def test_write_read(tmp_path):
+        entry = SpoolEntry(str(tmp_path), "ctrl", "tb.tar.xz", "TO-INDEX")
+        assert not entry.exists()
+        count = entry.write(_actions(5), "/a/tb.tar.xz", "/a/NEXT", "/a/ERR")
+        assert count == 5
+        assert entry.exists()
+        assert entry.read_manifest()["linkdest"] == "/a/NEXT"
+        assert list(entry.actions()) == list(_actions(5))
+        assert list(entry.actions(3)) == list(_actions(5))[3:]
+        (found,) = list(SpoolEntry.entries(str(tmp_path)))
+        assert (found.controller, found.tb_name, found.phase) == (
+            "ctrl",
+            "tb.tar.xz",
+            "TO-INDEX",
+        )
+
+    @staticmethod
+    def test_failed_write(tmp_path):
+        def actions():
+            yield from _actions(2)
+            raise ValueError("bad data")
+
+        entry = SpoolEntry(str(tmp_path), "ctrl", "tb.tar.xz", "TO-INDEX")
+        with pytest.raises(ValueError):
+            entry.write(actions(), "/a/tb.tar.xz", "/a/NEXT", "/a/ERR")
+        assert not entry.exists()
+        assert list((tmp_path / "ctrl").iterdir()) == []
+
+    @staticmethod
+    def test_replay_resumes(tmp_path, bulk, logger):
+        entry = SpoolEntry(str(tmp_path), "ctrl", "tb.tar.xz", "TO-INDEX-TOOL")
+        entry.write(_actions(7), "/a/tb.tar.xz", "/a/NEXT", "/a/ERR")
+        with open(entry.checkpoint, "w") as fp:
+            json.dump(
+                dict(done=4, successes=4, duplicates=0, failures=0, retries=0), fp
+            )
+        state = entry.replay(None, logger, chunk_size=2)
+        assert bulk == ["id004", "id005", "id006"]
+        assert state["done"] == 7
+        assert state["successes"] == 7
+        assert entry.read_checkpoint() == state
+        entry.remove()
+        assert list((tmp_path / "ctrl").iterdir()) == []
+
+    @staticmethod
+    def test_mark(tmp_path):
+        controller_path = str(tmp_path / "archive" / "ctrl")
+        entry = SpoolEntry(str(tmp_path / "spool"), "ctrl", "tb.tar.xz", "TO-INDEX")
+        assert not SpoolEntry.is_marked(controller_path, "tb.tar.xz", "TO-INDEX")
+        entry.mark(controller_path)
+        assert SpoolEntry.is_marked(controller_path, "tb.tar.xz", "TO-INDEX")
+        # Only the spooled phase is marked.
+        assert not SpoolEntry.is_marked(controller_path, "tb.tar.xz", "TO-INDEX-TOOL")
+        marker = tmp_path / "archive" / "ctrl" / ".spooled" / "tb.tar.xz.TO-INDEX"
+        assert marker.read_text() == f"{entry.manifest}\n"
+        entry.unmark(controller_path)
+        entry.unmark(controller_path)
+        assert not SpoolEntry.is_marked(controller_path, "tb.tar.xz", "TO-INDEX")
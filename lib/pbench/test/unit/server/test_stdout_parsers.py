@@ -0,0 +1,122 @@
+import io
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from pbench.server.indexer import ToolData
+
+
+# Seconds since the epoch of the start of the run.
+_T0 = 1577923200
+
+_PROC_INTERRUPTS = f"""timestamp: {_T0 + 1}.000000000
+           CPU0       CPU1       CPU2
+  0:         25          0          7   IO-APIC-edge      timer
+LOC:      48687      45068      40188   Local timer interrupts
+ERR:          0
+MIS:          0
+timestamp: {_T0 + 3}.500000000
+           CPU0       CPU1       CPU2
+  0:         35         10         12   IO-APIC-edge      timer
+LOC:      48787      45568      40188   Local timer interrupts
+ERR:          4
+MIS:          0
+timestamp: {_T0 + 6}.000000000
+           CPU0       CPU1       CPU2       CPU3
+  0:         40         20         13          5   IO-APIC-edge      timer
+LOC:      49787      45578      40198          9   Local timer interrupts
+ERR:          5
+MIS:          1
+"""
+
+_PROC_VMSTAT = f"""ignored: 1
+timestamp: {_T0 + 1}.0
+nr_free_pages 1000
+nr_dirty 10
+pgrefill 7
+pgpgin 500
+timestamp: {_T0 + 2}.0
+nr_free_pages 900
+nr_dirty 30
+pgrefill 9
+pgpgin 600
+timestamp: {_T0 + 4}.0
+nr_dirty 40
+nr_free_pages 1000
+pgrefill 19
+pgpgin 700
+"""
+
+
+class _Ptb:
+    start_run_ts = datetime(2020, 1, 2, 0, 0, 0)
+    end_run_ts = datetime(2020, 1, 2, 1, 0, 0)
+
+
+class _ToolData(ToolData):
+    def __init__(self, toolname, logger):
+        self.toolname = toolname
+        self.logger = logger
+        self.ptb = _Ptb()
+        self.counters = Counter()
+        self.run_metadata = {"id": "0123abcd"}
+        self.iteration_metadata = {"name": "1-default", "number": 1}
+        self.sample_metadata = {"name": "sample1", "hostname": "host"}
+
+
+def _parse(logger, toolname, parser, text):
+    return list(parser(_ToolData(toolname, logger), io.StringIO(text), int, "path"))
+
+
+@pytest.mark.parametrize(
+    "toolname, generic, compiled, text",
+    [
+        (
+            "proc-interrupts",
+            ToolData._stdout_procint,
+            ToolData._stdout_procint_compiled,
+            _PROC_INTERRUPTS,
+        ),
+        (
+            "proc-vmstat",
+            ToolData._stdout_keyval,
+            ToolData._stdout_keyval_compiled,
+            _PROC_VMSTAT,
+        ),
+    ],
+)
+def test_generic_and_compiled_agree(logger, toolname, generic, compiled, text):
+    records = _parse(logger, toolname, generic, text)
+    assert records
+    assert _parse(logger, toolname, compiled, text) == records
+
+
+def test_procint_rates(logger):
+    records = _parse(
+        logger, "proc-interrupts", ToolData._stdout_procint, _PROC_INTERRUPTS
+    )
+    rates = {}
+    for record in records:
+        tool = record["proc-interrupts"]
+        key = (tool["@idx"], tool["int_id"], tool.get("cpu_id"))
+        rates[key] = tool.get("rate")
+    # Each CPU's rate is taken against its own previous gauge.
+    assert rates[(1, "0", "0")] is None
+    assert rates[(2, "0", "0")] == 10 / 2.5
+    assert rates[(2, "0", "1")] == 10 / 2.5
+    assert rates[(2, "0", "2")] == 5 / 2.5
+    assert rates[(2, "LOC", "1")] == 500 / 2.5
+    assert rates[(2, "ERR", None)] == 4 / 2.5
+    assert rates[(3, "LOC", "2")] == 10 / 2.5
+    # A CPU which was not there before has no rate.
+    assert rates[(3, "0", "3")] is None
+
+
+def test_keyval_rates(logger):
+    records = _parse(logger, "proc-vmstat", ToolData._stdout_keyval, _PROC_VMSTAT)
+    assert [r["proc-vmstat"]["@idx"] for r in records] == [0, 1, 2]
+    assert "rate" not in records[0]["proc-vmstat"]
+    assert records[1]["proc-vmstat"]["gauge"]["pgrefill_"] == 9
+    assert records[1]["proc-vmstat"]["rate"]["pgrefill_"] == 2.0
+    assert records[2]["proc-vmstat"]["rate"]["pgpgin"] == 50.0
@@ -0,0 +1,156 @@
+import io
+import lzma
+import tarfile
+
+import pytest
+
+from pbench.server.indexer import PbenchTarBall
+from pbench.server.utils import open_indexed_tarball, open_tarball
+
+
+def _tar_ball(path, files, mode="w:xz", fileobj=None):
+    """Create a tar ball of the given files, preceded by their directories."""
+    dirs = set()
+    for name in files:
+        parts = name.split("/")[:-1]
+        dirs.update("/".join(parts[:i]) for i in range(1, len(parts) + 1))
+    with tarfile.open(path, mode, fileobj=fileobj) as tar:
+        for name in sorted(dirs):
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.DIRTYPE
+            tar.addfile(info)
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+run = "run_1970.01.01T00.00.00"
+files = {
+    f"{run}/metadata.log": b"[pbench]\n",
+    f"{run}/1-a/sample1/result.json": b"[]",
+    f"{run}/1-a/sample1/uperf.log": b"x" * 1000,
+    f"{run}/1-a/sample1/tools-default/h/iostat/csv/disk.csv": b"ts,a\n",
+    f"{run}/1-a/sample1/tools-default/h/iostat/iostat-stdout.txt": b"",
+    f"{run}/1-a/sample1/tools-default/h/perf/perf.data": b"\0" * 100,
+}
+
+
+class TestStreamMembers:
+    @staticmethod
+    @pytest.mark.parametrize("ext", ("xz", "zst"))
+    def test_stream_members(tmp_path, ext):
+        tb_path = tmp_path / f"{run}.tar.{ext}"
+        if ext == "zst":
+            zstandard = pytest.importorskip("zstandard")
+            with tb_path.open("wb") as fp:
+                with zstandard.ZstdCompressor().stream_writer(fp) as zfp:
+                    _tar_ball(None, files, "w|", zfp)
+        else:
+            _tar_ball(tb_path, files)
+        scratch = tmp_path / "scratch"
+        scratch.mkdir()
+
+        ptb = PbenchTarBall.__new__(PbenchTarBall)
+        ptb.dirname = run
+        ptb.tb = open_tarball(str(tb_path), stream=True)
+        ptb._scratch = str(scratch)
+        members = ptb._stream_members()
+        assert {m.name for m in members if m.isfile()} == set(files)
+        extracted = {
+            str(p.relative_to(scratch)) for p in scratch.rglob("*") if p.is_file()
+        }
+        assert extracted == set(files) - {
+            f"{run}/1-a/sample1/uperf.log",
+            f"{run}/1-a/sample1/tools-default/h/perf/perf.data",
+        }
+        assert (scratch / run / "1-a" / "sample1" / "tools-default" / "h").is_dir()
+        assert (scratch / run / "metadata.log").read_bytes() == b"[pbench]\n"
+        ptb.close()
+        assert not scratch.exists()
+
+    @staticmethod
+    def test_indexed_members(tmp_path):
+        # A tar ball of several xz blocks is read by seeking to its members.
+        tar_path = tmp_path / f"{run}.tar"
+        _tar_ball(tar_path, files, mode="w")
+        data = tar_path.read_bytes()
+        tb_path = tmp_path / f"{run}.tar.xz"
+        tb_path.write_bytes(
+            b"".join(
+                lzma.compress(data[i : i + 1024]) for i in range(0, len(data), 1024)
+            )
+        )
+        scratch = tmp_path / "scratch"
+        scratch.mkdir()
+
+        ptb = PbenchTarBall.__new__(PbenchTarBall)
+        ptb.dirname = run
+        ptb.tb = open_indexed_tarball(str(tb_path))
+        ptb._scratch = str(scratch)
+        members = ptb._get_members(need_offsets=True)
+        for member in members:
+            ptb._extract(member.tarinfo())
+        assert {m.name for m in members if m.isfile()} == set(files)
+        assert (scratch / run / "metadata.log").read_bytes() == b"[pbench]\n"
+        assert not (scratch / run / "1-a" / "sample1" / "uperf.log").exists()
+        ptb.close()
+        assert not scratch.exists()
+
+    @staticmethod
+    def test_listed_members(tmp_path):
+        # Without a manifest, the tar ball is listed in full, including the
+        # first members read looking for the manifest.
+        tb_path = tmp_path / f"{run}.tar.xz"
+        _tar_ball(tb_path, files)
+
+        ptb = PbenchTarBall.__new__(PbenchTarBall)
+        ptb.dirname = run
+        ptb.tb = open_tarball(str(tb_path))
+        members = ptb._get_members()
+        names = [m.name for m in ptb.tb.getmembers()]
+        assert list(members.names()) == names
+        assert names[:2] == [run, f"{run}/1-a"]
+        assert {m.name for m in members if m.isfile()} == set(files)
+        ptb.tb.close()
+
+    @staticmethod
+    def test_outside_members(tmp_path):
+        # Members which would land outside of the scratch directory are
+        # neither created nor extracted.
+        outside = tmp_path / "outside"
+        tb_path = tmp_path / f"{run}.tar.xz"
+        with tarfile.open(tb_path, "w:xz") as tar:
+            for name in (
+                run,
+                str(outside / "abs-dir"),
+                f"{run}/../../outside/dotdot-dir",
+                "../outside/top-dotdot-dir",
+                "other-run/dir",
+            ):
+                info = tarfile.TarInfo(name)
+                info.type = tarfile.DIRTYPE
+                tar.addfile(info)
+            for name in (
+                str(outside / run / "metadata.log"),
+                f"{run}/../outside/{run}/metadata.log",
+                f"{run}/metadata.log",
+            ):
+                info = tarfile.TarInfo(name)
+                info.size = 9
+                tar.addfile(info, io.BytesIO(b"[pbench]\n"))
+        scratch = tmp_path / "scratch"
+        scratch.mkdir()
+
+        ptb = PbenchTarBall.__new__(PbenchTarBall)
+        ptb.dirname = run
+        ptb.tb = tarfile.open(str(tb_path), "r|*")
+        ptb._scratch = str(scratch)
+        ptb._stream_members()
+        assert not outside.exists()
+        assert not (tmp_path / "other-run").exists()
+        assert sorted(str(p.relative_to(scratch)) for p in scratch.rglob("*")) == [
+            run,
+            f"{run}/metadata.log",
+        ]
+        ptb.close()
@@ -0,0 +1,88 @@
+import io
+import tarfile
+
+import pytest
+
+from pbench.server import utils
+
+
+def _tar_ball(path, mode="w:xz"):
+    with tarfile.open(str(path), mode) as tar:
+        info = tarfile.TarInfo("run/metadata.log")
+        info.size = 9
+        tar.addfile(info, io.BytesIO(b"[pbench]\n"))
+
+
+class TestTarballFormats:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "name, ext, resultname",
+        (
+            ("fio_2020.01.02T03.04.05.tar.xz", ".tar.xz", "fio_2020.01.02T03.04.05"),
+            ("fio_2020.01.02T03.04.05.tar.zst", ".tar.zst", "fio_2020.01.02T03.04.05"),
+            ("fio.tar.gz", None, "fio.tar.gz"),
+        ),
+    )
+    def test_names(name, ext, resultname):
+        assert utils.tb_extension(name) == ext
+        assert utils.tb_resultname(name) == resultname
+
+    @staticmethod
+    def test_glob(tmp_path):
+        for name in ("a.tar.xz", "b.tar.zst", "c.tar.xz.md5", "d.tar"):
+            (tmp_path / "ctrl").mkdir(exist_ok=True)
+            (tmp_path / "ctrl" / name).touch()
+        found = sorted(utils.tb_glob(str(tmp_path), "*"))
+        assert found == [
+            str(tmp_path / "ctrl" / "a.tar.xz"),
+            str(tmp_path / "ctrl" / "b.tar.zst"),
+        ]
+
+    @staticmethod
+    def test_detect_format(tmp_path):
+        # The format is detected from the content, not the name.
+        tb = tmp_path / "run.tar.zst"
+        _tar_ball(tb)
+        assert utils.tb_format(str(tb)) == "xz"
+        for stream in (False, True):
+            with utils.open_tarball(str(tb), stream=stream) as tar:
+                assert [m.name for m in tar] == ["run/metadata.log"]
+        zst = tmp_path / "zst.tar.zst"
+        zst.write_bytes(utils.TARBALL_FORMATS["zst"] + b"\0" * 16)
+        assert utils.tb_format(str(zst)) == "zst"
+        gz = tmp_path / "run.tar.gz"
+        _tar_ball(gz, "w:gz")
+        assert utils.tb_format(str(gz)) is None
+
+    @staticmethod
+    def test_read_zstd(tmp_path):
+        zstandard = pytest.importorskip("zstandard")
+        tb = tmp_path / "run.tar.zst"
+        with tb.open("wb") as fp:
+            with zstandard.ZstdCompressor().stream_writer(fp) as zfp:
+                with tarfile.open(fileobj=zfp, mode="w|") as tar:
+                    info = tarfile.TarInfo("run/metadata.log")
+                    info.size = 9
+                    tar.addfile(info, io.BytesIO(b"[pbench]\n"))
+        assert utils.tb_format(str(tb)) == "zst"
+        for stream in (False, True):
+            with utils.open_tarball(str(tb), stream=stream) as tar:
+                member = tar.next()
+                assert member.name == "run/metadata.log"
+                assert tar.extractfile(member).read() == b"[pbench]\n"
+                assert tar.next() is None
+            # The decompressor, and the file under it, are closed with the
+            # tar ball.
+            assert tar.owned.closed
+        with pytest.raises(KeyError):
+            with utils.open_tarball(str(tb)) as tar:
+                raise KeyError("member")
+        assert tar.owned.closed
+
+    @staticmethod
+    def test_open_zstd(tmp_path, monkeypatch):
+        tb = tmp_path / "run.tar.zst"
+        tb.write_bytes(utils.TARBALL_FORMATS["zst"] + b"\0" * 16)
+        monkeypatch.setattr(utils, "zstandard", None)
+        with pytest.raises(tarfile.ReadError):
+            utils.open_tarball(str(tb))
@@ -0,0 +1,95 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from pbench.server.indexer import _MAX_EXACT_TS_MILLIS, BadDate, PbenchData
+
+
+class _Ptb:
+    def __init__(self, start_run_ts, end_run_ts):
+        self.start_run_ts = start_run_ts
+        self.end_run_ts = end_run_ts
+
+
+class _PbenchData(PbenchData):
+    def __init__(self, start_run_ts, end_run_ts):
+        self.ptb = _Ptb(start_run_ts, end_run_ts)
+        self.counters = Counter()
+        self._ts_date_prefixes = {}
+
+
+def _millis(ts):
+    return int((ts - datetime(1970, 1, 1)).total_seconds()) * 1000
+
+
+# A run of one day, and one ending just past the bound of the integer path.
+_START = datetime(2020, 1, 2, 23, 0, 0)
+_RUN = (_START, _START + timedelta(days=1))
+_T0 = _millis(_START)
+_LATE_END = datetime(1970, 1, 1) + timedelta(milliseconds=_MAX_EXACT_TS_MILLIS + 5000)
+_LATE_RUN = (_LATE_END - timedelta(hours=1), _LATE_END)
+
+
+def _row_wise(pd, orig_tss):
+    """Convert the timestamps one at a time, as the vector conversion must."""
+    ts_vals = []
+    for orig_ts in orig_tss:
+        try:
+            ts_vals.append(pd.mk_abs_timestamp_millis(orig_ts))
+        except BadDate as exc:
+            return ts_vals, str(exc)
+    return ts_vals, None
+
+
+@pytest.mark.parametrize(
+    "run, orig_tss",
+    [
+        # Whole milliseconds, as strings and integers, across midnight.
+        (_RUN, [str(_T0), _T0 + 1, str(_T0 + 3600 * 1000 + 999), _T0 + 86400000]),
+        # Relative to the start of the run, then absolute.
+        (_RUN, ["0", 1500, "86399999", str(_T0 + 5)]),
+        # Absolute, then relative.
+        (_RUN, [str(_T0), "1000", 2000]),
+        # Fractional milliseconds, floats, and padded strings.
+        (_RUN, [f"{_T0}.5", float(_T0 + 1), f" {_T0 + 2}", f"{_T0 + 3}.0"]),
+        # About the bound of the integer path.
+        (
+            _LATE_RUN,
+            [
+                str(_MAX_EXACT_TS_MILLIS - 1),
+                _MAX_EXACT_TS_MILLIS - 1,
+                str(_MAX_EXACT_TS_MILLIS),
+                _MAX_EXACT_TS_MILLIS,
+                str(_MAX_EXACT_TS_MILLIS + 1),
+                _MAX_EXACT_TS_MILLIS + 1,
+            ],
+        ),
+        # Negative values.
+        (_RUN, [str(_T0), "-5"]),
+        (_RUN, [_T0, -5]),
+        # Non-numeric values.
+        (_RUN, [str(_T0), str(_T0 + 1), "abc", str(_T0 + 2)]),
+        (_RUN, [None]),
+        (_RUN, ["", str(_T0)]),
+        # Before the start, and after the end, of the run.
+        (_RUN, [str(_T0), str(_T0 - 86400000 * 365)]),
+        (_RUN, [str(_T0), str(_T0 + 86400000 + 1)]),
+        (_RUN, [str(_T0 + 86400000 + 1)]),
+    ],
+)
+def test_mk_abs_timestamps_millis(run, orig_tss):
+    expected_pd = _PbenchData(*run)
+    expected_vals, expected_exc = _row_wise(expected_pd, orig_tss)
+    pd = _PbenchData(*run)
+    ts_vals, exc = pd.mk_abs_timestamps_millis(orig_tss)
+    assert ts_vals == expected_vals
+    if expected_exc is None:
+        assert exc is None
+        assert len(ts_vals) == len(orig_tss)
+    else:
+        # The index of the timestamp which failed is the number converted.
+        assert isinstance(exc, BadDate)
+        assert str(exc) == expected_exc
+        assert len(ts_vals) < len(orig_tss)
+    assert pd.counters == expected_pd.counters
@@ -0,0 +1,235 @@
+import csv
+import os
+from datetime import datetime
+
+import pytest
+
+from pbench.server.indexer import CsvFiles, PbenchData, ToolData, _known_tool_handlers
+
+
+_START = datetime(2020, 1, 2, 0, 0, 0)
+_END = datetime(2020, 1, 2, 1, 0, 0)
+_T0 = int((_START - datetime(1970, 1, 1)).total_seconds()) * 1000
+
+
+def _ts(secs):
+    return str(_T0 + secs * 1000)
+
+
+class _IdxCtx:
+    def __init__(self, logger):
+        self.logger = logger
+        self.tool_filters = {}
+
+
+class _Ptb:
+    def __init__(self, root, logger):
+        self.idxctx = _IdxCtx(logger)
+        self.start_run_ts = _START
+        self.end_run_ts = _END
+        self.run_metadata = dict(
+            id="0123abcd",
+            controller="ctrl",
+            name="run",
+            script="fio",
+            date="2020-01-02T00:00:00",
+            start="2020-01-02T00:00:00.000000",
+            end="2020-01-02T01:00:00.000000",
+        )
+        self.csv_files = CsvFiles(root, 64)
+        self._tbctx = "tb"
+
+
+def _tool_data(tmp_path, logger, toolname, contents):
+    """Return a ToolData for the given .csv files of the tool, read two rows
+    at a time.
+    """
+    ptb = _Ptb(str(tmp_path), logger)
+    td = ToolData.__new__(ToolData)
+    PbenchData.__init__(td, ptb)
+    td.toolname = toolname
+    td.iteration_metadata = dict(name="1-default", number=1)
+    td.sample_metadata = dict(name="sample1", hostname="host")
+    td.basepath = str(tmp_path)
+    td._csv_block_rows = 2
+    td.files = []
+    for name, rows in contents.items():
+        with open(tmp_path / name, "w") as fp:
+            csv.writer(fp).writerows(rows)
+        (handler_rec,) = [
+            rec
+            for rec in _known_tool_handlers[toolname]["patterns"]
+            if rec["pattern"].match(name)
+        ]
+        td.files.append(
+            dict(
+                path=name,
+                basename=name,
+                handler_rec=handler_rec,
+                header=ptb.csv_files.read_header(name),
+            )
+        )
+    return td
+
+
+def _csv_rows(td, csvf):
+    with open(os.path.join(td.ptb.csv_files.root, csvf["path"])) as fp:
+        return list(csv.reader(fp))[1:]
+
+
+def _row_wise_unified(td):
+    """Generate the pidstat documents one row, and one column, at a time."""
+    all_rows = [_csv_rows(td, csvf) for csvf in td.files]
+    identifiers = {}
+    for csvf in td.files:
+        identifiers.update((col, True) for col in csvf["header"][1:])
+    for idx in range(max(len(rows) for rows in all_rows)):
+        rows = [
+            (csvf, rows[idx])
+            for csvf, rows in zip(td.files, all_rows)
+            if idx < len(rows)
+        ]
+        first = rows[0][1][0]
+        if any(row[0] != first for _, row in rows):
+            td.counters["inconsistent_timestamps_across_csv_files"] += 1
+        ts_val = td.mk_abs_timestamp_millis(first)
+        datum = {}
+        for identifier in identifiers:
+            pid, command = identifier.split("-", 1)
+            datum[identifier] = {
+                "@timestamp": ts_val,
+                "@timestamp_original": first,
+                "run": td.run_metadata,
+                "iteration": td.iteration_metadata,
+                "sample": td.sample_metadata,
+                "pidstat": {
+                    "id": identifier,
+                    "@idx": idx,
+                    "pid": pid,
+                    "command": command,
+                    "context_switches": {},
+                },
+            }
+        for csvf, row in rows:
+            columns = dict(enumerate(csvf["header"]))
+            metric = csvf["handler_rec"]["metric"]
+            for col, val in enumerate(row[1:], 1):
+                datum[columns[col]]["pidstat"]["context_switches"][metric] = float(val)
+        yield from datum.values()
+
+
+def _row_wise_individual(td):
+    """Generate the mpstat documents one row, and one column, at a time."""
+    for csvf in td.files:
+        datum_id = csvf["handler_rec"]["pattern"].match(csvf["basename"]).group("id")
+        for idx, row in enumerate(_csv_rows(td, csvf)):
+            ts_val = td.mk_abs_timestamp_millis(row[0])
+            cpu = {}
+            for col, val in enumerate(row[1:], 1):
+                cpu[csvf["header"][col]] = float(val)
+            yield {
+                "@timestamp": ts_val,
+                "@timestamp_original": row[0],
+                "run": td.run_metadata,
+                "iteration": td.iteration_metadata,
+                "sample": td.sample_metadata,
+                "mpstat": {"id": datum_id, "@idx": idx, "cpu": cpu},
+            }
+
+
+def _drain(gen):
+    """Return the documents generated, and the type and message of the
+    exception raised, if any.
+    """
+    docs = []
+    try:
+        for doc in gen:
+            docs.append(doc[0] if isinstance(doc, tuple) else doc)
+    except Exception as exc:
+        return docs, (type(exc), str(exc))
+    return docs, None
+
+
+_PIDSTAT_HEADER = ["timestamp_ms", "10-bash", "20-sshd"]
+_MPSTAT_HEADER = ["timestamp_ms", "usr", "sys"]
+_VOLUNTARY = "context_switches_voluntary_switches_sec.csv"
+_NONVOLUNTARY = "context_switches_nonvoluntary_switches_sec.csv"
+
+
+@pytest.mark.parametrize(
+    "toolname, contents",
+    [
+        # Mismatched row counts, a short row, an inconsistent timestamp.
+        (
+            "pidstat",
+            {
+                _VOLUNTARY: [_PIDSTAT_HEADER]
+                + [[_ts(i), f"{i}.5", "2"] for i in range(2)]
+                + [[_ts(2), "7"]]
+                + [[_ts(i), "1", f"{i}"] for i in range(3, 6)],
+                _NONVOLUNTARY: [_PIDSTAT_HEADER]
+                + [[_ts(i), "0", "3.25"] for i in range(3)]
+                + [[_ts(3) + "1", "4", "4"]],
+            },
+        ),
+        # A bad timestamp in the middle of a block.
+        (
+            "pidstat",
+            {
+                _VOLUNTARY: [_PIDSTAT_HEADER]
+                + [[_ts(i), "1", "2"] for i in range(3)]
+                + [["bogus", "1", "2"], [_ts(4), "1", "2"]],
+                _NONVOLUNTARY: [_PIDSTAT_HEADER]
+                + [[_ts(i), "3", "4"] for i in range(5)],
+            },
+        ),
+        # A row longer than its header, after a short one.
+        (
+            "pidstat",
+            {
+                _VOLUNTARY: [_PIDSTAT_HEADER, [_ts(0), "1"], [_ts(1), "1", "2", "3"]],
+                _NONVOLUNTARY: [_PIDSTAT_HEADER, [_ts(0), "1", "2"]],
+            },
+        ),
+        # Timestamps relative to the start of the run, a short row.
+        (
+            "mpstat",
+            {
+                "cpu0_cpuall.csv": [_MPSTAT_HEADER]
+                + [[str(i * 1000), "1.5", "2"] for i in range(3)]
+                + [["3000", "9"], ["4000", "1", "1"]],
+                "cpu1_cpuall.csv": [_MPSTAT_HEADER]
+                + [[_ts(i), "0", f"{i}"] for i in range(5)],
+            },
+        ),
+        # A fractional timestamp, then one after the end of the run.
+        (
+            "mpstat",
+            {
+                "cpu0_cpuall.csv": [_MPSTAT_HEADER]
+                + [[_ts(i), "1", "2"] for i in range(2)]
+                + [[_ts(2) + ".5", "1", "2"], [_ts(7200), "1", "2"]],
+            },
+        ),
+        # A row longer than its header.
+        (
+            "mpstat",
+            {
+                "cpu0_cpuall.csv": [_MPSTAT_HEADER]
+                + [[_ts(0), "1", "2"], [_ts(1), "1", "2", "3"]],
+            },
+        ),
+    ],
+)
+def test_blocks_match_row_wise(tmp_path, logger, toolname, contents):
+    reference = _row_wise_unified if toolname == "pidstat" else _row_wise_individual
+    expected_td = _tool_data(tmp_path, logger, toolname, contents)
+    expected = _drain(reference(expected_td))
+    td = _tool_data(tmp_path, logger, toolname, contents)
+    if toolname == "pidstat":
+        gen = td._make_source_unified()
+    else:
+        gen = td._make_source_individual()
+    assert _drain(gen) == expected
+    assert td.counters == expected_td.counters
+    assert expected[0]
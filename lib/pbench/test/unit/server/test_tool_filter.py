@@ -0,0 +1,141 @@
+from configparser import ConfigParser
+
+import pytest
+
+from pbench.common.exceptions import ConfigFileError
+from pbench.server.indexer import ToolDataFilter, _known_tool_handlers
+
+
+class _Config:
+    def __init__(self, text):
+        self.conf = ConfigParser()
+        self.conf.read_string(text)
+
+
+class _CsvFiles:
+    def __init__(self, root):
+        self.root = root
+
+
+class _Ptb:
+    def __init__(self, root):
+        self.csv_files = _CsvFiles(root)
+
+
+class _ToolData:
+    def __init__(self, root, files):
+        self.ptb = _Ptb(root)
+        self.files = files
+
+
+def _write_csv(tmp_path, name, rows):
+    (tmp_path / name).write_text("\n".join(",".join(row) for row in rows) + "\n")
+    return {"basename": name, "path": name}
+
+
+def _mappings():
+    metric_mapping = {
+        "cpu.csv": ("cpu", "usage", float),
+        "io.csv": ("io", "reads", float),
+    }
+    field_mapping = {
+        name: {0: None, 1: ("1-a", None), 2: ("2-b", None), 3: ("3-c", None)}
+        for name in metric_mapping
+    }
+    return metric_mapping, field_mapping
+
+
+@pytest.fixture
+def tool_data(tmp_path):
+    header = ["timestamp_ms", "1-a", "2-b", "3-c"]
+    files = [
+        _write_csv(
+            tmp_path,
+            "cpu.csv",
+            [header, ["1000", "0", "5", "1"], ["2000", "0", "7", "2"]],
+        ),
+        _write_csv(
+            tmp_path,
+            "io.csv",
+            [header, ["1000", "0", "0", "9"], ["2000", "0", "0", "0"]],
+        ),
+    ]
+    return _ToolData(str(tmp_path), files)
+
+
+class TestToolDataFilter:
+    @staticmethod
+    def test_from_config():
+        config = _Config(
+            "[tool-data-filter-pidstat]\ndrop_zero = yes\ntop_n = 2\n"
+            "top_metric = cpu.usage\n"
+        )
+        handler = _known_tool_handlers["pidstat"]
+        assert ToolDataFilter.from_config(config, "sar", handler) is None
+        tdfilter = ToolDataFilter.from_config(config, "pidstat", handler)
+        assert tdfilter.drop_zero
+        assert tdfilter.threshold is None
+        assert (tdfilter.top_n, tdfilter.top_metric) == (2, "cpu.usage")
+
+    @staticmethod
+    def test_bad_config():
+        config = _Config("[tool-data-filter-pidstat]\ntop_n = 2\n")
+        with pytest.raises(ConfigFileError):
+            ToolDataFilter.from_config(
+                config, "pidstat", _known_tool_handlers["pidstat"]
+            )
+        config = _Config("[tool-data-filter-proc-interrupts]\ndrop_zero = yes\n")
+        with pytest.raises(ConfigFileError):
+            ToolDataFilter.from_config(
+                config, "proc-interrupts", _known_tool_handlers["proc-interrupts"]
+            )
+
+    @staticmethod
+    def test_scan(tool_data):
+        metric_mapping, field_mapping = _mappings()
+        identifiers = {"1-a": True, "2-b": True, "3-c": True}
+        tdfilter = ToolDataFilter("pidstat", drop_zero=True)
+        assert tdfilter.scan(tool_data, identifiers, metric_mapping, field_mapping) == (
+            {"1-a"},
+            set(),
+        )
+        tdfilter = ToolDataFilter("pidstat", threshold=8)
+        assert tdfilter.scan(tool_data, identifiers, metric_mapping, field_mapping) == (
+            {"1-a", "2-b"},
+            set(),
+        )
+        tdfilter = ToolDataFilter("pidstat", top_n=1, top_metric="cpu.usage")
+        assert tdfilter.scan(tool_data, identifiers, metric_mapping, field_mapping) == (
+            set(),
+            {"1-a", "3-c"},
+        )
+
+    @staticmethod
+    def test_apply():
+        def source(identifier, usage, command):
+            return {
+                "@timestamp": "2020-01-02T00:00:01.000000",
+                "pidstat": {
+                    "@idx": 0,
+                    "id": identifier,
+                    "command": command,
+                    "cpu": {"usage": usage},
+                },
+            }
+
+        datum = {
+            "1-a": source("1-a", 0, "a"),
+            "2-b": source("2-b", 5, "b"),
+            "3-c": source("3-c", 1, "c"),
+            "4-d": source("4-d", 2.5, "d"),
+        }
+        tdfilter = ToolDataFilter(
+            "pidstat", drop_zero=True, top_n=1, top_metric="cpu.usage"
+        )
+        filtered = tdfilter.apply(datum, {"1-a"}, {"3-c", "4-d"})
+        assert list(filtered.keys()) == ["2-b", "other"]
+        assert filtered["2-b"] is datum["2-b"]
+        assert filtered["other"] == {
+            "@timestamp": "2020-01-02T00:00:01.000000",
+            "pidstat": {"id": "other", "@idx": 0, "cpu": {"usage": 3.5}},
+        }
@@ -0,0 +1,76 @@
+import configparser
+
+import pytest
+
+from pbench.server import trigger
+
+
+def _config(tmp_path, tasks):
+    conf = configparser.ConfigParser(interpolation=None)
+    conf.read_dict(
+        {
+            "pbench-server": {"pipeline-trigger-tasks": ", ".join(tasks)},
+            "task-a": {
+                "crontab": "* * * * *  flock -n /lock/a.lock"
+                f" touch {tmp_path}/a-$SHIM_VERSION"
+            },
+            "task-b": {"crontab": f"* * * * *  touch {tmp_path}/b"},
+        }
+    )
+    return conf
+
+
+class TestTrigger:
+    @staticmethod
+    def test_enqueue(tmp_path):
+        tb = tmp_path / "tb.tar.xz"
+        tb.write_bytes(b"data")
+        new = trigger.enqueue(tmp_path, "ctrl", tb, "0123abcd")
+        assert new == tmp_path / "ctrl" / "tb.tar.xz"
+        assert not tb.exists()
+        assert new.read_bytes() == b"data"
+        md5 = tmp_path / "ctrl" / "tb.tar.xz.md5"
+        assert md5.read_text() == "0123abcd  tb.tar.xz\n"
+        assert not (tmp_path / "ctrl" / "tb.tar.xz.md5.check").exists()
+
+    @staticmethod
+    @pytest.mark.parametrize("controller", ("", ".", "..", "a/b"))
+    def test_enqueue_bad_controller(tmp_path, controller):
+        tb = tmp_path / "tb.tar.xz"
+        tb.write_bytes(b"data")
+        with pytest.raises(ValueError):
+            trigger.enqueue(tmp_path, controller, tb, "0123abcd")
+        assert tb.exists()
+        assert not (tmp_path / "tb.tar.xz.md5").exists()
+
+    @staticmethod
+    def test_tb_name():
+        assert trigger.TB_NAME_RE.fullmatch(
+            "pbench-user-benchmark_foo_2020.01.02T03.04.05.tar.zst"
+        )
+        assert not trigger.TB_NAME_RE.fullmatch(
+            "var_lib_pbench-agent_tmp_foo_2020.01.02T03.04.05.tar.xz.md5"
+        )
+        assert not trigger.TB_NAME_RE.fullmatch("tb.tar.xz")
+
+    @staticmethod
+    def test_task_command(tmp_path):
+        conf = _config(tmp_path, ["task-a"])
+        assert trigger.trigger_tasks(conf) == ["task-a"]
+        assert trigger.task_command(conf, "task-a") == [
+            "flock",
+            "/lock/a.lock",
+            "touch",
+            f"{tmp_path}/a-002",
+        ]
+        assert trigger.task_command(conf, "task-b") == ["touch", f"{tmp_path}/b"]
+
+    @staticmethod
+    def test_run_pending(tmp_path, logger):
+        conf = _config(tmp_path, ["task-b"])
+        assert trigger.run_pending(conf, str(tmp_path), logger) == 0
+        assert not (tmp_path / "b").exists()
+        (tmp_path / trigger.WAKEUP_NAME).touch()
+        assert trigger.run_pending(conf, str(tmp_path), logger) == 1
+        assert (tmp_path / "b").exists()
+        assert not (tmp_path / trigger.WAKEUP_NAME).exists()
@@ -0,0 +1,123 @@
+import io
+import lzma
+import os
+import tarfile
+
+import pytest
+
+from pbench.server import xzindex
+from pbench.server.utils import open_indexed_tarball
+
+
+def _multi_stream(data, block_size):
+    """Compress data as a sequence of single-block .xz streams, as the agent
+    does.
+    """
+    return b"".join(
+        lzma.compress(data[i : i + block_size]) for i in range(0, len(data), block_size)
+    )
+
+
+class TestXzIndex:
+    @staticmethod
+    def test_load_index(tmp_path):
+        data = os.urandom(10000)
+        xz = tmp_path / "data.xz"
+        xz.write_bytes(_multi_stream(data, 3000) + b"\0" * 8)
+        with xz.open("rb") as fp:
+            blocks = xzindex.load_index(fp)
+        assert [(b.uoffset, b.usize) for b in blocks] == [
+            (0, 3000),
+            (3000, 3000),
+            (6000, 3000),
+            (9000, 1000),
+        ]
+
+    @staticmethod
+    def test_not_xz(tmp_path):
+        bad = tmp_path / "data.gz"
+        bad.write_bytes(b"\x1f\x8b" + b"\0" * 30)
+        with pytest.raises(xzindex.XzIndexError):
+            xzindex.XzReader(str(bad))
+        assert xzindex.open_indexed(str(bad)) is None
+
+    @staticmethod
+    def test_random_reads(tmp_path):
+        data = os.urandom(5000) + bytes(range(256)) * 40
+        xz = tmp_path / "data.xz"
+        xz.write_bytes(_multi_stream(data, 1024))
+        reader = io.BufferedReader(xzindex.XzReader(str(xz)))
+        for offset, size in ((9000, 1000), (0, 10), (1020, 10), (3000, 7000)):
+            reader.seek(offset)
+            assert reader.read(size) == data[offset : offset + size]
+        reader.seek(0)
+        assert reader.read() == data
+        reader.close()
+
+    @staticmethod
+    def test_open_indexed_tarball(tmp_path):
+        files = {f"run/{i:d}.log": os.urandom(1500) for i in range(6)}
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            for name, data in files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        multi = tmp_path / "multi.tar.xz"
+        multi.write_bytes(_multi_stream(buf.getvalue(), 2048))
+        with open_indexed_tarball(str(multi)) as tar:
+            reader = tar.fileobj
+            assert len(reader.raw.blocks) > 1
+            for name in reversed(list(files)):
+                assert tar.extractfile(name).read() == files[name]
+        # The reader, and the file under it, are closed with the tar ball.
+        assert reader.closed and reader.raw._fp.closed
+
+        # A single block tar ball is read sequentially.
+        single = tmp_path / "single.tar.xz"
+        single.write_bytes(lzma.compress(buf.getvalue()))
+        assert open_indexed_tarball(str(single)) is None
+
+    @staticmethod
+    @pytest.mark.parametrize("dict_size", [4096, 6144, 1 << 20, 3 << 20, 8 << 20])
+    def test_block_filters(dict_size):
+        xz = lzma.compress(
+            b"data", filters=[{"id": lzma.FILTER_LZMA2, "dict_size": dict_size}]
+        )
+        header = xz[12 : 12 + (xz[12] + 1) * 4]
+        assert xzindex._block_filters(header) == [
+            {"id": lzma.FILTER_LZMA2, "dict_size": dict_size}
+        ]
+
+    @staticmethod
+    def test_lzma2_dict_size():
+        assert xzindex._lzma2_dict_size(b"\x27") == 3 << 30
+        assert xzindex._lzma2_dict_size(b"\x28") == 0xFFFFFFFF
+        for props in (b"\x29", b"\xc0", b"", b"\x00\x00"):
+            with pytest.raises(xzindex.XzIndexError):
+                xzindex._lzma2_dict_size(props)
+
+    @staticmethod
+    def test_unsupported_filter(tmp_path):
+        files = {f"run/{i:d}.log": os.urandom(1500) for i in range(4)}
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            for name, data in files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        data = buf.getvalue()
+        # A delta filter ahead of LZMA2 in the last block only.
+        filters = [{"id": lzma.FILTER_DELTA}, {"id": lzma.FILTER_LZMA2}]
+        delta = tmp_path / "delta.tar.xz"
+        delta.write_bytes(
+            _multi_stream(data[:4096], 2048)
+            + lzma.compress(data[4096:], filters=filters)
+        )
+        # The tar ball is read sequentially rather than failing part way.
+        assert xzindex.open_indexed(str(delta)) is None
+        reader = xzindex.XzReader(str(delta))
+        reader.seek(4096)
+        with pytest.raises(xzindex.XzIndexError):
+            reader.read(10)
+        reader.close()
@@ -12,7 +12,7 @@
 #     For each "good" controller do:
 #       Verify all sub-directories of a given controller are one
 #         of the expected state directories
-#       Verify all files are *.tar.xz[.md5]
+#       Verify all files are *.tar.xz[.md5] (or *.tar.zst[.md5])
 #         flagging *.tar.xz.prefix or prefix.*.tar.xz in the
 #         controller directory
 #       Verify all prefix files in .prefix directories are *.prefix
@@ -219,7 +219,7 @@ function verify_incoming {
 
         invalid_tb_dirs="${workdir}/invalidtbdirs"
         while read tb ; do
-            if [[ -r $ARCHIVE/${controller}/${tb}.tar.xz ]]; then
+            if [[ -r $ARCHIVE/${controller}/${tb}.tar.xz || -r $ARCHIVE/${controller}/${tb}.tar.zst ]]; then
                 continue
             fi
             printf "\t\t${tb}\n"
@@ -241,7 +241,7 @@ function verify_incoming {
         invalid_unpacking_dirs="${workdir}/invalidunpacking"
         while read tb_u ; do
             tb=${tb_u%*.unpack}
-            if [[ -r $ARCHIVE/${controller}/${tb}.tar.xz ]]; then
+            if [[ -r $ARCHIVE/${controller}/${tb}.tar.xz || -r $ARCHIVE/${controller}/${tb}.tar.zst ]]; then
                 continue
             fi
             printf "\t\t${tb_u}\n"
@@ -342,7 +342,7 @@ function verify_results {
         rm ${tarball_links}.unsorted
         while read path link ; do
             tb=$(basename -- ${path})
-            if [[ ! -e $ARCHIVE/${controller}/${tb}.tar.xz ]]; then
+            if [[ ! -e $ARCHIVE/${controller}/${tb}.tar.xz && ! -e $ARCHIVE/${controller}/${tb}.tar.zst ]]; then
                 # The tar ball does not exist in the archive hierarchy.
                 printf "\t\t${path}\n" >> ${invalid_tb_links}
             else
@@ -677,10 +677,10 @@ function verify_archive {
         > ${unexpected_objects}.unsorted
         > ${tarballs}
         find ${controller} -maxdepth 1 \
-                \( -type d ! -name . ! -name $(basename -- ${controller}) ! -name .prefix -fprintf ${directories}.unsorted "\t  %f\n" \) \
+                \( -type d ! -name . ! -name $(basename -- ${controller}) ! -name .prefix ! -name .reindex ! -name .spooled -fprintf ${directories}.unsorted "\t  %f\n" \) \
                 -o \( -type l -fprintf ${unexpected_symlinks}.unsorted "\t  %f -> %l\n" \) \
-                -o \( -type f ! -name '*.tar.xz.md5' ! -name '*.tar.xz' -fprintf ${unexpected_objects}.unsorted "\t  %f\n" \) \
-                -o \( -type f \( -name '*.tar.xz.md5' -o -name '*.tar.xz' \) -fprintf ${tarballs} "%f\n" \)
+                -o \( -type f ! -name '*.tar.xz.md5' ! -name '*.tar.xz' ! -name '*.tar.zst.md5' ! -name '*.tar.zst' -fprintf ${unexpected_objects}.unsorted "\t  %f\n" \) \
+                -o \( -type f \( -name '*.tar.xz.md5' -o -name '*.tar.xz' -o -name '*.tar.zst.md5' -o -name '*.tar.zst' \) -fprintf ${tarballs} "%f\n" \)
         status=$?
         if [[ $status -gt 0 ]]; then
             printf "*** ERROR *** unable to traverse controller hierarchy for $(basename -- ${controller}): find failed with $status\n" >> ${lclreport}
@@ -3,16 +3,16 @@
 
 import os
 import sys
-import glob
 import shutil
 import tempfile
 
 from pbench.server import PbenchServerConfig
 from pbench.common.exceptions import BadConfig
 from pbench.common.logger import get_pbench_logger
+from pbench.server.pipeline import PipelineEvents
 from pbench.server.report import Report
 from pbench.server.s3backup import S3Config, Status, NoSuchKey
-from pbench.server.utils import md5sum, rename_tb_link, quarantine
+from pbench.server.utils import md5sum, rename_tb_link, quarantine, tb_glob
 
 
 _NAME_ = "pbench-backup-tarballs"
@@ -321,7 +321,9 @@ def backup_to_s3(
 def backup_data(lb_obj, s3_obj, config, logger):
     qdir = config.QDIR
 
-    tarlist = glob.iglob(os.path.join(config.ARCHIVE, "*", _linksrc, "*.tar.xz"))
+    events = PipelineEvents.from_config(config)
+
+    tarlist = tb_glob(config.ARCHIVE, "*", _linksrc)
     ntotal = nbackup_success = nbackup_fail = ns3_success = ns3_fail = nquaran = 0
 
     for tb in sorted(tarlist):
@@ -443,7 +445,7 @@ def backup_data(lb_obj, s3_obj, config, logger):
             s3_obj is None or s3_backup_result == Status.SUCCESS
         ):
             # Move tar ball symlink to its final resting place
-            rename_tb_link(tb, os.path.join(controller_path, _linkdest), logger)
+            rename_tb_link(tb, os.path.join(controller_path, _linkdest), logger, events)
         else:
             # Do nothing when the backup fails, allowing us to retry on a
             # future pass.
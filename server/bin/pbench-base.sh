@@ -63,6 +63,25 @@ else
     }
 fi
 
+# Record a state transition of a tar ball, from the state in the 3rd argument
+# ("-" for none) to the one in the 4th, in its pipeline event log when the
+# pipeline events directory is configured, see pbench.server.pipeline.
+# Failing to record it does not fail the stage.
+function record_event {
+    local controller="${1}"
+    local tbname="${2}"
+    local from="${3}"
+    local to="${4}"
+
+    if [[ -z "${PIPELINE_EVENTS}" ]]; then
+        return 0
+    fi
+    mkdir -p ${PIPELINE_EVENTS}/${controller} 2> /dev/null && \
+        printf -- "%s %s %s\n" "$(timestamp-seconds-since-epoch)" "${from}" "${to}" \
+            >> ${PIPELINE_EVENTS}/${controller}/${tbname}.events 2> /dev/null
+    return 0
+}
+
 function mk_dirs {
     hostname=$1
 
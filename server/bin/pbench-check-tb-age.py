@@ -23,7 +23,8 @@ from pbench.server import PbenchServerConfig
 _NAME_ = "pbench-check-tb_age"
 
 tb_pat_r = (
-    r"\S+_(\d\d\d\d)[._-](\d\d)[._-](\d\d)[T_](\d\d)[._:](\d\d)[._:](\d\d)\.tar\.xz"
+    r"\S+_(\d\d\d\d)[._-](\d\d)[._-](\d\d)[T_](\d\d)[._:](\d\d)[._:](\d\d)"
+    r"\.tar\.(?:xz|zst)"
 )
 tb_pat = re.compile(tb_pat_r)
 
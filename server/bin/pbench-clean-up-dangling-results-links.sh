@@ -18,11 +18,18 @@ for x in $(find . -type l) ; do
      if [ ! -d $y ] ;then
         hostname=$(basename $(dirname $y))
         pbench_run_name=$(basename $y)
-        if [ -f $ARCHIVE/$hostname/$pbench_run_name.tar.xz ] ;then
-            log_info "$x -> $y dangling and $hostname/$pbench_run_name.tar.xz exists - cleaning up the link"
+        tarball=""
+        for tbext in .tar.xz .tar.zst ;do
+            if [ -f $ARCHIVE/$hostname/$pbench_run_name$tbext ] ;then
+                tarball=$hostname/$pbench_run_name$tbext
+                break
+            fi
+        done
+        if [ ! -z "$tarball" ] ;then
+            log_info "$x -> $y dangling and $tarball exists - cleaning up the link"
             rm -f $x
         else
-            log_error "$x -> $y dangling and $hostname/$pbench_run_name.tar.xz does *NOT* exist"
+            log_error "$x -> $y dangling and $hostname/$pbench_run_name.tar.{xz,zst} does *NOT* exist"
         fi
      fi
 done
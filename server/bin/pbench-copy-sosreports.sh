@@ -67,7 +67,7 @@ fi
 log_info "$TS: starting at $(timestamp)"
 
 # get the list of files we'll be operating on
-list=$(ls $ARCHIVE/*/$linksrc/*.tar.xz 2>/dev/null)
+list=$(ls $ARCHIVE/*/$linksrc/*.tar.xz $ARCHIVE/*/$linksrc/*.tar.zst 2>/dev/null)
 
 typeset -i nresults=0
 typeset -i ntotal=0
@@ -87,7 +87,8 @@ for result in $list ;do
     fi
 
     resultname=$(basename $result)
-    resultname=${resultname%.tar.xz}
+    tbext=.tar.${resultname##*.tar.}
+    resultname=${resultname%${tbext}}
     hostname=$(basename $(dirname $link))
 
     # echo $link
@@ -160,6 +161,7 @@ for result in $list ;do
         nerrs=$nerrs+1
         continue
     fi
+    record_event ${hostname} $(basename $result) ${linksrc} ${linkdest}
 
     # log the success
     log_info "$TS: $hostname/$resultname: processed $nsr sosreports for $result"
@@ -33,6 +33,7 @@ from pbench.common.exceptions import BadConfig
 from pbench.common.logger import get_pbench_logger
 from pbench.server.indexer import _STD_DATETIME_FMT
 from pbench.server.report import Report
+from pbench.server.utils import TARBALL_EXTENSIONS
 
 
 _NAME_ = "pbench-cull-unpacked-tarballs"
@@ -287,11 +288,15 @@ def gen_list_unpacked_aged(incoming, archive, curr_dt, max_unpacked_age):
                         # NOTE: the pbench-audit-server should pick up and
                         # flag this unwanted condition.
                         continue
-                    # We have a tar ball directory name, validate it.
-                    tb_path = os.path.join(
-                        archive, c_entry.name, f"{entry.name}.tar.xz"
-                    )
-                    if not os.path.exists(tb_path):
+                    # We have a tar ball directory name, validate it, the
+                    # tar ball being of any format.
+                    for ext in TARBALL_EXTENSIONS:
+                        tb_path = os.path.join(
+                            archive, c_entry.name, f"{entry.name}{ext}"
+                        )
+                        if os.path.exists(tb_path):
+                            break
+                    else:
                         # NOTE: the pbench-audit-server should pick up and
                         # flag this unwanted condition.
                         continue
@@ -81,10 +81,10 @@ list=$tmp/list
 for linksrc_dir in $(find $ARCHIVE/ -maxdepth 2 -type d -name $linksrc); do
     # Find all the links in a given $linksrc directory that are
     # links to actual files (bad links are not emitted!).
-    find -L $linksrc_dir -type f -name '*.tar.xz' -printf "%p\n" 2>/dev/null >> ${list}.unsorted
+    find -L $linksrc_dir -type f \( -name '*.tar.xz' -o -name '*.tar.zst' \) -printf "%p\n" 2>/dev/null >> ${list}.unsorted
     # Find all the links in the same $linksrc directory that don't
     # link to anything so that we can count them as errors below.
-    find -L $linksrc_dir -type l -name '*.tar.xz' -printf "%p\n" 2>/dev/null >> ${list}.unsorted
+    find -L $linksrc_dir -type l \( -name '*.tar.xz' -o -name '*.tar.zst' \) -printf "%p\n" 2>/dev/null >> ${list}.unsorted
 done
 # Simple alphabetical sort
 sort ${list}.unsorted > ${list}
@@ -123,7 +123,8 @@ while read tarball ;do
     fi
 
     resultname=$(basename $tarball)
-    resultname=${resultname%.tar.xz}
+    tbext=.tar.${resultname##*.tar.}
+    resultname=${resultname%${tbext}}
 
     # XXXX - for now, if it's a duplicate name, just punt and avoid
     # producing the error
@@ -148,7 +149,7 @@ while read tarball ;do
     fi
 
     pushd ${controller_path} > /dev/null 2>&4
-    md5sum --check ${resultname}.tar.xz.md5
+    md5sum --check ${resultname}${tbext}.md5
     sts=$?
     popd >/dev/null 2>&4
     if [ $sts -ne 0 ] ;then
@@ -171,6 +172,7 @@ while read tarball ;do
         ln -sf $link ${controller_path}/${state}/
         status=$?
         if [ $status -eq 0 ] ;then
+            record_event ${controller} ${resultname}${tbext} ${linksrc} ${state}
             let totsuc+=1
         else
             log_error "$TS: Cannot create $tarball link to $state: code $status" "${mail_content}"
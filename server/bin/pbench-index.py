@@ -8,7 +8,6 @@ into the configured Elasticsearch V1 instance.
 
 import sys
 import os
-import glob
 import tarfile
 import tempfile
 from argparse import ArgumentParser
@@ -31,8 +30,12 @@ from pbench.server.indexer import (
     es_index,
     VERSION,
 )
+from pbench.server.lease import LeaseManager
+from pbench.server.pipeline import PipelineEvents
+from pbench.server.reindex import ReindexRequest
 from pbench.server.report import Report
-from pbench.server.utils import rename_tb_link, quarantine
+from pbench.server.spool import SpoolEntry
+from pbench.server.utils import rename_tb_link, quarantine, tb_glob
 
 
 # Internal debugging flag.
@@ -65,7 +68,12 @@ def main(options, name):
                                    list of index patterns that would be used
            dump_templates        - Dump the templates that would be used
            index_tool_data       - Index tool data only
-           re_index              - Consider tar balls marked for re-indexing
+           re_index              - Consider tar balls marked for re-indexing,
+                                   honouring their re-index requests, see
+                                   pbench.server.reindex
+           spool_dir             - Write the actions of each tar ball to this
+                                   spool directory instead of indexing them,
+                                   see pbench-replay-spool
        All exceptions are caught and logged to syslog with the stacktrace of
        the exception in a sub-object of the logged JSON document.
 
@@ -150,6 +158,8 @@ def main(options, name):
     # We only ever use a symlink'd error destination for indexing
     # problems.
     linkerrdest = "WONT-INDEX"
+    # Where the moves of the tar ball links are recorded, if anywhere.
+    events = PipelineEvents.from_config(idxctx.config)
 
     res = 0
     try:
@@ -180,8 +190,7 @@ def main(options, name):
     # find -L $ARCHIVE/*/$linksrc -name '*.tar.xz' -printf "%s\t%p\n" 2>/dev/null | sort -n > $list
     tarballs = []
     try:
-        tb_glob = os.path.join(ARCHIVE_rp, "*", linksrc, "*.tar.xz")
-        for tb in glob.iglob(tb_glob):
+        for tb in tb_glob(ARCHIVE_rp, "*", linksrc):
             try:
                 rp = os.path.realpath(tb)
             except OSError:
@@ -222,29 +231,45 @@ def main(options, name):
             idxctx.logger.info("No tar balls found that need processing")
             return 0
 
-    # We always process the smallest tar balls first.
-    tarballs = sorted(tarballs)
+    if idxctx.cost_model is None:
+        # We process the smallest tar balls first.
+        tarballs = sorted(tarballs)
+        estimates = {}
+    else:
+        try:
+            tarballs, estimates = idxctx.cost_model.order(
+                tarballs, INCOMING_rp, options.index_tool_data, idxctx.time()
+            )
+        except Exception:
+            idxctx.logger.exception("Unexpected error estimating tar ball costs")
+            return 12
 
-    # At this point, tarballs contains a list of tar balls sorted by size
-    # that were available as symlinks in the various 'linksrc' directories.
+    # At this point, tarballs contains a list of tar balls in the order to
+    # index them, that were available as symlinks in the various 'linksrc'
+    # directories.
     idxctx.logger.debug("Preparing to index {:d} tar balls", len(tarballs))
 
-    try:
-        # Now that we are ready to begin the actual indexing step, ensure we
-        # have the proper index templates in place.
-        idxctx.logger.debug("update_templates [start]")
-        idxctx.templates.update_templates(idxctx.es)
-    except TemplateError as e:
-        idxctx.logger.error("update_templates [end], error {}", repr(e))
-        res = 9
-    except Exception:
-        idxctx.logger.exception(
-            "update_templates [end]: Unexpected template" " processing error"
-        )
-        res = 12
-    else:
-        idxctx.logger.debug("update_templates [end]")
+    if options.spool_dir:
+        # Nothing is sent to Elasticsearch when spooling, the templates are
+        # updated by pbench-replay-spool.
         res = 0
+    else:
+        try:
+            # Now that we are ready to begin the actual indexing step, ensure
+            # we have the proper index templates in place.
+            idxctx.logger.debug("update_templates [start]")
+            idxctx.templates.update_templates(idxctx.es)
+        except TemplateError as e:
+            idxctx.logger.error("update_templates [end], error {}", repr(e))
+            res = 9
+        except Exception:
+            idxctx.logger.exception(
+                "update_templates [end]: Unexpected template" " processing error"
+            )
+            res = 12
+        else:
+            idxctx.logger.debug("update_templates [end]")
+            res = 0
 
     if res != 0:
         # Exit early if we encounter any errors.
@@ -261,6 +286,10 @@ def main(options, name):
         version=VERSION,
         templates=idxctx.templates,
     )
+    if options.spool_dir:
+        # Elasticsearch need not be available when spooling, so status
+        # reports are only logged.
+        report.es = None
     # We use the "start" report ID as the tracking ID for all indexed
     # documents.
     try:
@@ -271,6 +300,18 @@ def main(options, name):
     else:
         idxctx.set_tracking_id(tracking_id)
 
+    if idxctx.lease_dir:
+        # Other indexers may be working the same state directories, so each
+        # tar ball is claimed before it is processed.
+        leases = LeaseManager(
+            idxctx.lease_dir,
+            idxctx.lease_ttl,
+            f"{idxctx.gethostname()}:{idxctx.getpid()}",
+            idxctx.logger,
+        )
+    else:
+        leases = None
+
     with tempfile.TemporaryDirectory(
         prefix=f"{name}.", dir=idxctx.config.TMP
     ) as tmpdir:
@@ -284,6 +325,7 @@ def main(options, name):
                     print(f"{size:20d} {controller} {tb}", file=lfp)
 
             indexed = os.path.join(tmpdir, f"{name}.{idxctx.TS}.indexed")
+            spooled = os.path.join(tmpdir, f"{name}.{idxctx.TS}.spooled")
             erred = os.path.join(tmpdir, f"{name}.{idxctx.TS}.erred")
             skipped = os.path.join(tmpdir, f"{name}.{idxctx.TS}.skipped")
             ie_filename = os.path.join(
@@ -299,16 +341,78 @@ def main(options, name):
                 )
 
                 idxctx.logger.info("Starting {} (size {:d})", tb, size)
+                if tb in estimates:
+                    idxctx.logger.info(
+                        "Estimated cost of {}: {} (priority {:.2f})",
+                        tb,
+                        estimates[tb],
+                        estimates[tb].priority,
+                    )
+
+                # Distinguish failure cases, so we can retry the indexing
+                # easily if possible.  Different `linkerrdest` directories for
+                # different failures; the rest are going to end up in
+                # `linkerrdest` for later retry.
+                controller_path = os.path.dirname(linksrc_dir)
+
+                if options.spool_dir:
+                    spool = SpoolEntry(
+                        options.spool_dir, controller, os.path.basename(tb), linksrc
+                    )
+                    if spool.exists():
+                        # Already spooled, waiting to be replayed.
+                        idxctx.logger.info("Skipping {}, already spooled", tb)
+                        continue
+
+                lease = None
+                if leases is not None:
+                    lease = leases.claim(controller, os.path.basename(tb), linksrc)
+                    if lease is None:
+                        idxctx.logger.info(
+                            "Skipping {}, claimed by another indexer", tb
+                        )
+                        continue
+                    if not os.path.lexists(tb):
+                        # Another indexer finished with it since we listed it.
+                        lease.release()
+                        idxctx.logger.info("Skipping {}, no longer in {}", tb, linksrc)
+                        continue
+                if SpoolEntry.is_marked(controller_path, os.path.basename(tb), linksrc):
+                    # Spooled by an indexer, this one or another, and waiting
+                    # to be replayed, which moves its link on.
+                    if lease is not None:
+                        lease.release()
+                    idxctx.logger.info("Skipping {}, spooled for replay", tb)
+                    continue
 
                 ptb = None
+                request = None
+                tb_linkdest = linkdest
                 try:
+                    if options.re_index or options.index_tool_data:
+                        # Only generate the documents named by the tar ball's
+                        # re-index request, if any.
+                        request = ReindexRequest.load(
+                            controller_path, os.path.basename(tb)
+                        )
+                        if request is not None:
+                            idxctx.logger.info(
+                                "Re-index request for {}: {!r}", tb, request
+                            )
+                            if not options.index_tool_data and "tool" not in request:
+                                # No tool data to regenerate.
+                                tb_linkdest = "INDEXED"
+
                     # "Open" the tar ball represented by the tar ball object
                     idxctx.logger.debug("open tar ball")
+                    if idxctx.index_source == "stream":
+                        # Index straight from the tar ball, not from its
+                        # unpacked copy in INCOMING.
+                        extracted_root = None
+                    else:
+                        extracted_root = os.path.join(INCOMING_rp, controller)
                     ptb = PbenchTarBall(
-                        idxctx,
-                        os.path.realpath(tb),
-                        tmpdir,
-                        os.path.join(INCOMING_rp, controller),
+                        idxctx, os.path.realpath(tb), tmpdir, extracted_root
                     )
 
                     # Construct the generator for emitting all actions.  The
@@ -317,17 +421,28 @@ def main(options, name):
                     # list.
                     idxctx.logger.debug("generator setup")
                     if options.index_tool_data:
-                        actions = ptb.mk_tool_data_actions()
+                        actions = ptb.mk_tool_data_actions(request)
                     else:
-                        actions = ptb.make_all_actions()
-
-                    # File name for containing all indexing errors that
-                    # can't/won't be retried.
-                    with open(ie_filename, "w") as fp:
-                        idxctx.logger.debug("begin indexing")
-                        es_res = es_index(
-                            idxctx.es, actions, fp, idxctx.logger, idxctx._dbg
+                        actions = ptb.make_all_actions(request)
+
+                    if options.spool_dir:
+                        idxctx.logger.debug("begin spooling")
+                        beg = idxctx.time()
+                        count = spool.write(
+                            actions,
+                            tb,
+                            os.path.join(controller_path, tb_linkdest),
+                            os.path.join(controller_path, f"{linkerrdest}.1"),
                         )
+                        es_res = (beg, idxctx.time(), count, 0, 0, 0)
+                    else:
+                        # File name for containing all indexing errors that
+                        # can't/won't be retried.
+                        with open(ie_filename, "w") as fp:
+                            idxctx.logger.debug("begin indexing")
+                            es_res = es_index(
+                                idxctx.es, actions, fp, idxctx.logger, idxctx._dbg
+                            )
                 except UnsupportedTarballFormat as e:
                     idxctx.logger.warning("Unsupported tar ball format: {}", e)
                     tb_res = 4
@@ -346,9 +461,12 @@ def main(options, name):
                     idxctx.logger.warning("Bad hostname in sosreport: {}", e)
                     tb_res = 10
                 except tarfile.TarError as e:
-                    idxctx.logger.error(
-                        "Can't unpack tar ball into {}: {}", ptb.extracted_root, e
-                    )
+                    if ptb is None:
+                        idxctx.logger.error("Can't read tar ball {}: {}", tb, e)
+                    else:
+                        idxctx.logger.error(
+                            "Can't unpack tar ball into {}: {}", ptb.extracted_root, e
+                        )
                     tb_res = 11
                 except Exception as e:
                     idxctx.logger.exception("Other indexing error: {}", e)
@@ -356,9 +474,11 @@ def main(options, name):
                 else:
                     beg, end, successes, duplicates, failures, retries = es_res
                     idxctx.logger.info(
-                        "done indexing (start ts: {}, end ts: {}, duration:"
+                        "done {} (start ts: {}, end ts: {}, duration:"
                         " {:.2f}s, successes: {:d}, duplicates: {:d},"
-                        " failures: {:d}, retries: {:d})",
+                        " failures: {:d}, retries: {:d}, peak open csv"
+                        " files: {:d})",
+                        "spooling" if options.spool_dir else "indexing",
                         tstos(beg),
                         tstos(end),
                         end - beg,
@@ -366,7 +486,17 @@ def main(options, name):
                         duplicates,
                         failures,
                         retries,
+                        ptb.csv_files.peak,
                     )
+                    if tb in estimates:
+                        # The actual cost, to tune the cost model against.
+                        idxctx.logger.info(
+                            "Actual cost of {}: {:d} docs, {:.2f}s (estimated {})",
+                            tb,
+                            successes + duplicates + failures,
+                            end - beg,
+                            estimates[tb],
+                        )
                     tb_res = 1 if failures > 0 else 0
                 try:
                     ie_len = os.path.getsize(ie_filename)
@@ -395,13 +525,33 @@ def main(options, name):
                         os.remove(ie_filename)
                     except Exception:
                         pass
-                # Distinguish failure cases, so we can retry the indexing
-                # easily if possible.  Different `linkerrdest` directories for
-                # different failures; the rest are going to end up in
-                # `linkerrdest` for later retry.
-                controller_path = os.path.dirname(linksrc_dir)
-
-                if tb_res == 0:
+                if ptb is not None:
+                    ptb.close()
+                if lease is not None and not lease.renew():
+                    # Our lease expired while we worked, and the tar ball was
+                    # claimed by another indexer, which moves its link.
+                    idxctx.logger.warning(
+                        "{}: lost the lease on {}, leaving it to its new owner",
+                        idxctx.TS,
+                        tb,
+                    )
+                    continue
+                if tb_res == 0 and options.spool_dir:
+                    # A spooled tar ball only moves on once its actions have
+                    # been replayed, see pbench-replay-spool.  Until then it
+                    # is marked so that no indexer works it again, and its
+                    # re-index request, if any, is left in place for
+                    # pbench-replay-spool to remove.
+                    spool.mark(controller_path)
+                    idxctx.logger.info(
+                        "{}: {}/{}: spooled",
+                        idxctx.TS,
+                        os.path.basename(controller_path),
+                        os.path.basename(tb),
+                    )
+                    with open(spooled, "a") as fp:
+                        print(tb, file=fp)
+                elif tb_res == 0:
                     idxctx.logger.info(
                         "{}: {}/{}: success",
                         idxctx.TS,
@@ -412,8 +562,15 @@ def main(options, name):
                     with open(indexed, "a") as fp:
                         print(tb, file=fp)
                     rename_tb_link(
-                        tb, os.path.join(controller_path, linkdest), idxctx.logger
+                        tb,
+                        os.path.join(controller_path, tb_linkdest),
+                        idxctx.logger,
+                        events,
                     )
+                    if request is not None and tb_linkdest == "INDEXED":
+                        # The re-index request has been honoured, and the tar
+                        # ball has left the states which consult it.
+                        ReindexRequest.remove(controller_path, os.path.basename(tb))
                 elif tb_res == 1:
                     idxctx.logger.warning(
                         "{}: index failures encountered on {}", idxctx.TS, tb
@@ -424,6 +581,7 @@ def main(options, name):
                         tb,
                         os.path.join(controller_path, f"{linkerrdest}.1"),
                         idxctx.logger,
+                        events,
                     )
                 elif tb_res in (2, 3):
                     assert False, (
@@ -438,6 +596,7 @@ def main(options, name):
                         tb,
                         os.path.join(controller_path, f"{linkerrdest}.{tb_res:d}"),
                         idxctx.logger,
+                        events,
                     )
                 else:
                     idxctx.logger.error(
@@ -446,8 +605,13 @@ def main(options, name):
                     with open(erred, "a") as fp:
                         print(tb, file=fp)
                     rename_tb_link(
-                        tb, os.path.join(controller_path, linkerrdest), idxctx.logger
+                        tb,
+                        os.path.join(controller_path, linkerrdest),
+                        idxctx.logger,
+                        events,
                     )
+                if lease is not None:
+                    lease.release()
                 idxctx.logger.info("Finished {} (size {:d})", tb, size)
         except Exception:
             idxctx.logger.exception("Unexpected setup error")
@@ -456,18 +620,27 @@ def main(options, name):
             # No exceptions while processing tar ball, success.
             res = 0
         finally:
+            if leases is not None:
+                leases.release_all()
             if idxctx:
                 idxctx.dump_opctx()
             idxctx.logger.debug("stopped processing list of tar balls")
 
-            idx = _count_lines(indexed)
+            if options.spool_dir:
+                # Nothing is indexed when spooling, the spooled tar balls are
+                # reported instead.
+                verb, done = "Spooled", spooled
+            else:
+                verb, done = "Indexed", indexed
+            idx = _count_lines(done)
             skp = _count_lines(skipped)
             err = _count_lines(erred)
 
             idxctx.logger.info(
-                "{}.{}: indexed {:d} (skipped {:d}) results," " {:d} errors",
+                "{}.{}: {} {:d} (skipped {:d}) results," " {:d} errors",
                 name,
                 idxctx.TS,
+                verb.lower(),
                 idx,
                 skp,
                 err,
@@ -476,26 +649,26 @@ def main(options, name):
             if err > 0:
                 if skp > 0:
                     subj = (
-                        f"{name}.{idxctx.TS} - Indexed {idx:d} results, skipped {skp:d}"
+                        f"{name}.{idxctx.TS} - {verb} {idx:d} results, skipped {skp:d}"
                         f" results, w/ {err:d} errors"
                     )
                 else:
                     subj = (
-                        f"{name}.{idxctx.TS} - Indexed {idx:d} results, w/ {err:d}"
+                        f"{name}.{idxctx.TS} - {verb} {idx:d} results, w/ {err:d}"
                         " errors"
                     )
             else:
                 if skp > 0:
-                    subj = f"{name}.{idxctx.TS} - Indexed {idx:d} results, skipped {skp:d} results"
+                    subj = f"{name}.{idxctx.TS} - {verb} {idx:d} results, skipped {skp:d} results"
                 else:
-                    subj = f"{name}.{idxctx.TS} - Indexed {idx:d} results"
+                    subj = f"{name}.{idxctx.TS} - {verb} {idx:d} results"
 
             report_fname = os.path.join(tmpdir, f"{name}.{idxctx.TS}.report")
             with open(report_fname, "w") as fp:
                 print(subj, file=fp)
                 if idx > 0:
-                    print("\nIndexed Results\n===============", file=fp)
-                    with open(indexed) as ifp:
+                    print(f"\n{verb} Results\n===============", file=fp)
+                    with open(done) as ifp:
                         for line in sorted(ifp):
                             print(line.strip(), file=fp)
                 if err > 0:
@@ -570,6 +743,14 @@ if __name__ == "__main__":
         default=False,
         help="Perform re-indexing of previously indexed data",
     )
+    parser.add_argument(
+        "-S",
+        "--spool",
+        dest="spool_dir",
+        default=None,
+        help="Write the actions for each tar ball to the given spool directory"
+        " instead of indexing them",
+    )
     parsed = parser.parse_args()
     status = main(parsed, run_name)
     sys.exit(status)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+
+"""Pbench Pipeline Latency
+
+Report, from the pipeline event logs of the tar balls (see
+pbench.server.pipeline), the percentiles of the time tar balls dwelt in each
+state they left during the reporting window, and of the time they took to
+reach INDEXED, along with the number of tar balls currently waiting in each
+state, as a status report.  Meant to be run periodically, e.g. hourly, by
+cron.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from argparse import ArgumentParser
+
+from pbench.common.exceptions import BadConfig
+from pbench.common.logger import get_pbench_logger
+import pbench.server
+from pbench.server import PbenchServerConfig, tstos
+from pbench.server.pipeline import PipelineEvents, pipeline_stats
+from pbench.server.report import Report
+
+
+_NAME_ = "pbench-pipeline-latency"
+
+
+def main(options):
+    if not options.cfg_name:
+        print(
+            f"{_NAME_}: ERROR: No config file specified; set"
+            " _PBENCH_SERVER_CONFIG env variable or"
+            " use --config <file> on the command line",
+            file=sys.stderr,
+        )
+        return 2
+    if options.window <= 0:
+        print(f"{_NAME_}: ERROR: --window must be positive", file=sys.stderr)
+        return 2
+
+    try:
+        config = PbenchServerConfig(options.cfg_name)
+    except BadConfig as e:
+        print(f"{_NAME_}: {e}", file=sys.stderr)
+        return 1
+
+    logger = get_pbench_logger(_NAME_, config)
+    events = PipelineEvents.from_config(config)
+    if events is None:
+        logger.info("No pipeline-events-dir configured, nothing to report")
+        return 0
+
+    # The states in which tar balls queue up for a stage to work them.
+    states = [
+        state
+        for state in config.LINKDIRS.split()
+        if state == "TODO" or state.startswith("TO-")
+    ]
+    end = pbench.server._time()
+    since = end - options.window * 3600
+    try:
+        stats = pipeline_stats(events.logs(since), config.ARCHIVE, states, since)
+    except Exception:
+        logger.exception("Unexpected error computing the pipeline statistics")
+        return 1
+    stats["window"] = {"start": tstos(since), "end": tstos(end)}
+    logger.info(
+        "{}: dwell times of {:d} states, {:d} tar balls queued",
+        config.TS,
+        len(stats["dwell-times"]),
+        sum(stats["queue-depths"].values()),
+    )
+
+    with tempfile.NamedTemporaryFile(mode="w+t", dir=config.TMP) as reportfp:
+        reportfp.write(f"{_NAME_}.{config.timestamp()}({config.PBENCH_ENV})\n")
+        json.dump(stats, reportfp, indent=4, sort_keys=True)
+        reportfp.write("\n")
+        reportfp.flush()
+
+        report = Report(config, _NAME_)
+        report.init_report_template()
+        try:
+            report.post_status(config.timestamp(), "status", reportfp.name)
+        except Exception:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(f"Usage: {_NAME_} [--config <path-to-config-file>]")
+    parser.add_argument(
+        "-C",
+        "--config",
+        dest="cfg_name",
+        default=os.environ.get("_PBENCH_SERVER_CONFIG"),
+        help="Specify config file",
+    )
+    parser.add_argument(
+        "-w",
+        "--window",
+        dest="window",
+        type=float,
+        default=24,
+        help="Report on the tar balls which moved in the last given hours",
+    )
+    parsed = parser.parse_args()
+    status = main(parsed)
+    sys.exit(status)
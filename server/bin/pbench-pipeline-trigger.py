@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+
+"""Pbench Pipeline Trigger
+
+Run the pipeline tasks listed by the "pipeline-trigger-tasks" option of the
+"pbench-server" section, in order, for as long as wake-ups from the upload
+API are pending (see pbench.server.trigger).
+"""
+
+import sys
+import os
+from argparse import ArgumentParser
+
+from pbench.common.exceptions import BadConfig
+from pbench.common.logger import get_pbench_logger
+from pbench.server import PbenchServerConfig
+from pbench.server.trigger import run_pending
+
+
+_NAME_ = "pbench-pipeline-trigger"
+
+
+def main(options):
+    if not options.cfg_name:
+        print(
+            f"{_NAME_}: ERROR: No config file specified; set"
+            " _PBENCH_SERVER_CONFIG env variable or"
+            " use --config <file> on the command line",
+            file=sys.stderr,
+        )
+        return 2
+
+    try:
+        config = PbenchServerConfig(options.cfg_name)
+    except BadConfig as e:
+        print(f"{_NAME_}: {e}", file=sys.stderr)
+        return 1
+
+    logger = get_pbench_logger(_NAME_, config)
+    lock_dir = config.conf.get("pbench-server", "lock-dir")
+    try:
+        passes = run_pending(config.conf, lock_dir, logger)
+    except Exception:
+        logger.exception("Unexpected error running the pipeline tasks")
+        return 1
+    if passes > 0:
+        logger.info("{}: ran the pipeline tasks {:d} times", config.TS, passes)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(f"Usage: {_NAME_} [--config <path-to-config-file>]")
+    parser.add_argument(
+        "-C",
+        "--config",
+        dest="cfg_name",
+        default=os.environ.get("_PBENCH_SERVER_CONFIG"),
+        help="Specify config file",
+    )
+    parsed = parser.parse_args()
+    status = main(parsed)
+    sys.exit(status)
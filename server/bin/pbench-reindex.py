@@ -9,6 +9,11 @@ The process of re-indexing first looks to see which INDEXED, TO-INDEX-TOOL,
 and WONT-INDEX* symlinks exist in the given date range, and moves them to
 TO-RE-INDEX.
 
+All the documents of the tar balls are re-indexed, unless the classes of
+documents to re-index are named with "--classes" (and, for tool data, the
+tools with "--tools"), which are recorded as a re-index request for each tar
+ball, see pbench.server.reindex.
+
 NOTE: this interface is intended to be used interactively, this is NOT a
 service that runs as a cronjob.  NO RE-INDEXING STEPS SHOULD BE AUTOMATED
 AT THIS POINT.
@@ -26,26 +31,44 @@ from argparse import ArgumentParser
 from pbench import BadConfig
 import pbench.server
 from pbench.server import PbenchServerConfig
+from pbench.server.pipeline import PipelineEvents
+from pbench.server.reindex import (
+    BadReindexRequest,
+    DOC_CLASSES,
+    ReindexRequest,
+)
+from pbench.server.utils import tb_extension, tb_resultname
 
 
 _NAME_ = "pbench-reindex"
 
 tb_pat_r = (
-    r"\S+_(\d\d\d\d)[._-](\d\d)[._-](\d\d)[T_](\d\d)[._:](\d\d)[._:](\d\d)\.tar\.xz"
+    r"\S+_(\d\d\d\d)[._-](\d\d)[._-](\d\d)[T_](\d\d)[._:](\d\d)[._:](\d\d)"
+    r"\.tar\.(?:xz|zst)"
 )
 tb_pat = re.compile(tb_pat_r)
 
 
-def reindex(controller_name, tb_name, archive_p, incoming_p, dry_run=False):
+def reindex(
+    controller_name,
+    tb_name,
+    archive_p,
+    incoming_p,
+    dry_run=False,
+    request=None,
+    events=None,
+):
     """reindex - re-index the given tar ball name.
 
     This method is responsible for finding the current symlink to the tar ball
     and moving it to the TO-RE-INDEX directory, creating that directory if
-    it does not exist.
+    it does not exist.  The given re-index request, if any, is recorded for
+    the tar ball first, otherwise any previous request is removed, and the
+    move is recorded in the given pipeline events, if any.
     """
-    assert tb_name.endswith(".tar.xz"), f"invalid tar ball name, '{tb_name}'"
+    assert tb_extension(tb_name), f"invalid tar ball name, '{tb_name}'"
 
-    if not (incoming_p / controller_name / tb_name[:-7]).exists():
+    if not (incoming_p / controller_name / tb_resultname(tb_name)).exists():
         # Can't re-index tar balls that are not unpacked
         return (controller_name, tb_name, "not-unpacked", "")
 
@@ -91,6 +114,10 @@ def reindex(controller_name, tb_name, archive_p, incoming_p, dry_run=False):
 
     try:
         if not dry_run:
+            if request is None:
+                ReindexRequest.remove(controller_p, tb_name)
+            else:
+                request.save(controller_p, tb_name)
             paths[0].rename(newpath)
     except Exception as exc:
         msg = (
@@ -101,6 +128,11 @@ def reindex(controller_name, tb_name, archive_p, incoming_p, dry_run=False):
     else:
         msg = ""
         res = "succ"
+        if events is not None and not dry_run:
+            try:
+                events.record_move(str(paths[0]), str(newpath.parent))
+            except Exception as exc:
+                msg = f"WARNING: failed to record the move of '{paths[0]}', '{exc}'"
     return (controller_name, tb_name, res, msg)
 
 
@@ -217,14 +249,32 @@ def main(options):
             # For convenience, swap oldest and newest dates that are reversed.
             oldest_dt, newest_dt = newest_dt, oldest_dt
 
+    if options.classes or options.tools:
+        try:
+            request = ReindexRequest.parse(options.classes or "", options.tools or "")
+        except BadReindexRequest as exc:
+            print(f"Invalid re-index request, {exc}", file=sys.stderr)
+            return 8
+    else:
+        request = None
+
     print(f"Re-indexing tar balls in the range {oldest_dt} to {newest_dt}")
+    if request is not None:
+        print(f"Re-indexing only {request!r}")
 
+    events = PipelineEvents.from_config(config)
     actions = []
     start = pbench.server._time()
     for _val in gen_reindex_list(archive_p, oldest_dt, newest_dt):
         controller_name, tb_name = _val
         act_set = reindex(
-            controller_name, tb_name, archive_p, incoming_p, options.dry_run
+            controller_name,
+            tb_name,
+            archive_p,
+            incoming_p,
+            options.dry_run,
+            request,
+            events,
         )
         actions.append(act_set)
     end = pbench.server._time()
@@ -253,6 +303,21 @@ if __name__ == "__main__":
         default=False,
         help="Perform a dry-run only",
     )
+    parser.add_argument(
+        "-c",
+        "--classes",
+        dest="classes",
+        default=None,
+        help="Only re-index the given comma separated classes of documents,"
+        f" of {', '.join(DOC_CLASSES)}",
+    )
+    parser.add_argument(
+        "-t",
+        "--tools",
+        dest="tools",
+        default=None,
+        help="Only re-index the tool data of the given comma separated tools",
+    )
     parser.add_argument(
         "oldest", help="Oldest date of the range of tar balls to re-index"
     )
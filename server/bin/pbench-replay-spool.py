@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+
+"""Pbench Replay Spool
+
+Replay the actions spooled by "pbench-index --spool <dir>" into the configured
+Elasticsearch instance, several tar balls at a time.  Each tar ball's replay
+is checkpointed, so an interrupted replay resumes where it left off, and once
+all of its actions have been acknowledged the tar ball link is moved on to its
+next state, just as pbench-index would have done, and its spooled files and
+spooled mark are removed.
+"""
+
+import sys
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from configparser import Error as ConfigParserError
+
+from pbench.common.exceptions import (
+    BadConfig,
+    ConfigFileError,
+    JsonFileError,
+    TemplateError,
+)
+from pbench.server import tstos
+from pbench.server.indexer import IdxContext, VERSION
+from pbench.server.pipeline import PipelineEvents
+from pbench.server.reindex import ReindexRequest
+from pbench.server.report import Report
+from pbench.server.spool import SpoolEntry, DEFAULT_CHUNK_SIZE
+from pbench.server.utils import rename_tb_link
+
+
+_NAME_ = "pbench-replay-spool"
+
+
+def replay(idxctx, report, entry, chunk_size):
+    """Replay one spool entry, returning True if its tar ball moved on to its
+    next state.
+    """
+    logger = idxctx.logger
+    manifest = entry.read_manifest()
+    tb = manifest["tar_ball"]
+    # The tar ball link is in a state directory of its controller.
+    controller_path = os.path.dirname(os.path.dirname(tb))
+    if not os.path.lexists(tb):
+        # The tar ball was moved elsewhere since it was spooled, so its
+        # actions are stale.
+        logger.warning("Dropping spooled {}, {} no longer exists", entry.data, tb)
+        entry.unmark(controller_path)
+        entry.remove()
+        return False
+
+    logger.info("Replaying {} ({:d} actions)", entry.data, manifest["actions"])
+    beg = idxctx.time()
+    try:
+        state = entry.replay(idxctx.es, logger, chunk_size)
+    except Exception as e:
+        logger.exception("Replay of {} interrupted, will resume: {}", entry.data, e)
+        return False
+    end = idxctx.time()
+    logger.info(
+        "done replaying {} (start ts: {}, end ts: {}, duration: {:.2f}s,"
+        " successes: {:d}, duplicates: {:d}, failures: {:d}, retries: {:d})",
+        entry.data,
+        tstos(beg),
+        tstos(end),
+        end - beg,
+        state["successes"],
+        state["duplicates"],
+        state["failures"],
+        state["retries"],
+    )
+    events = PipelineEvents.from_config(idxctx.config)
+    if state["failures"] > 0:
+        try:
+            report.post_status(tstos(end), "errors", entry.errors)
+        except Exception:
+            logger.exception(
+                "Unexpected error issuing report status with errors: {}", entry.errors,
+            )
+        rename_tb_link(tb, manifest["linkerrdest"], logger, events)
+    else:
+        rename_tb_link(tb, manifest["linkdest"], logger, events)
+        if os.path.basename(manifest["linkdest"]) == "INDEXED":
+            # The re-index request of the tar ball, if any, has been
+            # honoured, see pbench-index.
+            ReindexRequest.remove(controller_path, os.path.basename(tb))
+    entry.unmark(controller_path)
+    entry.remove()
+    return state["failures"] == 0
+
+
+def main(options):
+    if not options.cfg_name:
+        print(
+            f"{_NAME_}: ERROR: No config file specified; set"
+            " _PBENCH_SERVER_CONFIG env variable or"
+            " use --config <file> on the command line",
+            file=sys.stderr,
+        )
+        return 2
+    if not options.spool_dir:
+        print(f"{_NAME_}: ERROR: No spool directory specified", file=sys.stderr)
+        return 2
+    if options.workers < 1 or options.chunk_size < 1:
+        print(
+            f"{_NAME_}: ERROR: --workers and --chunk-size must be positive",
+            file=sys.stderr,
+        )
+        return 2
+
+    try:
+        idxctx = IdxContext(options, _NAME_)
+    except (ConfigFileError, ConfigParserError) as e:
+        print(f"{_NAME_}: {e}", file=sys.stderr)
+        return 2
+    except BadConfig as e:
+        print(f"{_NAME_}: {e}", file=sys.stderr)
+        return 3
+    except JsonFileError as e:
+        print(f"{_NAME_}: {e}", file=sys.stderr)
+        return 8
+
+    entries = list(SpoolEntry.entries(options.spool_dir))
+    if not entries:
+        idxctx.logger.info("No spooled tar balls found that need replaying")
+        return 0
+
+    try:
+        idxctx.templates.update_templates(idxctx.es)
+    except TemplateError as e:
+        idxctx.logger.error("update_templates error {}", repr(e))
+        return 9
+    except Exception:
+        idxctx.logger.exception("Unexpected template processing error")
+        return 12
+
+    report = Report(
+        idxctx.config,
+        _NAME_,
+        es=idxctx.es,
+        pid=idxctx.getpid(),
+        group_id=idxctx.getgid(),
+        user_id=idxctx.getuid(),
+        hostname=idxctx.gethostname(),
+        version=VERSION,
+        templates=idxctx.templates,
+    )
+    try:
+        report.post_status(tstos(idxctx.time()), "start")
+    except Exception:
+        idxctx.logger.error("Failed to post initial report status")
+        return 12
+
+    with ThreadPoolExecutor(max_workers=options.workers) as executor:
+        futures = [
+            executor.submit(replay, idxctx, report, entry, options.chunk_size)
+            for entry in entries
+        ]
+        done = 0
+        for future in futures:
+            try:
+                if future.result():
+                    done += 1
+            except Exception:
+                idxctx.logger.exception("Unexpected error replaying spooled actions")
+
+    idxctx.logger.info(
+        "{}.{}: replayed {:d} of {:d} spooled tar balls",
+        _NAME_,
+        idxctx.TS,
+        done,
+        len(entries),
+    )
+    return 0 if done == len(entries) else 1
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        f"Usage: {_NAME_} [--config <path-to-config-file>] --spool <dir>"
+    )
+    parser.add_argument(
+        "-C",
+        "--config",
+        dest="cfg_name",
+        default=os.environ.get("_PBENCH_SERVER_CONFIG"),
+        help="Specify config file",
+    )
+    parser.add_argument(
+        "-S",
+        "--spool",
+        dest="spool_dir",
+        default=None,
+        help="The spool directory written by pbench-index --spool",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        type=int,
+        default=4,
+        help="Number of tar balls replayed concurrently",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunk-size",
+        dest="chunk_size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Number of actions acknowledged between two checkpoints",
+    )
+    parsed = parser.parse_args()
+    status = main(parsed)
+    sys.exit(status)
@@ -15,7 +15,7 @@ log_init $PROG
 
 log_info "$TS: $PROG starting"
 
-tarballs=$(cd $ARCHIVE > /dev/null; find . -path '*/TO-DELETE/*.tar.xz' -printf '%P\n' | sort)
+tarballs=$(cd $ARCHIVE > /dev/null; find . \( -path '*/TO-DELETE/*.tar.xz' -o -path '*/TO-DELETE/*.tar.zst' \) -printf '%P\n' | sort)
 hosts="$(for host in $tarballs ;do echo "${host%%/*}" ;done | sort -u )"
 
 typeset -i ntb=0
@@ -43,6 +43,8 @@ for host in $hosts; do
         fi
         ntb=$ntb+1
         x=${tb##*/}
+        tbext=.tar.${x##*.tar.}
+        resultname=${x%${tbext}}
         # remove tar file
         if [ -e $x ]; then
             rm $x
@@ -91,25 +93,25 @@ for host in $hosts; do
             fi
         fi
         # remove from incoming
-        if [ -e $INCOMING/$host/${x%%.tar.xz} ]; then
-            rm -rf $INCOMING/$host/${x%%.tar.xz}
+        if [ -e $INCOMING/$host/${resultname} ]; then
+            rm -rf $INCOMING/$host/${resultname}
             rc=$?
             if [ $rc != 0 ]; then
-                log_error "$TS: Failed to remove the tarball from incoming directory: $INCOMING/$host/${x%%.tar.xz}, code: $rc" "${mail_content}"
+                log_error "$TS: Failed to remove the tarball from incoming directory: $INCOMING/$host/${resultname}, code: $rc" "${mail_content}"
                 nincomingerrs=$nincomingerrs+1
             fi
         fi
         # remove the results
-        prefix=".prefix/${x%%.tar.xz}.prefix"
+        prefix=".prefix/${resultname}.prefix"
         if [ -e $prefix ]; then
-            prefix_value=$(cat ".prefix/${x%%.tar.xz}.prefix")
+            prefix_value=$(cat ".prefix/${resultname}.prefix")
         else
             prefix_value=""
         fi
         if [ -z "$prefix_value" ]; then
-            sym_link=$RESULTS/$host/${x%%.tar.xz}
+            sym_link=$RESULTS/$host/${resultname}
         else
-            sym_link=$RESULTS/$host/$prefix_value/${x%%.tar.xz}
+            sym_link=$RESULTS/$host/$prefix_value/${resultname}
         fi
         if [ -L $sym_link ]; then
             rm $sym_link
@@ -91,10 +91,11 @@ echo $TS
 # Check for results that are ready for processing: version 002 agents
 # upload the MD5 file as xxx.md5.check and they rename it to xxx.md5
 # after they are done with MD5 checking so that's what we look for.
-find ${receive_dir} -maxdepth 2 -name '*.tar.xz.md5' > ${list}.unsorted
+# Tar balls are either xz or zstd compressed.
+find ${receive_dir} -maxdepth 2 \( -name '*.tar.xz.md5' -o -name '*.tar.zst.md5' \) > ${list}.unsorted
 sts=$?
 if [ $sts != 0 ] ;then
-    log_exit "Failed: \"find ${receive_dir} -maxdepth 2 -name '*.tar.xz.md5'\", status $sts" 5
+    log_exit "Failed: \"find ${receive_dir} -maxdepth 2 \( -name '*.tar.xz.md5' -o -name '*.tar.zst.md5' \)\", status $sts" 5
 fi
 sort ${list}.unsorted > ${list}
 sts=$?
@@ -117,15 +118,18 @@ while read tbmd5 ;do
     tbdir=$(dirname ${tb})
 
     # resultname: get the basename foo.tar.xz and then strip the .tar.xz
+    # (or .tar.zst), keeping it as the tar ball's extension, tbext
     resultname=$(basename ${tb})
-    resultname=${resultname%.tar.xz}
+    tbext=.tar.${resultname##*.tar.}
+    resultname=${resultname%${tbext}}
 
     # the controller hostname is the last component of the directory part of the full path
     controller=$(basename ${tbdir})
 
     dest=${ARCHIVE}/${controller}
 
-    if [ -f ${dest}/${resultname}.tar.xz -o -f ${dest}/${resultname}.tar.xz.md5 ] ;then
+    # A result is a duplicate whatever the format of either tar ball.
+    if [ -f ${dest}/${resultname}.tar.xz -o -f ${dest}/${resultname}.tar.xz.md5 -o -f ${dest}/${resultname}.tar.zst -o -f ${dest}/${resultname}.tar.zst.md5 ] ;then
         log_error "$TS: Duplicate: ${tb} duplicate name"
         quarantine ${duplicates}/${controller} ${tb} ${tbmd5}
         ndups=$ndups+1
@@ -133,7 +137,7 @@ while read tbmd5 ;do
     fi
 
     pushd ${tbdir} > /dev/null 2>&4
-    md5sum --check ${resultname}.tar.xz.md5
+    md5sum --check ${resultname}${tbext}.md5
     sts=$?
     popd > /dev/null 2>&4
     if [ $sts -ne 0 ] ;then
@@ -159,10 +163,10 @@ while read tbmd5 ;do
     sts=${?}
     if [[ ${sts} -ne 0 ]]; then
         log_error "${TS}: Error: \"cp -a ${tb}.md5 ${dest}/\", status ${sts}" "${status}"
-        rm ${dest}/${resultname}.tar.xz.md5
+        rm ${dest}/${resultname}${tbext}.md5
         sts=${?}
         if [[ ${sts} -ne 0 ]]; then
-            log_error "${TS}: Warning: cleanup of copy failure failed itself: \"rm ${dest}/${resultname}.tar.xz.md5\", status ${sts}" "${status}"
+            log_error "${TS}: Warning: cleanup of copy failure failed itself: \"rm ${dest}/${resultname}${tbext}.md5\", status ${sts}" "${status}"
         fi
         quarantine ${errors}/${controller} ${tb} ${tb}.md5
         (( nerrs++ ))
@@ -178,10 +182,10 @@ while read tbmd5 ;do
     sts=${?}
     if [[ ${sts} -ne 0 ]]; then
         log_error "${TS}: Error: \"mv ${tb} ${dest}/\", status ${sts}" "${status}"
-        rm ${dest}/${resultname}.tar.xz.md5
+        rm ${dest}/${resultname}${tbext}.md5
         sts=${?}
         if [[ ${sts} -ne 0 ]]; then
-            log_error "${TS}: Warning: cleanup of move failure failed itself: \"rm ${dest}/${resultname}.tar.xz.md5\", status ${sts}" "${status}"
+            log_error "${TS}: Warning: cleanup of move failure failed itself: \"rm ${dest}/${resultname}${tbext}.md5\", status ${sts}" "${status}"
         fi
         quarantine ${errors}/${controller} ${tb} ${tb}.md5
         (( nerrs++ ))
@@ -196,15 +200,16 @@ while read tbmd5 ;do
         log_error "$TS: Warning: cleanup of successful copy operation failed: \"rm ${tb}.md5\", status $sts" "$status"
     fi
 
-    ln -s ${dest}/${resultname}.tar.xz ${dest}/TODO/
+    ln -s ${dest}/${resultname}${tbext} ${dest}/TODO/
     sts=$?
     if [ $sts -ne 0 ] ;then
-        log_error "$TS: Error: \"ln -s ${dest}/${resultname}.tar.xz ${dest}/TODO/\", status $sts" "$status"
+        log_error "$TS: Error: \"ln -s ${dest}/${resultname}${tbext} ${dest}/TODO/\", status $sts" "$status"
         # if we fail to make the link, we quarantine the (already moved)
         # tarball and .md5.
         quarantine ${errors}/${controller} ${dest}/${tb} ${dest}/${tb}.md5
         nerrs=$nerrs+1
     else
+        record_event ${controller} ${resultname}${tbext} - TODO
         echo "$TS: processed ${tb}" >> $status
         ntbs=$ntbs+1
     fi
@@ -135,7 +135,7 @@ if [ -s $tmp/satellite.$remote_prefix.tar ]; then
     if [[ $? -ne 0 ]]; then
         cat $tmp/satellite.$remote_prefix.tar >&4
     fi
-    files=$(find $unpack -path '*.tar.xz' -printf '%P\n')
+    files=$(find $unpack \( -path '*.tar.xz' -o -path '*.tar.zst' \) -printf '%P\n')
     hosts="$(for host in $files;do echo ${host%%/*};done | sort -u )"
 
     log_info "$TS: remote tarballs unpacked - $(timestamp)" "${mail_content}"
@@ -179,7 +179,7 @@ for host in $hosts ;do
     fi
 
     # get the tarball list for this host
-    flist=$(find $unpack/$host -type f -name '*.tar.xz.md5' | sed 's;'$unpack/$host/';;' | sort)
+    flist=$(find $unpack/$host -type f \( -name '*.tar.xz.md5' -o -name '*.tar.zst.md5' \) | sed 's;'$unpack/$host/';;' | sort)
 
     echo $flist
 
@@ -239,6 +239,7 @@ for host in $hosts ;do
                 log_error "Failed to create the symlink for TODO state directory: ln -sf $PWD/$x TODO/$x" "${mail_content}"
                 continue
             fi
+            record_event $remote_prefix::$host $x - TODO
         done
     fi
     # save the contents of ok checks to further use it for state change
@@ -115,11 +115,11 @@ function gen_work_list() {
         # Find all the links in a given ${linksrc} directory that are links to
         # actual files (bad links are not emitted!).  For now, if it's a
         # duplicate name, just punt and avoid producing an error.
-        find -L ${linksrc_dir} -type f -name '*.tar.xz' ! -name 'DUPLICATE__NAME*' ${lb_arg} ${ub_arg} -printf "%TY-%Tm-%TdT%TT %s %p\n" 2>/dev/null >> ${list}.unsorted
+        find -L ${linksrc_dir} -type f \( -name '*.tar.xz' -o -name '*.tar.zst' \) ! -name 'DUPLICATE__NAME*' ${lb_arg} ${ub_arg} -printf "%TY-%Tm-%TdT%TT %s %p\n" 2>/dev/null >> ${list}.unsorted
         if [[ ${lowerbound} == 0 ]]; then
             # Find all the links in the same ${linksrc} directory that don't
             # link to anything so that we can count them as errors below.
-            find -L $linksrc_dir -type l -name '*.tar.xz' ! -name 'DUPLICATE__NAME*' -printf "%TY-%Tm-%TdT%TT %s %p\n" 2>/dev/null >> ${list}.unsorted
+            find -L $linksrc_dir -type l \( -name '*.tar.xz' -o -name '*.tar.zst' \) ! -name 'DUPLICATE__NAME*' -printf "%TY-%Tm-%TdT%TT %s %p\n" 2>/dev/null >> ${list}.unsorted
         fi
     done
     sort -k 1 -r ${list}.unsorted > ${list}
@@ -134,10 +134,13 @@ function move_symlink() {
     local resultname="${2}"
     local linksrc="${3}"
     local linkdest="${4}"
-    mv ${ARCHIVE}/${hostname}/${linksrc}/${resultname}.tar.xz ${ARCHIVE}/${hostname}/${linkdest}/${resultname}.tar.xz
+    # The extension of the tar ball being worked, see do_work().
+    mv ${ARCHIVE}/${hostname}/${linksrc}/${resultname}${tbext} ${ARCHIVE}/${hostname}/${linkdest}/${resultname}${tbext}
     local status=${?}
     if [[ ${status} -ne 0 ]]; then
-        log_error "${TS}: Cannot move symlink ${ARCHIVE}/${hostname}/${resultname}.tar.xz from ${linksrc} to ${linkdest}: code ${status}" "${mail_content}"
+        log_error "${TS}: Cannot move symlink ${ARCHIVE}/${hostname}/${resultname}${tbext} from ${linksrc} to ${linkdest}: code ${status}" "${mail_content}"
+    else
+        record_event ${hostname} ${resultname}${tbext} ${linksrc} ${linkdest}
     fi
     return ${status}
 }
@@ -149,8 +152,11 @@ function do_work() {
     while read date size result; do
         ntotal=${ntotal}+1
 
+        # Tar balls are either xz (.tar.xz) or zstd (.tar.zst) compressed,
+        # which tar detects when extracting.
         resultname=$(basename ${result})
-        resultname=${resultname%.tar.xz}
+        tbext=.tar.${resultname##*.tar.}
+        resultname=${resultname%${tbext}}
 
         link=$(readlink -e ${result})
         if [[ -z "${link}" ]]; then
@@ -351,12 +357,13 @@ function do_work() {
         let toterr=0
         let totsuc=0
         for state in ${linkdestlist}; do
-            ln -sf ${ARCHIVE}/${hostname}/${resultname}.tar.xz ${ARCHIVE}/${hostname}/${state}/${resultname}.tar.xz
+            ln -sf ${ARCHIVE}/${hostname}/${resultname}${tbext} ${ARCHIVE}/${hostname}/${state}/${resultname}${tbext}
             status=${?}
             if [[ ${status} -eq 0 ]]; then
+                record_event ${hostname} ${resultname}${tbext} - ${state}
                 let totsuc+=1
             else
-                log_error "${TS}: Cannot create ${ARCHIVE}/${hostname}/${resultname}.tar.xz link in state ${state}: code ${status}" "${mail_content}"
+                log_error "${TS}: Cannot create ${ARCHIVE}/${hostname}/${resultname}${tbext} link in state ${state}: code ${status}" "${mail_content}"
                 let toterr+=1
             fi
         done
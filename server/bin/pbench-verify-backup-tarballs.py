@@ -41,7 +41,6 @@ re-verify.
 
 import os
 import sys
-import glob
 import errno
 import tempfile
 from enum import Enum
@@ -51,7 +50,7 @@ from pbench.common.exceptions import BadConfig
 from pbench.common.logger import get_pbench_logger
 from pbench.server.report import Report
 from pbench.server.s3backup import S3Config, Entry
-from pbench.server.utils import md5sum
+from pbench.server.utils import md5sum, tb_glob
 
 
 _NAME_ = "pbench-verify-backup-tarballs"
@@ -86,7 +85,7 @@ class BackupObject:
     def fs_entry_list_creation(self):
         # Function to create entry list for results in a file-system
         # (archive or backup) directory.
-        tarlist = glob.iglob(os.path.join(self.dirname, "*", "*.tar.xz"))
+        tarlist = tb_glob(self.dirname, "*")
         self.content_list = []
         self.missing_list = []
         self.error_list = []